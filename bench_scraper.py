@@ -0,0 +1,146 @@
+import argparse
+import json
+import time
+
+from selenium.common.exceptions import TimeoutException
+
+from db_utils import DatabaseConnector
+from dedup_index import JobIndex
+from html_fixtures import FixtureRecorder, FixtureServer
+from linkedin_scraper_local import Scraper
+
+
+def _summarise(times) -> dict:
+    ordered = sorted(times)
+    return {
+        "count": len(ordered),
+        "mean_ms": sum(ordered) / len(ordered) * 1000,
+        "p95_ms": ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))] * 1000,
+        "max_ms": ordered[-1] * 1000,
+    }
+
+
+def _timed(times, label, function):
+    """Wrap a function so every call's duration is appended to times[label]."""
+
+    def _wrapper(*args, **kwargs):
+        start = time.perf_counter()
+        try:
+            return function(*args, **kwargs)
+        finally:
+            times.setdefault(label, []).append(time.perf_counter() - start)
+
+    return _wrapper
+
+
+def record(fixtures_dir, preferred_job_title, job_filters, max_pages) -> None:
+    """Run a live scrape, saving every results page and details pane seen into fixtures_dir."""
+    creds = DatabaseConnector().read_creds()
+    scraper = Scraper()
+    scraper.recorder = FixtureRecorder(fixtures_dir)
+    # Cards already stored are skipped before they are clicked, so nothing may count as
+    # stored or their details would never be recorded for replay
+    scraper.job_index = JobIndex()
+    jobs = list(
+        scraper.stream_jobs(
+            creds["LINKEDIN_EMAIL"],
+            creds["LINKEDIN_PASSWORD"],
+            preferred_job_title,
+            job_filters,
+            max_pages,
+        )
+    )
+    scraper.driver_manager.shutdown()
+    print(f"Recorded {len(scraper.recorder.manifest['pages'])} pages ({len(jobs)} new jobs) to {fixtures_dir}")
+
+
+def replay(fixtures_dir, max_pages=None) -> dict:
+    """Benchmark the scraper offline against recorded fixtures.
+
+    Measures end to end jobs scraped per minute, then the latency of each
+    field extraction path on every recorded card.
+
+    Returns:
+        Dict: The benchmark results
+    """
+    server = FixtureServer(fixtures_dir)
+    search_url = server.start()
+    # No politeness needed against a local server
+    scraper = Scraper(politeness_floor=0)
+    # Nothing counts as a duplicate offline, and no database is needed
+    scraper.job_index = JobIndex()
+    field_times = {}
+    scraper._scrape_job_details_bulk = _timed(
+        field_times, "bulk", scraper._scrape_job_details_bulk
+    )
+
+    try:
+        driver = scraper.get_driver()
+        driver.get(search_url)
+        start = time.perf_counter()
+        jobs = list(scraper.iter_jobs(driver, max_pages))
+        elapsed = time.perf_counter() - start
+
+        # Second pass over the first page, timing each per-field fallback helper
+        driver.get(search_url)
+        fields = {
+            "job_title": scraper._scrape_job_title,
+            "company_name": lambda driver: scraper._scrape_job_text(
+                driver, ".job-details-jobs-unified-top-card__company-name > a:nth-child(1)"
+            ),
+            "location": scraper._scrape_job_location,
+            "job_link": scraper._scrape_job_link,
+            "job_description": lambda driver: scraper._scrape_job_text(
+                driver, "div.jobs-description__content"
+            ),
+        }
+        for job_card in scraper._load_all_job_cards(driver):
+            card_job_id = scraper._card_job_id(job_card)
+            job_card.click()
+            try:
+                scraper._wait_for_job_details(driver, card_job_id)
+            except TimeoutException:
+                # No details pane was recorded for this card, as in iter_page_jobs it is skipped
+                print(f"No recorded details for job {card_job_id}, skipping it")
+                continue
+            for field, extractor in fields.items():
+                _timed(field_times, field, extractor)(driver)
+    finally:
+        scraper.driver_manager.shutdown()
+        server.stop()
+
+    results = {
+        "jobs": len(jobs),
+        "seconds": elapsed,
+        "jobs_per_minute": len(jobs) / elapsed * 60 if elapsed else 0,
+        "waits": scraper.waiter.report(),
+        "fields": {field: _summarise(times) for field, times in field_times.items()},
+    }
+    print(f"Scraped {len(jobs)} jobs in {elapsed:.1f}s ({results['jobs_per_minute']:.1f} jobs/min)")
+    for field, summary in results["fields"].items():
+        print(
+            f"  {field}: mean {summary['mean_ms']:.1f}ms, "
+            f"p95 {summary['p95_ms']:.1f}ms, max {summary['max_ms']:.1f}ms"
+        )
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Record LinkedIn pages as fixtures, or benchmark the scraper against them offline"
+    )
+    parser.add_argument("mode", choices=["record", "replay"])
+    parser.add_argument("--fixtures-dir", default="fixtures")
+    parser.add_argument("--max-pages", type=int, default=None)
+    parser.add_argument("--job-title", default="DevOps Engineer")
+    parser.add_argument("--output", help="Write the replay results to this JSON file")
+    args = parser.parse_args()
+
+    if args.mode == "record":
+        job_filters = {"experience": ["Entry level"], "workplaceType": ["Hybrid"]}
+        record(args.fixtures_dir, args.job_title, job_filters, args.max_pages)
+    else:
+        results = replay(args.fixtures_dir, args.max_pages)
+        if args.output:
+            with open(args.output, "w") as file:
+                json.dump(results, file, indent=2)
@@ -0,0 +1,143 @@
+import json
+import os
+import threading
+
+
+class ScrapeCheckpoint:
+    """Durable progress of one search, written as the scrape proceeds, so a
+    retry or the next cron run resumes where the last attempt stopped.
+
+    Two files are kept side by side:
+        <path>              Search, filters, page number and last processed card
+        <path>.jobs.jsonl   Jobs scraped but not yet written to the database,
+                            one appended line per job
+    """
+
+    def __init__(self, path, job_title, job_filters) -> None:
+        self.path = path
+        self.jobs_path = f"{path}.jobs.jsonl"
+        self.state = {
+            "job_title": job_title,
+            "job_filters": job_filters,
+            "page": 1,
+            "last_card": -1,
+            "complete": False,
+        }
+        self.jobs = []
+        # Jobs are appended by the scraper while a writer thread discards flushed ones
+        self._jobs_lock = threading.Lock()
+
+    @classmethod
+    def load(cls, path, job_title, job_filters, resume_position=True):
+        """Resume the checkpoint at path if it belongs to the same search, otherwise start fresh.
+
+        Jobs not yet written to the database are always kept, even from a
+        different search. The page and card position is only resumed if the
+        last run was the same search, stopped part way through it, and
+        resume_position is set.
+
+        Args:
+            path (String): Location of the checkpoint state file
+            job_title (String): The job title being searched for
+            job_filters (Dict): The filters applied to the search
+            resume_position (Boolean): Carry on from the saved page and card. Pass
+                False when results are sorted newest first, as the postings have
+                shifted down the list since the checkpoint was written
+
+        Returns:
+            ScrapeCheckpoint: The resumed or fresh checkpoint
+        """
+        checkpoint = cls(path, job_title, job_filters)
+        try:
+            with open(path, "r") as file:
+                state = json.load(file)
+        except (OSError, ValueError):
+            state = None
+
+        if os.path.exists(checkpoint.jobs_path):
+            with open(checkpoint.jobs_path, "r") as file:
+                checkpoint.jobs = [json.loads(line) for line in file if line.strip()]
+
+        if state and state["job_title"] == job_title and state["job_filters"] == job_filters:
+            checkpoint.state = state
+            if state["complete"] or not resume_position:
+                # A finished search, e.g. one whose jobs could not be written, is scraped again
+                checkpoint.reset_progress()
+                print(f"Starting the search again, {len(checkpoint.jobs)} unwritten jobs kept from the checkpoint")
+            else:
+                print(
+                    f"Resuming from checkpoint: page {state['page']}, card {state['last_card'] + 1}, "
+                    f"{len(checkpoint.jobs)} jobs already scraped"
+                )
+        elif checkpoint.jobs:
+            # Another search's jobs are still written by this run, only its position is dropped
+            checkpoint.reset_progress()
+            print(f"Starting a new search, {len(checkpoint.jobs)} unwritten jobs kept from the checkpoint")
+        else:
+            checkpoint.clear()
+        return checkpoint
+
+    @property
+    def page(self) -> int:
+        return self.state["page"]
+
+    @property
+    def complete(self) -> bool:
+        return self.state["complete"]
+
+    def resume_index(self, page_number) -> int:
+        """Index of the first card on the given page that has not been processed yet."""
+        if page_number == self.state["page"]:
+            return self.state["last_card"] + 1
+        return 0
+
+    def record_job(self, job_dict) -> None:
+        """Durably append a newly scraped job."""
+        with self._jobs_lock:
+            with open(self.jobs_path, "a") as file:
+                file.write(json.dumps(job_dict) + "\n")
+                file.flush()
+                os.fsync(file.fileno())
+            self.jobs.append(job_dict)
+
+    def discard_jobs(self, flushed_jobs) -> None:
+        """Drop jobs that are now safely in the database, so they are never uploaded twice."""
+        flushed_ids = {job_dict["job_id"] for job_dict in flushed_jobs}
+        with self._jobs_lock:
+            self.jobs = [
+                job_dict for job_dict in self.jobs if job_dict["job_id"] not in flushed_ids
+            ]
+            temp_path = f"{self.jobs_path}.tmp"
+            with open(temp_path, "w") as file:
+                for job_dict in self.jobs:
+                    file.write(json.dumps(job_dict) + "\n")
+            os.replace(temp_path, self.jobs_path)
+
+    def advance(self, page_number, card_index) -> None:
+        """Record that every card up to card_index on page_number has been processed."""
+        self.state["page"] = page_number
+        self.state["last_card"] = card_index
+        self._write_state()
+
+    def mark_complete(self) -> None:
+        """Record that every page of the search has been scraped."""
+        self.state["complete"] = True
+        self._write_state()
+
+    def reset_progress(self) -> None:
+        """Start the search from the first page again, keeping any unwritten jobs."""
+        self.state.update({"page": 1, "last_card": -1, "complete": False})
+        self._write_state()
+
+    def clear(self) -> None:
+        """Delete the checkpoint, once its jobs are safely in the database."""
+        for path in (self.path, self.jobs_path):
+            if os.path.exists(path):
+                os.remove(path)
+
+    def _write_state(self) -> None:
+        # Write then rename, so a crash mid-write never leaves a corrupt checkpoint
+        temp_path = f"{self.path}.tmp"
+        with open(temp_path, "w") as file:
+            json.dump(self.state, file)
+        os.replace(temp_path, self.path)
@@ -1,75 +1,466 @@
+import argparse
+import atexit
+import os
+import signal
+import threading
+import time
+
+from contextlib import contextmanager
+
 import yaml
 
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event
 from sqlalchemy.sql import text
 
+from job_repository import JobRepository
+from near_duplicates import NearDuplicateIndex
+from schema import apply_migrations, bench, migration_status
+
+CREDS_PATH = "creds.yaml"
+
+# Set STORAGE_BACKEND in creds.yaml to pick where jobs are stored
+DEFAULT_STORAGE_BACKEND = "rds"
+DEFAULT_SQLITE_PATH = "jobs.sqlite3"
+
+# Applied to every new SQLite connection
+SQLITE_PRAGMAS = (
+    # Readers never block the writer, and the writer never blocks readers
+    "PRAGMA journal_mode = WAL",
+    # Safe with WAL, only the last transactions can be lost on power failure, never corruption
+    "PRAGMA synchronous = NORMAL",
+    # Wait for a lock instead of failing straight away, e.g. while the writer thread flushes
+    "PRAGMA busy_timeout = 5000",
+    "PRAGMA foreign_keys = ON",
+    "PRAGMA temp_store = MEMORY",
+    # 64MB page cache, 256MB memory mapped
+    "PRAGMA cache_size = -65536",
+    "PRAGMA mmap_size = 268435456",
+)
+
+# Pool settings, each can be overridden by the same key in creds.yaml
+POOL_DEFAULTS = {
+    "POOL_SIZE": 5,
+    "MAX_OVERFLOW": 5,
+    # Seconds to wait for a free connection before giving up
+    "POOL_TIMEOUT": 30,
+    # Reconnect before RDS or a NAT drops connections that have sat idle
+    "POOL_RECYCLE": 1800,
+    # Test each connection on checkout, so a dropped one is replaced instead of failing a query
+    "POOL_PRE_PING": True,
+}
+
+# Shared by every DatabaseConnector in the process. Engines are keyed by process
+# ID, as pooled connections must never be shared with a forked child
+_ENGINES = {}
+_ENGINE_LOCK = threading.Lock()
+_CREDS_CACHE = {}
+POOL_STATS = {
+    "connections_opened": 0,
+    "checkouts": 0,
+    "checkins": 0,
+    "invalidated": 0,
+    # Running totals of the checkouts timed by begin(), constant memory however long the run
+    "timed_checkouts": 0,
+    "total_checkout_seconds": 0.0,
+    "max_checkout_seconds": 0.0,
+}
+
 
 class DatabaseConnector:
-    """A collection of methods to connect and interact with an AWS RDS database."""
+    """A collection of methods to connect and interact with the jobs database.
+
+    Either the AWS RDS database, or an embedded SQLite file for local runs
+    and benchmarks without a network, selected by STORAGE_BACKEND in creds.yaml.
+    """
 
     def __init__(self) -> None:
-        pass
+        # Clusters near identical postings as they are uploaded
+        self.near_duplicate_index = NearDuplicateIndex()
 
     def read_creds(self):
-        """Read in the external credentials file.
+        """Read in the external credentials file, parsed once and cached until it changes.
 
         Returns:
             YAML: YAML file containing the database and sign in credentials
         """
-        with open("creds.yaml", "r") as creds_file:
-            creds = yaml.safe_load(creds_file)
-        return creds
+        modified = os.path.getmtime(CREDS_PATH)
+        cached = _CREDS_CACHE.get(CREDS_PATH)
+        if cached is None or cached[0] != modified:
+            with open(CREDS_PATH, "r") as creds_file:
+                creds = yaml.safe_load(creds_file)
+            _CREDS_CACHE[CREDS_PATH] = (modified, creds)
+            return creds
+        return cached[1]
 
     def init_db_engine(self):
-        """Generate a SQLAlchemy Engine to interact with the database.
+        """Get this process's pooled SQLAlchemy Engine, creating it on first use.
 
         Returns:
             SQLAlchemy Engine: See above
         """
         db_creds = self.read_creds()
+        backend = self.storage_backend()
+        if backend == "sqlite":
+            url = f"sqlite:///{db_creds.get('SQLITE_PATH', DEFAULT_SQLITE_PATH)}"
+        elif backend == "rds":
+            DATABASE_TYPE = db_creds["DATABASE_TYPE"]
+            DBAPI = db_creds["DBAPI"]
+            HOST = db_creds["HOST"]
+            USER = db_creds["USER"]
+            PASSWORD = db_creds["PASSWORD"]
+            DATABASE = db_creds["DATABASE"]
+            PORT = db_creds["PORT"]
 
-        DATABASE_TYPE = db_creds["DATABASE_TYPE"]
-        DBAPI = db_creds["DBAPI"]
-        HOST = db_creds["HOST"]
-        USER = db_creds["USER"]
-        PASSWORD = db_creds["PASSWORD"]
-        DATABASE = db_creds["DATABASE"]
-        PORT = db_creds["PORT"]
+            url = f"{DATABASE_TYPE}+{DBAPI}://{USER}:{PASSWORD}@{HOST}:{PORT}/{DATABASE}"
+        else:
+            raise ValueError(f"Unknown STORAGE_BACKEND {backend!r}, expected 'rds' or 'sqlite'")
+
+        key = (os.getpid(), url)
+        with _ENGINE_LOCK:
+            engine = _ENGINES.get(key)
+            if engine is None:
+                pool = {setting: db_creds.get(setting, default) for setting, default in POOL_DEFAULTS.items()}
+                if backend == "sqlite":
+                    engine = self._sqlite_engine(url, pool)
+                else:
+                    engine = create_engine(
+                        url,
+                        pool_size=pool["POOL_SIZE"],
+                        max_overflow=pool["MAX_OVERFLOW"],
+                        pool_timeout=pool["POOL_TIMEOUT"],
+                        pool_recycle=pool["POOL_RECYCLE"],
+                        pool_pre_ping=pool["POOL_PRE_PING"],
+                    )
+                self._track_pool(engine)
+                if backend == "sqlite":
+                    # A local file is always brought up to date, the RDS database only by "migrate"
+                    apply_migrations(self, engine)
+                _ENGINES[key] = engine
+        return engine
+
+    def storage_backend(self) -> str:
+        """Which backend creds.yaml selects, "rds" or "sqlite"."""
+        return self.read_creds().get("STORAGE_BACKEND", DEFAULT_STORAGE_BACKEND).lower()
+
+    @staticmethod
+    def _sqlite_engine(url, pool):
+        """Helper method. Build a SQLite engine that applies the tuned pragmas to every connection."""
+        # Local file, nothing to pre-ping or recycle
+        engine = create_engine(url, pool_size=pool["POOL_SIZE"], max_overflow=pool["MAX_OVERFLOW"])
+
+        @event.listens_for(engine, "connect")
+        def _configure(dbapi_connection, connection_record):
+            # Let SQLAlchemy issue BEGIN itself, pysqlite's own transaction handling is unreliable
+            dbapi_connection.isolation_level = None
+            cursor = dbapi_connection.cursor()
+            for pragma in SQLITE_PRAGMAS:
+                cursor.execute(pragma)
+            cursor.close()
+
+        @event.listens_for(engine, "begin")
+        def _begin(connection):
+            connection.exec_driver_sql("BEGIN")
 
-        engine = create_engine(
-            f"{DATABASE_TYPE}+{DBAPI}://{USER}:{PASSWORD}@{HOST}:{PORT}/{DATABASE}"
-        )
         return engine
 
+    @staticmethod
+    def _track_pool(engine) -> None:
+        """Helper method. Count pool events into POOL_STATS."""
+
+        def _counter(stat):
+            def _listener(*args):
+                POOL_STATS[stat] += 1
+
+            return _listener
+
+        event.listen(engine, "connect", _counter("connections_opened"))
+        event.listen(engine, "checkout", _counter("checkouts"))
+        event.listen(engine, "checkin", _counter("checkins"))
+        event.listen(engine, "invalidate", _counter("invalidated"))
+
+    @contextmanager
+    def begin(self):
+        """Open a transaction on a pooled connection, timing how long the checkout took.
+
+        Yields:
+            SQLAlchemy Connection: Committed on exit, rolled back on error
+        """
+        engine = self.init_db_engine()
+        start = time.perf_counter()
+        with engine.begin() as connection:
+            # Includes any wait for a free connection, the pre-ping and any reconnect
+            elapsed = time.perf_counter() - start
+            POOL_STATS["timed_checkouts"] += 1
+            POOL_STATS["total_checkout_seconds"] += elapsed
+            POOL_STATS["max_checkout_seconds"] = max(POOL_STATS["max_checkout_seconds"], elapsed)
+            yield connection
+
+    def migrate(self, drop_unmatched=False) -> list:
+        """Apply every schema migration not yet recorded in schema_migrations.
+
+        Args:
+            drop_unmatched (Boolean): Let the numeric job ID migration delete legacy
+                rows whose ID cannot be recovered, rather than aborting
+
+        Returns:
+            List: Versions applied by this call
+        """
+        return apply_migrations(self, self.init_db_engine(), drop_unmatched)
+
+    def schema_status(self) -> list:
+        """Return (version, name, applied_at or None) for every known migration."""
+        return migration_status(self.init_db_engine())
+
+    def pool_report(self) -> dict:
+        """Print and return connection pool usage for this process."""
+        summary = {
+            stat: value
+            for stat, value in POOL_STATS.items()
+            if stat not in ("timed_checkouts", "total_checkout_seconds")
+        }
+        summary["mean_checkout_seconds"] = (
+            POOL_STATS["total_checkout_seconds"] / POOL_STATS["timed_checkouts"]
+            if POOL_STATS["timed_checkouts"]
+            else 0.0
+        )
+        print(
+            f"Connection pool: {summary['checkouts']} checkouts, "
+            f"{summary['connections_opened']} connections opened, "
+            f"{summary['invalidated']} invalidated, mean checkout "
+            f"{summary['mean_checkout_seconds'] * 1000:.1f}ms, "
+            f"max {summary['max_checkout_seconds'] * 1000:.1f}ms"
+        )
+        return summary
+
     def upload_to_db(self, jobs):
-        """Use the generated engine to upload a collection of rows to the database
+        """Upload a collection of scraped jobs to the database in one transaction.
+
+        Jobs already stored, e.g. from a retried batch, are skipped rather than failing it.
 
         Args:
             jobs (List): A list of dictionaries of the scraped job details
 
         Returns:
-            SQLAlchemy Cursor object: The output of the given SQL query
+            Int: The number of new rows written
         """
-        engine = self.init_db_engine()
-        with engine.begin() as connection:
-            sql_output = connection.execute(
-                text(
-                    "INSERT INTO bens_jobs (job_id, job_title, company_name, location, job_link, job_description, in_notion) VALUES (:job_id, :job_title, :company_name, :location, :job_link, :job_description, :in_notion)"
-                ),
-                jobs
-            )
-            return sql_output
-
-    def query_db(self, sql_string):
+        return JobRepository(self).upsert_jobs(jobs)
+
+    def query_db(self, sql_string, params=None):
         """Using the SQLALchemy enging, query the database with a given SQL string.
 
         Args:
-            sql_string (String): A fully formatted ready to query SQL string
+            sql_string (String): A ready to query SQL string, optionally
+                containing :named bind parameters
+            params (Dict): Values for any bind parameters in sql_string
 
         Returns:
              SQLAlchemy Cursor object: The output of the given SQL query
         """
-        engine = self.init_db_engine()
-        with engine.begin() as connection:
-            sql_output = connection.execute(text(sql_string))
+        with self.begin() as connection:
+            sql_output = connection.execute(text(sql_string), params or {})
+            if sql_output.returns_rows:
+                # Fetched before commit, SQLite cannot commit with a cursor still open
+                sql_output = sql_output.freeze()()
         return sql_output
+
+
+class BufferedJobWriter:
+    """Bounded write-behind buffer for scraped jobs.
+
+    Jobs are accepted as they are scraped and written to the database in
+    batches, one executemany transaction per batch, every batch_size rows or
+    every flush_interval seconds, whichever comes first. Whatever is left is
+    flushed on close, at interpreter exit, or on SIGTERM/SIGINT.
+    """
+
+    def __init__(
+        self,
+        database_connector,
+        batch_size=25,
+        flush_interval=30.0,
+        max_pending=250,
+        on_flush=None,
+        metrics=None,
+    ) -> None:
+        self.database_connector = database_connector
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        # Failed batches are kept for the next flush, but never more than this many rows
+        self.max_pending = max_pending
+        # Called with each batch once it is safely in the database
+        self.on_flush = on_flush
+        # Optional run_metrics.RunMetrics, each upload is timed as a "db_upload" span
+        self.metrics = metrics
+        self.stats = {"rows_written": 0, "batches": 0, "failed_flushes": 0, "flush_seconds": []}
+        self._buffer = []
+        # Re-entrant, as a signal handler can flush while the main thread holds a lock
+        self._buffer_lock = threading.RLock()
+        self._flush_lock = threading.RLock()
+        # Thread currently inside flush, and a signal that arrived during that flush
+        self._flush_owner = None
+        self._deferred_signal = None
+        self._last_flush = time.monotonic()
+        self._closed = threading.Event()
+        self._timer = threading.Thread(target=self._flush_periodically, daemon=True)
+        self._timer.start()
+        atexit.register(self.close)
+
+    def add(self, job_dict) -> None:
+        """Buffer one scraped job, flushing straight away if the batch is full."""
+        with self._buffer_lock:
+            if len(self._buffer) >= self.max_pending:
+                raise RuntimeError(
+                    f"{len(self._buffer)} jobs are waiting to be written, the database looks unavailable"
+                )
+            self._buffer.append(job_dict)
+            batch_full = len(self._buffer) >= self.batch_size
+        if batch_full:
+            self.flush()
+
+    def flush(self) -> int:
+        """Write everything buffered so far in a single transaction.
+
+        Returns:
+            Int: The number of rows written
+        """
+        with self._flush_lock:
+            self._flush_owner = threading.get_ident()
+            try:
+                written = self._write_buffer()
+            finally:
+                self._flush_owner = None
+        if self._deferred_signal is not None and threading.current_thread() is threading.main_thread():
+            # A signal interrupted this flush, write the rest and hand it on now the batch is safe
+            deferred, self._deferred_signal = self._deferred_signal, None
+            self.flush()
+            self._forward_signal(*deferred)
+        return written
+
+    def _write_buffer(self) -> int:
+        """Helper method. Upload the buffer as one batch, keeping it for the next flush on failure."""
+        with self._buffer_lock:
+            batch, self._buffer = self._buffer, []
+        self._last_flush = time.monotonic()
+        if not batch:
+            return 0
+
+        start = time.perf_counter()
+        try:
+            self.database_connector.upload_to_db(batch)
+        except Exception as e:
+            print("Failed to write batch of", len(batch), "jobs:", repr(e))
+            self.stats["failed_flushes"] += 1
+            with self._buffer_lock:
+                self._buffer[:0] = batch
+            return 0
+        elapsed = time.perf_counter() - start
+        self.stats["flush_seconds"].append(elapsed)
+        if self.metrics is not None:
+            self.metrics.record("db_upload", elapsed)
+        self.stats["rows_written"] += len(batch)
+        self.stats["batches"] += 1
+        print(f"Wrote batch of {len(batch)} jobs to the database")
+        if self.on_flush is not None:
+            self.on_flush(batch)
+        return len(batch)
+
+    def close(self) -> None:
+        """Stop the flush timer and write whatever is left."""
+        # Lets a closed writer be collected, instead of being held until exit to close again
+        atexit.unregister(self.close)
+        if self._closed.is_set():
+            return
+        self._closed.set()
+        if self._timer is not threading.current_thread():
+            self._timer.join()
+        self.flush()
+
+    def install_signal_handlers(self) -> None:
+        """Flush on SIGTERM/SIGINT before handing over to the previous handler.
+
+        Must be called from the main thread.
+        """
+        for signum in (signal.SIGTERM, signal.SIGINT):
+            previous_handler = signal.getsignal(signum)
+
+            def _handler(signum, frame, previous_handler=previous_handler):
+                print("Signal received, flushing buffered jobs")
+                # The timer is never joined here, it may be waiting on a flush this thread holds
+                self._closed.set()
+                if self._flush_owner == threading.get_ident():
+                    # Interrupted this thread's own flush, which finishes up once its batch is written
+                    self._deferred_signal = (signum, frame, previous_handler)
+                    return
+                self.flush()
+                self._forward_signal(signum, frame, previous_handler)
+
+            signal.signal(signum, _handler)
+
+    @staticmethod
+    def _forward_signal(signum, frame, previous_handler) -> None:
+        """Helper method. Hand a signal on to the handler installed before ours."""
+        if callable(previous_handler):
+            previous_handler(signum, frame)
+        else:
+            raise SystemExit(128 + signum)
+
+    def report(self) -> dict:
+        """Print and return rows written, batches and flush latency."""
+        flush_seconds = self.stats["flush_seconds"]
+        summary = {
+            "rows_written": self.stats["rows_written"],
+            "batches": self.stats["batches"],
+            "failed_flushes": self.stats["failed_flushes"],
+            "mean_flush_seconds": sum(flush_seconds) / len(flush_seconds) if flush_seconds else 0.0,
+            "max_flush_seconds": max(flush_seconds, default=0.0),
+        }
+        print(
+            f"Wrote {summary['rows_written']} jobs in {summary['batches']} batches "
+            f"({summary['failed_flushes']} failed flushes), mean flush "
+            f"{summary['mean_flush_seconds']:.3f}s, max {summary['max_flush_seconds']:.3f}s"
+        )
+        return summary
+
+    def _flush_periodically(self) -> None:
+        while not self._closed.wait(min(1.0, self.flush_interval)):
+            if time.monotonic() - self._last_flush >= self.flush_interval:
+                self.flush()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Manage and benchmark the jobs database schema")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    migrate_parser = subparsers.add_parser("migrate", help="Apply pending schema migrations")
+    migrate_parser.add_argument(
+        "--drop-unmatched",
+        action="store_true",
+        help="Delete legacy rows whose job link holds no LinkedIn job ID, instead of aborting",
+    )
+    subparsers.add_parser("status", help="List schema migrations and when they were applied")
+    bench_parser = subparsers.add_parser(
+        "bench", help="Query plans and latencies of the hot queries, before and after the managed schema"
+    )
+    bench_parser.add_argument(
+        "--rows", type=int, nargs="+", default=[10_000, 100_000, 1_000_000]
+    )
+    bench_parser.add_argument(
+        "--configured",
+        action="store_true",
+        help="Run in a throwaway schema on the configured Postgres database instead of scratch SQLite files",
+    )
+    args = parser.parse_args()
+
+    if args.command == "migrate":
+        applied = DatabaseConnector().migrate(args.drop_unmatched)
+        print(f"Applied {len(applied)} migrations" if applied else "Schema is up to date")
+    elif args.command == "status":
+        for version, name, applied_at in DatabaseConnector().schema_status():
+            print(f"{version:>3} {name:<32} {applied_at or 'pending'}")
+    else:
+        bench(DatabaseConnector(), tuple(args.rows), configured=args.configured)
@@ -0,0 +1,95 @@
+import hashlib
+import math
+
+from job_repository import JobRepository
+
+
+class BloomFilter:
+    """Fixed size probabilistic set. Never gives false negatives,
+    gives false positives at roughly the configured error rate.
+    """
+
+    def __init__(self, capacity, error_rate=0.001) -> None:
+        capacity = max(capacity, 1)
+        self.size = math.ceil(-capacity * math.log(error_rate) / (math.log(2) ** 2))
+        self.hash_count = max(1, round(self.size / capacity * math.log(2)))
+        self.bits = bytearray(math.ceil(self.size / 8))
+
+    def _positions(self, item):
+        digest = hashlib.blake2b(str(item).encode("utf-8"), digest_size=16).digest()
+        # Double hashing: derive all k positions from two 64 bit halves
+        first = int.from_bytes(digest[:8], "big")
+        second = int.from_bytes(digest[8:], "big") | 1
+        for i in range(self.hash_count):
+            yield (first + i * second) % self.size
+
+    def add(self, item) -> None:
+        for position in self._positions(item):
+            self.bits[position >> 3] |= 1 << (position & 7)
+
+    def __contains__(self, item) -> bool:
+        return all(
+            self.bits[position >> 3] & (1 << (position & 7))
+            for position in self._positions(item)
+        )
+
+
+class JobIndex:
+    """In-memory index of the job IDs already stored in the database.
+
+    Loaded once per scraper run with a single projected query, so checking a
+    job card costs O(1) with no database round trip. Small tables are held as
+    a plain set. Past max_set_size a Bloom filter is used instead, and only
+    its "maybe" answers are confirmed with a query.
+    """
+
+    def __init__(self, database_connector=None, bloom_filter=None) -> None:
+        self.database_connector = database_connector
+        self.bloom_filter = bloom_filter
+        # Exact IDs: the whole table in set mode, or only this run's IDs in Bloom mode
+        self.job_ids = set()
+
+    @classmethod
+    def load(cls, database_connector, max_set_size=500_000, error_rate=0.001):
+        """Build the index from the bens_jobs table.
+
+        Args:
+            database_connector (DatabaseConnector): Connector to read existing jobs with
+            max_set_size (Int): Row count above which a Bloom filter is used instead of a set
+            error_rate (Float): Target false positive rate of the Bloom filter
+
+        Returns:
+            JobIndex: The loaded index
+        """
+        repository = JobRepository(database_connector)
+        row_count = repository.count()
+        sql_output = repository.iter_ids()
+
+        if row_count > max_set_size:
+            # Leave headroom for the jobs added over the coming runs
+            index = cls(database_connector, BloomFilter(row_count * 2, error_rate))
+            for job_id in sql_output:
+                index.bloom_filter.add(job_id)
+            print(f"Loaded {row_count} existing job IDs into a Bloom filter")
+        else:
+            index = cls(database_connector)
+            index.job_ids = set(sql_output)
+            print(f"Loaded {row_count} existing job IDs into the dedup index")
+        return index
+
+    def add(self, job_id) -> None:
+        """Record a newly scraped job so it is treated as a duplicate from now on."""
+        self.job_ids.add(job_id)
+        if self.bloom_filter is not None:
+            self.bloom_filter.add(job_id)
+
+    def __contains__(self, job_id) -> bool:
+        if job_id in self.job_ids:
+            return True
+        if self.bloom_filter is None or job_id not in self.bloom_filter:
+            return False
+        # Possible false positive, confirm against the database
+        return bool(JobRepository(self.database_connector).existing_ids([job_id]))
+
+    def __len__(self) -> int:
+        return len(self.job_ids)
@@ -0,0 +1,70 @@
+import hashlib
+import zlib
+
+from sqlalchemy.sql import text
+
+# Reposted jobs and agency duplicates share their text, which is only stored once
+INSERT_SQL = """
+INSERT INTO job_descriptions (description_hash, body, raw_bytes)
+VALUES (:description_hash, :body, :raw_bytes)
+ON CONFLICT (description_hash) DO NOTHING
+"""
+
+
+def description_row(description) -> dict:
+    """Build the job_descriptions row for a description, keyed by its SHA-256 hash."""
+    raw = description.encode("utf-8")
+    return {
+        "description_hash": hashlib.sha256(raw).hexdigest(),
+        "body": zlib.compress(raw, 9),
+        "raw_bytes": len(raw),
+    }
+
+
+class DescriptionStore:
+    """Content addressed, zlib compressed job descriptions.
+
+    Each distinct description is stored once in the job_descriptions table,
+    keyed by its SHA-256 hash, and bens_jobs rows reference it by
+    description_hash. Descriptions are only fetched and decompressed when
+    something actually needs the text.
+    """
+
+    def __init__(self, database_connector) -> None:
+        self.database_connector = database_connector
+
+    @staticmethod
+    def put_many(connection, descriptions) -> dict:
+        """Store descriptions inside an open transaction, skipping any already stored.
+
+        Args:
+            connection (SQLAlchemy Connection): Connection with an open transaction
+            descriptions (List): Description strings, None entries are ignored
+
+        Returns:
+            Dict: Each description mapped to its hash
+        """
+        rows = {}
+        for description in descriptions:
+            if description and description not in rows:
+                rows[description] = description_row(description)
+        if rows:
+            connection.execute(text(INSERT_SQL), list(rows.values()))
+        return {description: row["description_hash"] for description, row in rows.items()}
+
+    def get(self, description_hash) -> str | None:
+        """Fetch and decompress a single description.
+
+        Args:
+            description_hash (String): The job row's description_hash
+
+        Returns:
+            String: The description, or None if the job has none
+        """
+        if description_hash is None:
+            return None
+        body = self.database_connector.query_db(
+            "SELECT body FROM job_descriptions WHERE description_hash = :description_hash",
+            {"description_hash": description_hash},
+        ).scalar()
+        return zlib.decompress(bytes(body)).decode("utf-8") if body is not None else None
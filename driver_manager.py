@@ -0,0 +1,209 @@
+import json
+import os
+import subprocess
+import time
+import urllib.parse
+
+from selenium import webdriver
+from selenium.webdriver.firefox.options import Options
+from selenium.webdriver.firefox.service import Service as FirefoxService
+
+from webdriver_manager.firefox import GeckoDriverManager
+
+CACHE_DIR = os.path.expanduser("~/.cache/auto_job_applicator")
+
+# Third party analytics and ad hosts, the scraper only ever reads LinkedIn's own text
+BLOCKED_HOSTS = [
+    "ads.linkedin.com",
+    "px.ads.linkedin.com",
+    "snap.licdn.com",
+    "google-analytics.com",
+    "googletagmanager.com",
+    "doubleclick.net",
+    "bat.bing.com",
+    "connect.facebook.net",
+]
+
+# Firefox preferences that stop heavy resources being fetched at all
+LEAN_PREFERENCES = {
+    # 2 = block all images
+    "permissions.default.image": 2,
+    "gfx.downloadable_fonts.enabled": False,
+    "browser.display.use_document_fonts": 0,
+    # 5 = block autoplay of all audio and video
+    "media.autoplay.default": 5,
+    "media.preload.default": 0,
+    "media.preload.auto": 0,
+    "privacy.trackingprotection.enabled": True,
+    "privacy.trackingprotection.socialtracking.enabled": True,
+    "browser.safebrowsing.malware.enabled": False,
+    "browser.safebrowsing.phishing.enabled": False,
+    "browser.shell.checkDefaultBrowser": False,
+    "datareporting.healthreport.uploadEnabled": False,
+    "toolkit.telemetry.enabled": False,
+}
+
+
+def _blocking_pac_url(blocked_hosts) -> str:
+    """Build a proxy auto-config script that sends blocked hosts to a dead local port."""
+    conditions = " || ".join(f'dnsDomainIs(host, "{host}")' for host in blocked_hosts)
+    pac_script = (
+        "function FindProxyForURL(url, host) {"
+        f" if ({conditions}) {{ return 'PROXY 127.0.0.1:9'; }}"
+        " return 'DIRECT'; }"
+    )
+    return "data:text/plain," + urllib.parse.quote(pac_script)
+
+
+class DriverManager:
+    """Keeps Firefox warm between scraper runs.
+
+    The geckodriver binary is resolved once and its path cached on disk, so
+    later runs never touch the network. Firefox runs against a persistent
+    profile directory, so cache, cookies and local storage survive restarts,
+    and the live driver is handed back out instead of being cold started.
+
+    By default the browser is headless and lean: images, fonts, media and
+    known analytics hosts are blocked, as the scraper only reads text.
+    Pass headless=False and lean=False to watch a full browser when debugging.
+    """
+
+    def __init__(
+        self,
+        headless=True,
+        lean=True,
+        profile_name="firefox_profile",
+        cache_dir=CACHE_DIR,
+    ) -> None:
+        self.headless = headless
+        self.lean = lean
+        self.cache_dir = cache_dir
+        # One profile per concurrent browser, Firefox locks a profile while it is in use
+        self.profile_dir = os.path.join(cache_dir, profile_name)
+        self.driver = None
+        self.browser_pid = None
+        self.start_times = {"cold": [], "warm": []}
+
+    def resolve_driver_path(self) -> str:
+        """Return the geckodriver binary path, only downloading it if the cached one is missing.
+
+        Returns:
+            String: Path to the geckodriver executable
+        """
+        cache_file = os.path.join(self.cache_dir, "geckodriver.json")
+        try:
+            with open(cache_file, "r") as file:
+                cached = json.load(file)
+        except (OSError, ValueError):
+            cached = {}
+        if os.access(cached.get("path", ""), os.X_OK):
+            return cached["path"]
+
+        firefox_driver_install = GeckoDriverManager().install()
+
+        # Get and print the driver version from subprocess version command
+        try:
+            version_output = subprocess.check_output(
+                [firefox_driver_install, "--version"], stderr=subprocess.STDOUT
+            ).decode("utf-8")
+        except Exception as error:
+            print(f"Error fetching FirefoxDriver version: {error}")
+            version_output = None
+        else:
+            print(f"Installed FirefoxDriver version: {version_output}")
+            print("############################")
+
+        os.makedirs(self.cache_dir, exist_ok=True)
+        with open(cache_file, "w") as file:
+            json.dump({"path": firefox_driver_install, "version": version_output}, file)
+        return firefox_driver_install
+
+    def build_options(self) -> Options:
+        """Build the Firefox options, pointing Firefox at the persistent profile."""
+        os.makedirs(self.profile_dir, exist_ok=True)
+        options = Options()
+        options.add_argument("--no-sandbox")
+        if self.headless:
+            options.add_argument("--headless")
+        if self.lean:
+            for preference, value in LEAN_PREFERENCES.items():
+                options.set_preference(preference, value)
+            # 2 = use a proxy auto-config script
+            options.set_preference("network.proxy.type", 2)
+            options.set_preference(
+                "network.proxy.autoconfig_url", _blocking_pac_url(BLOCKED_HOSTS)
+            )
+        else:
+            # The profile persists, so undo any lean preferences a previous run left in it
+            options.set_preference("network.proxy.type", 0)
+            options.set_preference("permissions.default.image", 1)
+        # Used in place, unlike FirefoxProfile which copies into a throwaway temp dir
+        options.add_argument("-profile")
+        options.add_argument(self.profile_dir)
+        return options
+
+    def acquire(self) -> webdriver.Firefox:
+        """Hand out the warm driver if it is still alive, otherwise cold start a new one.
+
+        Returns:
+            webdriver.Firefox: Driver object
+        """
+        start = time.perf_counter()
+        if self._is_alive():
+            self.start_times["warm"].append(time.perf_counter() - start)
+            return self.driver
+
+        self.driver = webdriver.Firefox(
+            service=FirefoxService(self.resolve_driver_path()),
+            options=self.build_options(),
+        )
+        self.browser_pid = self.driver.capabilities.get("moz:processID")
+        self.start_times["cold"].append(time.perf_counter() - start)
+        return self.driver
+
+    def recycle(self, driver) -> webdriver.Firefox:
+        """Reset a driver's page state without restarting the browser.
+
+        Used where the scraper previously tore down and restarted Firefox,
+        e.g. after an unwanted page redirect.
+        """
+        start = time.perf_counter()
+        if driver is self.driver and self._is_alive():
+            driver.get("about:blank")
+            self.start_times["warm"].append(time.perf_counter() - start)
+            return driver
+        return self.acquire()
+
+    def release(self, driver) -> None:
+        """Return a driver to the manager, leaving the browser running for the next run."""
+        if driver is not self.driver:
+            driver.quit()
+
+    def shutdown(self) -> None:
+        """Quit the warm browser for good."""
+        if self.driver is not None:
+            try:
+                self.driver.quit()
+            except Exception as error:
+                print("Error quitting driver:", error)
+        self.driver = None
+        self.browser_pid = None
+
+    def _is_alive(self) -> bool:
+        if self.driver is None:
+            return False
+        try:
+            self.driver.current_url
+        except Exception:
+            self.driver = None
+            return False
+        return True
+
+    def report(self) -> dict:
+        """Print and return the mean cold and warm driver start times in seconds."""
+        summary = {}
+        for kind, times in self.start_times.items():
+            if times:
+                summary[kind] = sum(times) / len(times)
+                print(f"{kind.capitalize()} driver start: {len(times)} starts, mean {summary[kind]:.3f}s")
+        return summary
@@ -0,0 +1,299 @@
+import asyncio
+import functools
+import random
+import re
+import time
+
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+OPENAI_CHAT_URL = "https://api.openai.com/v1/chat/completions"
+# Completion tokens reserved per request before the real usage is known
+COMPLETION_TOKEN_ESTIMATE = 300
+# Never wait longer than this between retries, however many 429s in a row
+MAX_BACKOFF_SECONDS = 60
+
+_DURATION_PART = re.compile(r"(\d+(?:\.\d+)?)(ms|h|m|s)")
+_DURATION_UNITS = {"ms": 0.001, "s": 1, "m": 60, "h": 3600}
+
+
+def parse_reset(value) -> float | None:
+    """Seconds until a rate limit resets, from OpenAI's "1s", "6m0s" or "120ms" header format."""
+    if not value:
+        return None
+    parts = _DURATION_PART.findall(value)
+    if not parts:
+        return None
+    return sum(float(amount) * _DURATION_UNITS[unit] for amount, unit in parts)
+
+
+def estimate_tokens(request_body) -> int:
+    """Rough prompt plus completion tokens of a chat request, at about 4 characters per token."""
+    characters = sum(len(message["content"]) for message in request_body["messages"])
+    return characters // 4 + COMPLETION_TOKEN_ESTIMATE
+
+
+class TokenBucket:
+    """Refills continuously at a per minute rate, holding at most burst_seconds worth."""
+
+    def __init__(self, per_minute, burst_seconds=10) -> None:
+        self.burst_seconds = burst_seconds
+        self.set_rate(per_minute)
+        self.level = self.capacity
+        self.updated = time.monotonic()
+
+    def set_rate(self, per_minute) -> None:
+        self.per_minute = per_minute
+        self.rate = per_minute / 60
+        self.capacity = max(1.0, self.rate * self.burst_seconds)
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self.level = min(self.capacity, self.level + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_time(self, amount) -> float:
+        """Seconds until amount is available, a request larger than the bucket waits for a full one."""
+        self._refill()
+        amount = min(amount, self.capacity)
+        return 0.0 if self.level >= amount else (amount - self.level) / self.rate
+
+    def take(self, amount) -> None:
+        """Remove amount, which may leave the bucket in debt until it refills."""
+        self._refill()
+        self.level -= amount
+
+    def cap(self, remaining) -> None:
+        """Never hold more than the server says is left."""
+        self._refill()
+        self.level = min(self.level, remaining)
+
+
+class RateLimiter:
+    """Requests per minute and tokens per minute buckets, kept in step with the API's own counters.
+
+    The limits start from configuration and are corrected by the
+    x-ratelimit-* headers of every response. A 429 pauses every request, for
+    the server's Retry-After if given, else an exponential backoff with
+    jitter that grows with each consecutive 429.
+    """
+
+    def __init__(self, requests_per_minute, tokens_per_minute) -> None:
+        self.requests = TokenBucket(requests_per_minute)
+        self.tokens = TokenBucket(tokens_per_minute)
+        self.paused_until = 0.0
+        self.consecutive_rate_limits = 0
+        self.waited_seconds = 0.0
+        # Created inside the running event loop, anew for each loop the limiter is used from
+        self._lock = None
+        self._lock_loop = None
+
+    async def acquire(self, tokens) -> None:
+        """Wait until one request of the given size fits in both buckets, then take it.
+
+        Waiters hold the lock while they sleep, so requests go out in arrival order.
+        """
+        loop = asyncio.get_running_loop()
+        if self._lock_loop is not loop:
+            self._lock = asyncio.Lock()
+            self._lock_loop = loop
+        async with self._lock:
+            while True:
+                wait = max(
+                    self.paused_until - time.monotonic(),
+                    self.requests.wait_time(1),
+                    self.tokens.wait_time(tokens),
+                )
+                if wait <= 0:
+                    break
+                self.waited_seconds += wait
+                await asyncio.sleep(wait)
+            self.requests.take(1)
+            self.tokens.take(tokens)
+
+    def settle(self, estimated, actual) -> None:
+        """Correct the token bucket once a response reports the tokens it really used."""
+        self.tokens.take(actual - estimated)
+
+    def update(self, headers) -> None:
+        """Follow the limits and remaining quota reported by the x-ratelimit-* headers."""
+        for bucket, kind in ((self.requests, "requests"), (self.tokens, "tokens")):
+            limit = headers.get(f"x-ratelimit-limit-{kind}")
+            if limit and float(limit) != bucket.per_minute:
+                bucket.set_rate(float(limit))
+            remaining = headers.get(f"x-ratelimit-remaining-{kind}")
+            if remaining is not None:
+                bucket.cap(float(remaining))
+                if float(remaining) < 1:
+                    # Quota is spent, hold everything until the server's window resets
+                    reset = parse_reset(headers.get(f"x-ratelimit-reset-{kind}"))
+                    if reset:
+                        self.paused_until = max(self.paused_until, time.monotonic() + reset)
+
+    def succeeded(self) -> None:
+        self.consecutive_rate_limits = 0
+
+    def backoff(self, headers=None) -> float:
+        """Pause every request after a 429 or server error.
+
+        Returns:
+            Float: Seconds paused
+        """
+        self.consecutive_rate_limits += 1
+        headers = headers or {}
+        if headers.get("retry-after-ms"):
+            delay = float(headers["retry-after-ms"]) / 1000
+        elif headers.get("retry-after"):
+            delay = float(headers["retry-after"])
+        else:
+            delay = min(MAX_BACKOFF_SECONDS, 2 ** self.consecutive_rate_limits)
+            delay *= random.uniform(0.5, 1.0)
+        self.paused_until = max(self.paused_until, time.monotonic() + delay)
+        return delay
+
+
+class EnrichmentEngine:
+    """Gathers OpenAI insights for many jobs at once, as fast as the account's quota allows.
+
+    Up to concurrency requests are in flight at a time, each a blocking
+    requests.post run on a thread pool sized to match. Every request first takes its share
+    of the RateLimiter, so throughput is bounded by the requests and tokens
+    per minute limits rather than by the latency of one request after another.
+    """
+
+    def __init__(
+        self,
+        openai_notion_integration,
+        openai_api_key,
+        requests_per_minute=500,
+        tokens_per_minute=200_000,
+        concurrency=16,
+        max_retries=5,
+        metrics=None,
+    ) -> None:
+        self.openai_notion_integration = openai_notion_integration
+        self.headers = openai_notion_integration.openai_headers(openai_api_key)
+        self.limiter = RateLimiter(requests_per_minute, tokens_per_minute)
+        self.concurrency = concurrency
+        self.max_retries = max_retries
+        # Optional RunMetrics, records the latency of every request
+        self.metrics = metrics
+        self.stats = {
+            "jobs": 0,
+            "enriched": 0,
+            "requests": 0,
+            "rate_limited": 0,
+            "tokens": 0,
+            "seconds": 0.0,
+        }
+
+    def run(self, descriptions, on_result=None) -> dict:
+        """Enrich a batch of descriptions, blocking until every one has a result.
+
+        Args:
+            descriptions (Dict): Job descriptions, keyed by whatever the caller uses to
+                match them back to jobs
+            on_result (Callable): Called as on_result(key, insights) as each one
+                finishes, e.g. to write results back while the rest are in flight.
+                Calls run one at a time on their own thread, off the event loop
+
+        Returns:
+            Dict: Each key mapped to its insights, or None if they could not be gathered
+        """
+        return asyncio.run(self.enrich(descriptions, on_result))
+
+    async def enrich(self, descriptions, on_result=None) -> dict:
+        start = time.perf_counter()
+        loop = asyncio.get_running_loop()
+        semaphore = asyncio.Semaphore(self.concurrency)
+        results = {}
+
+        # The default executor has min(32, cpu_count + 4) threads, which would
+        # silently cap concurrency on a small instance
+        with ThreadPoolExecutor(
+            max_workers=self.concurrency, thread_name_prefix="openai"
+        ) as request_executor, ThreadPoolExecutor(
+            max_workers=1, thread_name_prefix="on_result"
+        ) as callback_executor:
+
+            async def _enrich(key, description):
+                async with semaphore:
+                    insights = await self._request_insights(request_executor, description)
+                results[key] = insights
+                if on_result is not None:
+                    # Callers write to the database here, which must not block the loop
+                    await loop.run_in_executor(callback_executor, on_result, key, insights)
+
+            await asyncio.gather(
+                *(_enrich(key, description) for key, description in descriptions.items())
+            )
+        self.stats["jobs"] += len(descriptions)
+        self.stats["enriched"] += sum(insights is not None for insights in results.values())
+        self.stats["seconds"] += time.perf_counter() - start
+        return results
+
+    async def _request_insights(self, executor, description):
+        """Helper method. Send one description, retrying 429s, server errors and dropped connections."""
+        request_body = self.openai_notion_integration.insights_request(description)
+        estimated = estimate_tokens(request_body)
+        for _ in range(self.max_retries + 1):
+            await self.limiter.acquire(estimated)
+            self.stats["requests"] += 1
+            request_start = time.perf_counter()
+            try:
+                response = await asyncio.get_running_loop().run_in_executor(
+                    executor,
+                    functools.partial(
+                        requests.post,
+                        OPENAI_CHAT_URL,
+                        headers=self.headers,
+                        json=request_body,
+                        timeout=120,
+                    ),
+                )
+            except requests.RequestException as e:
+                print(f"Error: {e}")
+                self.limiter.backoff()
+                continue
+            finally:
+                if self.metrics is not None:
+                    self.metrics.record("openai_request", time.perf_counter() - request_start)
+
+            self.limiter.update(response.headers)
+            if response.status_code == 429 or response.status_code >= 500:
+                if response.status_code == 429:
+                    self.stats["rate_limited"] += 1
+                # Every request waits out the pause in RateLimiter.acquire
+                delay = self.limiter.backoff(response.headers)
+                print(f"OpenAI returned {response.status_code}, backing off {delay:.1f}s")
+                continue
+            # Any other failure, e.g. a bad request, would fail the same way again
+            if response.status_code != 200:
+                print(f"Error: {response.status_code}")
+                print(response.text)
+                return None
+
+            self.limiter.succeeded()
+            body = response.json()
+            used = body.get("usage", {}).get("total_tokens", estimated)
+            self.limiter.settle(estimated, used)
+            self.stats["tokens"] += used
+            return self.openai_notion_integration.parse_insights(body)
+        print(f"Giving up after {self.max_retries + 1} attempts")
+        return None
+
+    def report(self) -> dict:
+        """Print and return the throughput achieved so far."""
+        stats = dict(self.stats)
+        minutes = stats["seconds"] / 60
+        stats["jobs_per_minute"] = stats["jobs"] / minutes if minutes else 0.0
+        stats["tokens_per_minute"] = stats["tokens"] / minutes if minutes else 0.0
+        stats["rate_limit_wait_seconds"] = self.limiter.waited_seconds
+        print(
+            f"Enrichment: {stats['enriched']}/{stats['jobs']} jobs in {stats['seconds']:.1f}s, "
+            f"{stats['jobs_per_minute']:.1f} jobs/min, {stats['tokens_per_minute']:.0f} tokens/min, "
+            f"{stats['requests']} requests, {stats['rate_limited']} rate limited, "
+            f"{stats['rate_limit_wait_seconds']:.1f}s waiting on the limiter"
+        )
+        return stats
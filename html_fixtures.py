@@ -0,0 +1,164 @@
+import json
+import os
+import threading
+import urllib.parse
+
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+
+# Copies the live page without any of LinkedIn's scripts, which cannot run offline
+SNAPSHOT_PAGE_SCRIPT = """
+var clone = document.documentElement.cloneNode(true);
+clone.querySelectorAll('script, noscript, link[rel=preload], link[rel=modulepreload]')
+    .forEach(function (element) { element.remove(); });
+return '<!DOCTYPE html>' + clone.outerHTML;
+"""
+
+# The details pane, as recorded here and as captured for parse_job_html by Scraper
+SNAPSHOT_DETAILS_SCRIPT = """
+var pane = document.querySelector('.jobs-search__job-details--container, .jobs-details');
+return pane ? pane.outerHTML : null;
+"""
+
+# Stands in for LinkedIn's own scripts on a replayed search page: swaps in the
+# recorded details pane when a card is clicked, and follows the pager buttons
+REPLAY_SCRIPT = """
+<script>
+document.addEventListener('click', function (event) {
+    var card = event.target.closest('[data-occludable-job-id]');
+    if (card) {
+        event.preventDefault();
+        var jobId = card.getAttribute('data-occludable-job-id');
+        fetch('/fixtures/jobs/' + jobId + '.html')
+            .then(function (response) {
+                // A card that was never recorded leaves the pane as it is, the scraper times it out
+                return response.ok ? response.text() : null;
+            })
+            .then(function (html) {
+                var pane = document.querySelector(
+                    '.jobs-search__job-details--container, .jobs-details'
+                );
+                if (html === null || !pane) {
+                    console.warn('No recorded details for job ' + jobId);
+                    return;
+                }
+                pane.outerHTML = html;
+                var params = new URLSearchParams(window.location.search);
+                params.set('currentJobId', jobId);
+                history.replaceState(null, '', '/jobs/search/?' + params.toString());
+            });
+        return;
+    }
+    var pageButton = event.target.closest("button[aria-label^='Page ']");
+    if (pageButton) {
+        event.preventDefault();
+        var page = pageButton.getAttribute('aria-label').slice(5);
+        window.location.href = '/jobs/search/?page=' + page;
+        return;
+    }
+    if (event.target.closest('a')) {
+        event.preventDefault();
+    }
+}, true);
+</script>
+"""
+
+
+class FixtureRecorder:
+    """Saves the search results and job details HTML the browser sees during a live scrape,
+    so the same pages can be replayed offline by FixtureServer.
+
+    Layout of the fixtures directory:
+        search_<page>.html   Full results page, scripts stripped
+        jobs/<job_id>.html   Details pane for each clicked card
+        manifest.json        The job IDs recorded for each page
+    """
+
+    def __init__(self, fixtures_dir) -> None:
+        self.fixtures_dir = fixtures_dir
+        self.manifest = {"pages": []}
+        os.makedirs(os.path.join(fixtures_dir, "jobs"), exist_ok=True)
+
+    def record_search_page(self, driver) -> None:
+        """Snapshot the current results page once all its cards have rendered."""
+        self.manifest["pages"].append([])
+        page_number = len(self.manifest["pages"])
+        self._write(f"search_{page_number}.html", driver.execute_script(SNAPSHOT_PAGE_SCRIPT))
+        self._write_manifest()
+
+    def record_job(self, driver, card_job_id) -> None:
+        """Snapshot the details pane currently showing the given card."""
+        html = driver.execute_script(SNAPSHOT_DETAILS_SCRIPT)
+        if not card_job_id or html is None:
+            return
+        self._write(os.path.join("jobs", f"{card_job_id}.html"), html)
+        self.manifest["pages"][-1].append(card_job_id)
+        self._write_manifest()
+
+    def _write(self, relative_path, html) -> None:
+        with open(os.path.join(self.fixtures_dir, relative_path), "w", encoding="utf-8") as file:
+            file.write(html)
+
+    def _write_manifest(self) -> None:
+        with open(os.path.join(self.fixtures_dir, "manifest.json"), "w") as file:
+            json.dump(self.manifest, file, indent=2)
+
+
+class FixtureServer:
+    """Serves recorded fixtures from a local HTTP server, standing in for LinkedIn.
+
+    /jobs/search/?page=N serves search_N.html with REPLAY_SCRIPT injected,
+    /fixtures/<path> serves the raw recorded files.
+    """
+
+    def __init__(self, fixtures_dir, port=0) -> None:
+        self.fixtures_dir = os.path.abspath(fixtures_dir)
+        fixtures_dir = self.fixtures_dir
+
+        class _Handler(SimpleHTTPRequestHandler):
+            def __init__(self, *args, **kwargs):
+                super().__init__(*args, directory=fixtures_dir, **kwargs)
+
+            def do_GET(self):
+                parsed = urllib.parse.urlparse(self.path)
+                if parsed.path.rstrip("/") == "/jobs/search":
+                    page = urllib.parse.parse_qs(parsed.query).get("page", ["1"])[0]
+                    return self._serve_search_page(page)
+                if parsed.path.startswith("/fixtures/"):
+                    self.path = parsed.path[len("/fixtures"):]
+                    return super().do_GET()
+                self.send_error(404)
+
+            def _serve_search_page(self, page):
+                search_path = os.path.join(fixtures_dir, f"search_{int(page)}.html")
+                if not os.path.exists(search_path):
+                    return self.send_error(404)
+                with open(search_path, "r", encoding="utf-8") as file:
+                    html = file.read()
+                html = html.replace("</body>", REPLAY_SCRIPT + "</body>", 1)
+                body = html.encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "text/html; charset=utf-8")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        self.httpd = ThreadingHTTPServer(("127.0.0.1", port), _Handler)
+        self._thread = None
+
+    @property
+    def url(self) -> str:
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self) -> str:
+        """Serve in a background thread. Returns the URL of the first search page."""
+        self._thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return f"{self.url}/jobs/search/?page=1"
+
+    def stop(self) -> None:
+        self.httpd.shutdown()
+        self.httpd.server_close()
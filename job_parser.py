@@ -0,0 +1,118 @@
+import re
+import urllib.parse
+
+import lxml.html
+
+BLOCK_TAGS = {"p", "div", "li", "ul", "ol", "h1", "h2", "h3", "h4", "section", "tr"}
+
+# LinkedIn's numeric job ID, as it appears in job links, search URLs and URNs
+JOB_ID_PATTERNS = (
+    re.compile(r"^\s*(\d+)\s*$"),
+    re.compile(r"/jobs/view/(?:[^/?#]*-)?(\d+)"),
+    re.compile(r"[?&]currentJobId=(\d+)"),
+    re.compile(r"urn:li:(?:fs_normalized_)?jobPosting:(\d+)"),
+)
+
+
+def parse_job_id(value) -> int | None:
+    """Extract LinkedIn's numeric job ID from a card data attribute, job link or URN.
+
+    Args:
+        value (String): e.g. "3912345678", ".../jobs/view/3912345678/?refId=..."
+            or "urn:li:jobPosting:3912345678"
+
+    Returns:
+        Int: The job ID, or None if value does not contain one
+    """
+    if value is None:
+        return None
+    if isinstance(value, int):
+        return value
+    for pattern in JOB_ID_PATTERNS:
+        match = pattern.search(str(value))
+        if match:
+            return int(match.group(1))
+    return None
+
+
+def _has_class(class_name) -> str:
+    """XPath predicate matching elements carrying the given CSS class."""
+    return f"contains(concat(' ', normalize-space(@class), ' '), ' {class_name} ')"
+
+
+def _visible_text(element) -> str:
+    """Approximate the rendered innerText Selenium returns, keeping line breaks
+    between block elements instead of running their text together.
+    """
+    parts = []
+
+    def _break():
+        if parts and not parts[-1].endswith("\n"):
+            parts.append("\n")
+
+    def _walk(node):
+        if node.tag == "br":
+            parts.append("\n")
+        elif isinstance(node.tag, str) and node.tag in BLOCK_TAGS:
+            _break()
+        if node.text and isinstance(node.tag, str):
+            parts.append(node.text)
+        for child in node:
+            _walk(child)
+            if child.tail:
+                parts.append(child.tail)
+        if isinstance(node.tag, str) and node.tag in BLOCK_TAGS:
+            _break()
+
+    _walk(element)
+    lines = [re.sub(r"[ \t\xa0]+", " ", line).strip() for line in "".join(parts).split("\n")]
+    return re.sub(r"\n{3,}", "\n\n", "\n".join(lines)).strip()
+
+
+def _first(tree, xpath):
+    matches = tree.xpath(xpath)
+    return matches[0] if matches else None
+
+
+def parse_job_html(html, base_url="https://www.linkedin.com") -> dict:
+    """Parse the captured outerHTML of the job details pane into the same
+    fields Scraper.scrape_job reads from the live page.
+
+    Runs in a separate process, so it must not touch the browser.
+
+    Args:
+        html (String): outerHTML of the job details pane
+        base_url (String): Used to make relative job links absolute
+
+    Returns:
+        Dict: job_id, job_title, company_name, location, job_link, job_description
+            and posted_date, each None if it was not found
+    """
+    tree = lxml.html.fromstring(html)
+
+    title = _first(tree, f".//*[{_has_class('job-details-jobs-unified-top-card__job-title')}]")
+    company = _first(
+        tree, f".//*[{_has_class('job-details-jobs-unified-top-card__company-name')}]/a[1]"
+    )
+    location = _first(
+        tree,
+        f".//*[{_has_class('job-details-jobs-unified-top-card__primary-description-container')}]"
+        f"//*[{_has_class('tvm__text')}]",
+    )
+    link = _first(
+        tree,
+        f".//*[{_has_class('job-details-jobs-unified-top-card__job-title')}]//a/@href"
+        " | .//h1//a/@href",
+    )
+    description = _first(tree, f".//div[{_has_class('jobs-description__content')}]")
+    posted_date = _first(tree, ".//time/@datetime")
+
+    return {
+        "job_id": parse_job_id(str(link)) if link else None,
+        "job_title": _visible_text(title) if title is not None else None,
+        "company_name": _visible_text(company) if company is not None else None,
+        "location": _visible_text(location) if location is not None else None,
+        "job_link": urllib.parse.urljoin(base_url, str(link)) if link else None,
+        "job_description": _visible_text(description) if description is not None else None,
+        "posted_date": str(posted_date) if posted_date else None,
+    }
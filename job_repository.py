@@ -0,0 +1,247 @@
+import json
+
+from sqlalchemy import bindparam
+from sqlalchemy.sql import text
+
+from description_store import DescriptionStore
+
+# Columns every job row is inserted with, in this order
+JOB_COLUMNS = (
+    "job_id",
+    "job_title",
+    "company_name",
+    "location",
+    "job_link",
+    "description_hash",
+    "duplicate_of",
+    "posted_date",
+)
+
+# A job moves scraped -> enriched -> scored -> published, one stage at a time.
+# After max_attempts failures at a stage it is parked as failed
+SCRAPED = "scraped"
+ENRICHED = "enriched"
+SCORED = "scored"
+PUBLISHED = "published"
+FAILED = "failed"
+PIPELINE_STATES = (SCRAPED, ENRICHED, SCORED, PUBLISHED, FAILED)
+
+# Statements are built once, so SQLAlchemy's compiled statement cache is hit on every call
+_INSERT = (
+    f"INSERT INTO bens_jobs ({', '.join(JOB_COLUMNS)}, state_changed_at) "
+    f"VALUES ({', '.join(':' + column for column in JOB_COLUMNS)}, CURRENT_TIMESTAMP) "
+)
+INSERT_JOBS = text(_INSERT + "ON CONFLICT (job_id) DO NOTHING")
+# Rescraping a job refreshes its fields but never moves it back through the pipeline,
+# or out of the near duplicate cluster it joined when first stored. LinkedIn drops the
+# posted date once a job has been viewed, so a rescrape never clears a known one
+UPSERT_JOBS = text(
+    _INSERT
+    + "ON CONFLICT (job_id) DO UPDATE SET "
+    + ", ".join(
+        f"{column} = EXCLUDED.{column}"
+        for column in JOB_COLUMNS
+        if column not in ("job_id", "duplicate_of", "posted_date")
+    )
+    + ", posted_date = COALESCE(EXCLUDED.posted_date, bens_jobs.posted_date)"
+)
+EXISTING_IDS = text("SELECT job_id FROM bens_jobs WHERE job_id IN :job_ids").bindparams(
+    bindparam("job_ids", expanding=True)
+)
+ALL_IDS = text("SELECT job_id FROM bens_jobs")
+COUNT = text("SELECT COUNT(*) FROM bens_jobs")
+# Only the columns the pipeline stages need, descriptions are fetched one at a time by
+# description_hash. Both are served in job_id order by the bens_jobs_pipeline_state index
+BACKLOG_COLUMNS = (
+    "job_id, job_title, company_name, location, job_link, description_hash, duplicate_of, insights, interest"
+)
+BACKLOG_REPRESENTATIVES = text(
+    f"SELECT {BACKLOG_COLUMNS} FROM bens_jobs "
+    "WHERE pipeline_state = :state AND duplicate_of IS NULL ORDER BY job_id"
+)
+BACKLOG_DUPLICATES = text(
+    f"SELECT {BACKLOG_COLUMNS} FROM bens_jobs "
+    "WHERE pipeline_state = :state AND duplicate_of IS NOT NULL ORDER BY job_id"
+)
+# Transitions only apply to jobs still in the state they leave, so replaying one is harmless
+MARK_ENRICHED = text(
+    f"UPDATE bens_jobs SET insights = :insights, pipeline_state = '{ENRICHED}', attempts = 0, "
+    f"state_changed_at = CURRENT_TIMESTAMP WHERE job_id = :job_id AND pipeline_state = '{SCRAPED}'"
+)
+MARK_SCORED = text(
+    f"UPDATE bens_jobs SET interest = :interest, pipeline_state = '{SCORED}', attempts = 0, "
+    f"state_changed_at = CURRENT_TIMESTAMP WHERE job_id = :job_id AND pipeline_state = '{ENRICHED}'"
+)
+MARK_PUBLISHED = text(
+    f"UPDATE bens_jobs SET pipeline_state = '{PUBLISHED}', attempts = 0, "
+    f"state_changed_at = CURRENT_TIMESTAMP WHERE job_id IN :job_ids AND pipeline_state = '{SCORED}'"
+).bindparams(bindparam("job_ids", expanding=True))
+MARK_FAILED = text(
+    "UPDATE bens_jobs SET attempts = attempts + 1, state_changed_at = CURRENT_TIMESTAMP, "
+    f"pipeline_state = CASE WHEN attempts + 1 >= :max_attempts THEN '{FAILED}' ELSE pipeline_state END "
+    f"WHERE job_id IN :job_ids AND pipeline_state NOT IN ('{PUBLISHED}', '{FAILED}')"
+).bindparams(bindparam("job_ids", expanding=True))
+INSIGHTS = text(
+    "SELECT job_id, insights FROM bens_jobs WHERE job_id IN :job_ids AND insights IS NOT NULL"
+).bindparams(bindparam("job_ids", expanding=True))
+
+
+def _chunks(values, size):
+    values = list(values)
+    for start in range(0, len(values), size):
+        yield values[start : start + size]
+
+
+class JobRepository:
+    """Every read and write of bens_jobs, as bound parameter statements.
+
+    Bulk methods take whole collections of jobs or job IDs and make one
+    batched statement per chunk_size IDs, instead of one statement per job.
+    """
+
+    def __init__(self, database_connector, chunk_size=1000, max_attempts=3) -> None:
+        self.database_connector = database_connector
+        # IDs per IN (...) list, keeps each statement well under driver parameter limits
+        self.chunk_size = chunk_size
+        # Failures at one stage before a job is parked as failed
+        self.max_attempts = max_attempts
+
+    def upsert_jobs(self, jobs, update=False) -> int:
+        """Insert scraped jobs in one transaction, with their descriptions and near duplicate clusters.
+
+        Args:
+            jobs (List): Job dicts, as built by Scraper.scrape_job
+            update (Boolean): Overwrite the scraped fields of jobs already stored,
+                rather than leaving them untouched
+
+        Returns:
+            Int: The number of rows inserted or updated
+        """
+        if not jobs:
+            return 0
+        with self.database_connector.begin() as connection:
+            # Descriptions are stored once per content hash, the job row references it
+            description_hashes = DescriptionStore.put_many(
+                connection, [job["job_description"] for job in jobs]
+            )
+            duplicates = self.database_connector.near_duplicate_index.assign(connection, jobs)
+            rows = [
+                {
+                    **{column: job.get(column) for column in JOB_COLUMNS},
+                    "description_hash": description_hashes.get(job["job_description"]),
+                    "duplicate_of": duplicates.get(job["job_id"]),
+                }
+                for job in jobs
+            ]
+            sql_output = connection.execute(UPSERT_JOBS if update else INSERT_JOBS, rows)
+        return sql_output.rowcount
+
+    def existing_ids(self, job_ids) -> set:
+        """Return which of the given job IDs are already stored."""
+        existing = set()
+        with self.database_connector.begin() as connection:
+            for chunk in _chunks(set(job_ids), self.chunk_size):
+                existing.update(
+                    job_id for (job_id,) in connection.execute(EXISTING_IDS, {"job_ids": chunk})
+                )
+        return existing
+
+    def count(self) -> int:
+        with self.database_connector.begin() as connection:
+            return connection.execute(COUNT).scalar()
+
+    def iter_ids(self):
+        """Yield every stored job ID, streamed rather than loaded all at once."""
+        with self.database_connector.begin() as connection:
+            result = connection.execution_options(stream_results=True).execute(ALL_IDS)
+            for (job_id,) in result:
+                yield job_id
+
+    def iter_backlog(self, state, chunk_size=500):
+        """Yield the jobs waiting in a pipeline state in chunks, cluster representatives first.
+
+        Rows are streamed through a server side cursor, chunk_size at a time,
+        so memory stays bounded however large the backlog is and the first
+        chunk arrives without waiting for the rest. Descriptions are not
+        included, fetch them by description_hash with DescriptionStore.
+
+        Args:
+            state (String): One of PIPELINE_STATES
+            chunk_size (Int): Rows fetched from the cursor per chunk
+
+        Yields:
+            List: Up to chunk_size job dicts, with their insights decoded
+        """
+        # Duplicates are only queried once every representative has been handed out,
+        # so a caller that saves as it goes finds the representatives' insights stored
+        for statement in (BACKLOG_REPRESENTATIVES, BACKLOG_DUPLICATES):
+            with self.database_connector.begin() as connection:
+                result = (
+                    connection.execution_options(stream_results=True)
+                    .execute(statement, {"state": state})
+                    .yield_per(chunk_size)
+                )
+                for chunk in result.partitions():
+                    jobs = [dict(row._mapping) for row in chunk]
+                    for job in jobs:
+                        if job["insights"] is not None:
+                            job["insights"] = json.loads(job["insights"])
+                    yield jobs
+
+    def mark_enriched(self, insights_by_job_id) -> None:
+        """Store the OpenAI insights gathered for scraped jobs and move them to enriched."""
+        self._transition(
+            MARK_ENRICHED,
+            [
+                {"job_id": job_id, "insights": json.dumps(insights)}
+                for job_id, insights in insights_by_job_id.items()
+            ],
+        )
+
+    def mark_scored(self, interest_by_job_id) -> None:
+        """Store the interest calculated for enriched jobs and move them to scored."""
+        self._transition(
+            MARK_SCORED,
+            [
+                {"job_id": job_id, "interest": interest}
+                for job_id, interest in interest_by_job_id.items()
+            ],
+        )
+
+    def mark_published(self, job_ids) -> int:
+        """Move scored jobs that were sent to Notion to published, in one statement per chunk."""
+        updated = 0
+        with self.database_connector.begin() as connection:
+            for chunk in _chunks(job_ids, self.chunk_size):
+                updated += connection.execute(MARK_PUBLISHED, {"job_ids": chunk}).rowcount
+        return updated
+
+    def mark_failed(self, job_ids) -> int:
+        """Count a failed attempt at each job's next stage, parking it as failed after max_attempts.
+
+        The job otherwise stays in its state, so the stage retries it on the next run.
+        """
+        updated = 0
+        with self.database_connector.begin() as connection:
+            for chunk in _chunks(job_ids, self.chunk_size):
+                updated += connection.execute(
+                    MARK_FAILED, {"job_ids": chunk, "max_attempts": self.max_attempts}
+                ).rowcount
+        return updated
+
+    def insights_for(self, job_ids) -> dict:
+        """Return the stored insights of whichever of the given jobs have them."""
+        insights = {}
+        with self.database_connector.begin() as connection:
+            for chunk in _chunks(set(job_ids), self.chunk_size):
+                for job_id, stored in connection.execute(INSIGHTS, {"job_ids": chunk}):
+                    insights[job_id] = json.loads(stored)
+        # Failed enrichments used to be stored as null
+        return {job_id: value for job_id, value in insights.items() if value is not None}
+
+    def _transition(self, statement, rows) -> None:
+        """Helper method. Move a batch of jobs on in one executemany."""
+        if not rows:
+            return
+        with self.database_connector.begin() as connection:
+            connection.execute(statement, rows)
@@ -1,60 +1,160 @@
-import pickle
+import multiprocessing
 import re
-import subprocess
-import time
 import traceback
+import urllib.parse
+
+from concurrent.futures import ProcessPoolExecutor
 
 from selenium import webdriver
 from selenium.webdriver.common.by import By
 from selenium.webdriver.common.keys import Keys
 from selenium.common.exceptions import TimeoutException
-from selenium.webdriver.firefox.options import Options
-from selenium.webdriver.firefox.service import Service as FirefoxService
 from selenium.webdriver.support import expected_conditions as EC
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.remote.webelement import WebElement
 
-from webdriver_manager.firefox import GeckoDriverManager
+from checkpoint import ScrapeCheckpoint
+from db_utils import BufferedJobWriter, DatabaseConnector
+from dedup_index import JobIndex
+from driver_manager import DriverManager
+from html_fixtures import SNAPSHOT_DETAILS_SCRIPT
+from job_parser import parse_job_html, parse_job_id
+from run_metrics import RunMetrics
+from session_store import SessionStore
+from readiness import (
+    ReadinessWaiter,
+    details_pane_shows,
+    document_ready,
+    network_idle,
+)
+
+# LinkedIn shows 25 job cards per results page, paged with the "start" URL parameter
+RESULTS_PER_PAGE = 25
+
+CHECKPOINT_PATH = "scrape_checkpoint.json"
+
+# Per-run JSON timing reports and the Prometheus text file are written here
+METRICS_DIR = "metrics"
+
+JOBS_SEARCH_URL = "https://www.linkedin.com/jobs/search/"
+
+# Map dynamically inputted filters to corresponding CSS IDs.
+# The number after the dash doubles as the value of the filter's URL parameter
+EXPERIENCE_MAPPING = {
+    "Internship": "experience-1",
+    "Entry level": "experience-2",
+    "Associate": "experience-3",
+    "Mid-Senior level": "experience-4",
+    "Directory": "experience-5",
+    "Executive": "experience-6",
+}
+
+WORKPLACE_TYPE_MAPPING = {
+    "On-site": "workplaceType-1",
+    "Remote": "workplaceType-2",
+    "Hybrid": "workplaceType-3",
+}
 
-from db_utils import DatabaseConnector
+# Pulls every field out of the job details pane in a single WebDriver round trip
+JOB_DETAILS_SCRIPT = """
+var pane = document.querySelector('.jobs-search__job-details--container, .jobs-details');
+if (!pane) {
+    return null;
+}
+function text(selector) {
+    var element = pane.querySelector(selector);
+    return element ? element.innerText.trim() : null;
+}
+var titleLink = pane.querySelector(
+    '.job-details-jobs-unified-top-card__job-title a, h1 a'
+);
+var locationWrapper = pane.querySelector(
+    '.job-details-jobs-unified-top-card__primary-description-container'
+);
+var location = locationWrapper ? locationWrapper.querySelector('.tvm__text') : null;
+var postedTime = pane.querySelector('time') || document.querySelector(
+    '.jobs-search-results-list__list-item--active time, .job-card-container--clicked time'
+);
+return {
+    job_title: text('.job-details-jobs-unified-top-card__job-title'),
+    company_name: text('.job-details-jobs-unified-top-card__company-name > a:nth-child(1)'),
+    location: location ? location.innerText.trim() : null,
+    job_link: titleLink ? titleLink.href : null,
+    job_description: text('div.jobs-description__content'),
+    posted_date: postedTime ? postedTime.getAttribute('datetime') : null
+};
+"""
 
+# Reads a job card's identity without opening its details pane
+CARD_SUMMARY_SCRIPT = """
+var card = arguments[0];
+var holder = card.querySelector('[data-job-id]');
+var title = card.querySelector('a.job-card-list__title, .job-card-list__title');
+var link = card.querySelector("a[href*='/jobs/view/']");
+var company = card.querySelector(
+    '.artdeco-entity-lockup__subtitle, .job-card-container__primary-description, '
+    + '.job-card-container__company-name'
+);
+return {
+    card_job_id: card.getAttribute('data-occludable-job-id')
+        || (holder ? holder.getAttribute('data-job-id') : null),
+    job_link: link ? link.href : null,
+    job_title: title ? title.innerText.trim() : null,
+    company_name: company ? company.innerText.trim() : null
+};
+"""
 
 class Scraper:
     """Scraper class containing all requisite methods to log in to, 
     then scrape specific tailored jobs from LinkedIn
     """
 
-    def __init__(self) -> None:
+    def __init__(
+        self,
+        politeness_floor=0.5,
+        headless=True,
+        lean=True,
+        session_store=None,
+        profile_name="firefox_profile",
+        incremental_stop_after=None,
+    ) -> None:
         self.database_connector = DatabaseConnector()
+        # Keeps one warm Firefox alive across retries instead of cold starting each time
+        self.driver_manager = DriverManager(
+            headless=headless, lean=lean, profile_name=profile_name
+        )
+        # Saved login sessions, safe to share between processes in a ScraperPool
+        self.session_store = session_store or SessionStore()
+        # Loaded once per run in login_session, replaces a DB query per job card
+        self.job_index = None
+        # Job IDs of every card handled this session, so overlapping
+        # searches never pay for the same card's details twice
+        self.seen_card_ids = set()
+        self.card_stats = {"cards": 0, "cross_query_duplicates": 0}
+        # Incremental mode: sort by most recent and stop paginating after
+        # this many already stored jobs in a row. None scrapes everything
+        self.incremental_stop_after = incremental_stop_after
+        self._known_run = 0
+        self._stop_paging = False
+        # Set to a checkpoint.ScrapeCheckpoint to make runs resumable
+        self.checkpoint = None
+        # Set to an html_fixtures.FixtureRecorder to save every page seen for offline replay
+        self.recorder = None
+        # Minimum seconds between browser actions, however quickly the DOM is ready
+        self.waiter = ReadinessWaiter(politeness_floor=politeness_floor)
+        # Per-stage timing spans for the whole run, see run_metrics.RunMetrics
+        self.metrics = RunMetrics()
 
     def get_driver(self) -> webdriver.Firefox:
-        """Install and build the latest version of the Selenium Firefox driver.
+        """Get a Selenium Firefox driver, reusing the warm one if it is still running.
 
         Returns:
             webdriver.Firefox: Driver object
         """
-        firefox_driver_install = GeckoDriverManager().install()
-
-        # Get and print the driver version from subprocess version command
-        try:
-            version_output = subprocess.check_output(
-                [firefox_driver_install, "--version"], stderr=subprocess.STDOUT
-            ).decode("utf-8")
-        except Exception as error:
-            print(f"Error fetching FirefoxDriver version: {error}")
-        else:
-            print(f"Installed FirefoxDriver version: {version_output}")
-            print("############################")
-
-        # Build Firefox driver
-        options = Options()
-        options.add_argument("--no-sandbox")
-        driver = webdriver.Firefox(
-            service=FirefoxService(firefox_driver_install), options=options
-        )
-        return driver
+        with self.metrics.span("driver_start"):
+            return self.driver_manager.acquire()
 
-    def catch_page_redirect(self, driver, url) -> None:
+    def catch_page_redirect(self, driver, url) -> webdriver.Firefox:
         """Checks whether the page loaded by the driver is correct.
 
         Often dynamic websites will redirect from a given URL to
@@ -64,45 +164,51 @@ class Scraper:
         Args:
             driver (webdriver.Firefox): Driver object
             url (String): The website URL
+
+        Returns:
+            webdriver.Firefox: The driver sitting on the correct page,
+                which is a new one if the old browser had died
         """
         counter = 0
-        while counter <= 10:
-            print("Checking we're on the correct page...")
-            if driver.current_url == url:
-                print("We are!")
-                break
-            else:
-                print("Page redirect has occurred. Restarting driver.")
-                counter += 1
-                driver.quit()
-                time.sleep(5)
-                driver = self.get_driver()
-                time.sleep(5)
-                driver.get(url)
-                time.sleep(5)
+        with self.metrics.span("redirect_check"):
+            while counter <= 10:
+                print("Checking we're on the correct page...")
+                # Any client side redirect has happened by the time the page is loaded
+                self.waiter.settle(driver, document_ready, "page_load")
+                if driver.current_url == url:
+                    print("We are!")
+                    break
+                else:
+                    print("Page redirect has occurred. Recycling driver.")
+                    counter += 1
+                    driver = self.driver_manager.recycle(driver)
+                    driver.get(url)
+        return driver
     
-    def load_cookies(self, driver) -> bool:
-        """Load webpage cookies from external cookies pickle file.
+    def load_cookies(self, driver, email, cookies=None) -> bool:
+        """Load the account's saved session cookies from the session store into the browser.
 
         Args:
-            driver (webdriver.Firefox): Driver object
+            driver (webdriver.Firefox): Driver object, sitting on a linkedin.com page
+            email (String): The account whose session to load
+            cookies (List): Cookies already read from the store, saves reading it again
 
         Returns:
             Boolean: Denotes whether the cookies have loaded or not
         """
         print("Attempting to load cookies to bypass full sign in")
-        cookies = pickle.load(
-            open(
-                "/Users/benmorton/Desktop/project_files/auto_job_applicator/cookies.pkl",
-                "rb",
-            )
-        )
-        for cookie in cookies:
-            try:
-                driver.add_cookie(cookie)
-            except Exception as error:
-                print("Failed to load cookie. Error: ", error)
+        with self.metrics.span("cookie_load"):
+            if cookies is None:
+                cookies = self.session_store.load(email)
+            if not cookies:
+                print("No saved session cookies")
                 return False
+            for cookie in cookies:
+                try:
+                    driver.add_cookie(cookie)
+                except Exception as error:
+                    print("Failed to load cookie. Error: ", error)
+                    return False
         print("Cookies loaded")
         return True
     
@@ -110,11 +216,10 @@ class Scraper:
         """Procedure to log into LinkedIn with given credentials, as follows:
 
         1. Close Google signin modal
-        2. Load cookies from external pickle file
-        3. Click sign in button
-        4. Proceed to enter log in credentials and sign in
-        5. Check for day ruining verification captcha (immediately ends whole script)
-        6. Load fresh cookies into pickle file for next run
+        2. Click sign in button
+        3. Proceed to enter log in credentials and sign in
+        4. Check for day ruining verification captcha (immediately ends whole script)
+        5. Save fresh cookies into the session store for next run
 
         Args:
             driver (_type_): _description_
@@ -125,6 +230,7 @@ class Scraper:
         self._close_google_modal(driver)
         self._interact_with_element(driver, By.LINK_TEXT, "Sign in", "click")
 
+        name_element = None
         try:
             name_element = driver.find_element(By.CLASS_NAME, "profile__identity")
         except:
@@ -141,17 +247,11 @@ class Scraper:
             return False
         
         print("Successfully signed in!")
-        # Get cookies and save into a pickle file
-        cookies = driver.get_cookies()
-        with open(
-            "/Users/benmorton/Desktop/project_files/auto_job_applicator/cookies.pkl",
-            "wb",
-        ) as file:
-            pickle.dump(cookies, file)
+        # Get cookies and save them for the next run, and for other scraper processes
+        self.session_store.save(email, driver.get_cookies())
         return True
     
-    @staticmethod
-    def _close_google_modal(driver) -> None:
+    def _close_google_modal(self, driver) -> None:
         """Helper method to close the Google sign in modal, 
         
         because it blocks the actual LinkedIn sign in button
@@ -165,12 +265,15 @@ class Scraper:
             ).click()
         except:
             print("Could not find Google Sign in modal")
+            driver.switch_to.default_content()
         else:
             print("Closing Google Sign in modal")
             # Switch back to the main page driver context (not the iframe)
-            time.sleep(10)
-        finally:
             driver.switch_to.default_content()
+            # The modal is gone once its iframe has been detached from the page
+            self.waiter.settle(
+                driver, EC.staleness_of(google_modal_iframe), "google_modal_close", 10
+            )
 
     def _interact_with_element(self, driver, selector, locator, input) -> WebElement:
         """Helper method to use Selenium explicit Wait to select a given element.
@@ -233,15 +336,17 @@ class Scraper:
                     )
                 )
             )
-        time.sleep(3)
+        self.waiter.polite()
         jobs_search_bar.click()
         if jobs_search_bar is None:
-            driver.quit()
+            self.driver_manager.release(driver)
             return False
         
-        time.sleep(5)
         jobs_search_bar.send_keys(preferred_job_title)
         jobs_search_bar.send_keys(Keys.ENTER)
+        self.waiter.settle(driver, network_idle(), "search_results")
+        if self.incremental_stop_after:
+            self._sort_by_most_recent(driver)
 
     def set_job_filters(self, driver, job_filters):
         """Select and choose the given filters:
@@ -266,11 +371,18 @@ class Scraper:
                     f"//*[@id='{filter_mapping[choice]}']/following-sibling::label[1]"
                 )
                 try:
-                    element = WebDriverWait(driver, 30).until(
-                        EC.element_to_be_clickable((By.XPATH, dynamic_xpath))
-                    )
-                    element.click()
-                    time.sleep(5)
+                    with self.metrics.span("filter_click"):
+                        element = WebDriverWait(driver, 30).until(
+                            EC.element_to_be_clickable((By.XPATH, dynamic_xpath))
+                        )
+                        element.click()
+                        # The label click has registered once its checkbox is ticked
+                        self.waiter.until(
+                            driver,
+                            EC.element_located_to_be_selected((By.ID, filter_mapping[choice])),
+                            "filter_choice",
+                            10,
+                        )
                 except Exception as e:
                     print("Could not select filter for", filter, "-", choice)
                     print("Attempted XPATH:\n", dynamic_xpath)
@@ -281,44 +393,66 @@ class Scraper:
                         EC.element_to_be_clickable((By.XPATH, show_result_xpath))
                     )
                 element.click()
+            self.waiter.settle(driver, network_idle(), "filter_results")
 
-        # Map dynamically inputted filters to corresponding CSS IDs
-        experience_mapping = {
-            "Internship": "experience-1",
-            "Entry level": "experience-2",
-            "Associate": "experience-3",
-            "Mid-Senior level": "experience-4",
-            "Directory": "experience-5",
-            "Executive": "experience-6",
-        }
         experience_show_result_xpath = "/html/body/div[7]/div[3]/div[4]/section/div/section/div/div/div/ul/li[4]/div/div/div/div[1]/div/form/fieldset/div[2]/button[2]/span"
 
-        workplace_type_mapping = {
-            "On-site": "workplaceType-1",
-            "Remote": "workplaceType-2",
-            "Hybrid": "workplaceType-3",
-        }
         workplace_type_show_result_xpath = "/html/body/div[7]/div[3]/div[4]/section/div/section/div/div/div/ul/li[7]/div/div/div/div[1]/div/form/fieldset/div[2]/button[2]/span"
 
         try:
             _chosen_filters_loop(
-                "experience", experience_mapping, experience_show_result_xpath
+                "experience", EXPERIENCE_MAPPING, experience_show_result_xpath
             )
             print("Setting", job_filters["experience"], "for experience")
-            time.sleep(5)
         except:
             print("Could not set experience filter")
             traceback.print_exc()
         try:
             _chosen_filters_loop(
-                "workplaceType", workplace_type_mapping, workplace_type_show_result_xpath
+                "workplaceType", WORKPLACE_TYPE_MAPPING, workplace_type_show_result_xpath
             )
             print("Setting", job_filters["workplaceType"], "for workplace type")
-            time.sleep(5)
         except:
             print("Could not set workplace type filter")
             traceback.print_exc()
 
+    def search_by_url(self, driver, preferred_job_title, job_filters) -> None:
+        """Load filtered search results directly from the search URL,
+        skipping the search bar and filter dropdown clicks.
+
+        Args:
+            driver (webdriver.Firefox): Firefox driver object
+            preferred_job_title (String): Job title to search for
+            job_filters (Dict): Dictionary of user-defined job filters to apply
+        """
+        query = {"keywords": preferred_job_title}
+        for parameter, filter, filter_mapping in (
+            ("f_E", "experience", EXPERIENCE_MAPPING),
+            ("f_WT", "workplaceType", WORKPLACE_TYPE_MAPPING),
+        ):
+            values = [filter_mapping[choice].split("-")[1] for choice in job_filters.get(filter, [])]
+            if values:
+                query[parameter] = ",".join(values)
+        if self.incremental_stop_after:
+            # DD = date posted, newest first
+            query["sortBy"] = "DD"
+        with self.metrics.span("search"):
+            driver.get(JOBS_SEARCH_URL + "?" + urllib.parse.urlencode(query))
+            self.waiter.settle(driver, network_idle(), "search_results")
+
+    def _sort_by_most_recent(self, driver) -> None:
+        """Helper method. Reload the current search sorted by "Most recent"."""
+        self._set_search_params(driver, sortBy="DD")
+
+    def _set_search_params(self, driver, **params) -> None:
+        """Helper method. Reload the current search with the given URL parameters set."""
+        url = urllib.parse.urlparse(driver.current_url)
+        query = urllib.parse.parse_qs(url.query)
+        for parameter, value in params.items():
+            query[parameter] = [value]
+        driver.get(url._replace(query=urllib.parse.urlencode(query, doseq=True)).geturl())
+        self.waiter.settle(driver, network_idle(), "search_results")
+
     def scrape_page(self, driver) -> list:
         """One by one, scrape all the jobs from a page.
 
@@ -328,21 +462,173 @@ class Scraper:
         Returns:
             list: A list of the scraped jobs from one page
         """
-        jobs = []
-        job_ids = []
-        # Get and count each of the individual job_card containers
-        job_cards = WebDriverWait(driver, 30).until(
-            EC.presence_of_all_elements_located(
-                (By.CLASS_NAME, "jobs-search-results__list-item")
-            )
-        )
+        jobs = list(self.iter_page_jobs(driver))
+        print("Scraped " + str(len(jobs)) + " new jobs.")
+        return jobs
+
+    def iter_jobs(self, driver, max_pages=None):
+        """Walk every results page of the current search, yielding new jobs as they are scraped.
+
+        Only one page of job cards is held at a time, so memory stays flat
+        however many pages the search has.
+
+        Args:
+            driver (webdriver.Firefox): Driver object
+            max_pages (Int): Stop after this many pages. None walks all of them
+
+        Yields:
+            job_dict Dict: A dictionary containing the details of a single job
+        """
+        for page_number in self._walk_pages(driver, max_pages):
+            yield from self.iter_page_jobs(driver, page_number)
+
+    def iter_jobs_captured(self, driver, max_pages=None, parse_workers=None):
+        """Capture-then-parse mode of iter_jobs.
+
+        The browser only clicks each card and captures the details pane's
+        outerHTML. Parsing happens in a pool of processes, so browser time per
+        card is just click plus capture, and parsing scales with CPU cores.
+
+        Args:
+            driver (webdriver.Firefox): Driver object
+            max_pages (Int): Stop after this many pages. None walks all of them
+            parse_workers (Int): Number of parser processes. None uses every core
+
+        Yields:
+            job_dict Dict: A dictionary containing the details of a single job
+        """
+        pending = []
+        with ProcessPoolExecutor(
+            max_workers=parse_workers, mp_context=multiprocessing.get_context("spawn")
+        ) as executor:
+            for page_number in self._walk_pages(driver, max_pages):
+                last_index = None
+                for last_index, card_job_id, html in self._capture_page(driver, page_number):
+                    pending.append((card_job_id, executor.submit(parse_job_html, html)))
+                    # Hand over whatever has finished parsing without holding up the browser
+                    yield from self._collect_parsed_jobs(pending, block=False)
+                if self.checkpoint is not None and last_index is not None:
+                    # Parse results arrive out of order, so checkpoint whole pages only
+                    yield from self._collect_parsed_jobs(pending, block=True)
+                    self.checkpoint.advance(page_number, last_index)
+            yield from self._collect_parsed_jobs(pending, block=True)
+
+    def _capture_page(self, driver, page_number):
+        """Helper method. Click each card on the current page, yielding its index,
+        job ID and details pane HTML.
+        """
+        start_index = self.checkpoint.resume_index(page_number) if self.checkpoint else 0
+        for index, job_card in enumerate(self._load_all_job_cards(driver)):
+            if index < start_index:
+                continue
+            card_summary = self._card_summary(driver, job_card)
+            card_job_id = card_summary["card_job_id"]
+            if self._known_card(card_summary):
+                if self._stop_paging:
+                    break
+                continue
+            if self._seen_card(card_job_id):
+                continue
+            try:
+                with self.metrics.span("card_click"):
+                    job_card.click()
+                    self._wait_for_job_details(driver, card_job_id)
+                with self.metrics.span("capture_html"):
+                    html = driver.execute_script(SNAPSHOT_DETAILS_SCRIPT)
+            except Exception as e:
+                print(f"Error capturing job details: {e}")
+                traceback.print_exc()
+                continue
+            self._mark_card_seen(card_job_id)
+            if html:
+                yield index, card_job_id, html
+
+    def _collect_parsed_jobs(self, pending, block):
+        """Helper method. Turn finished parse results into job dicts, dropping duplicates.
+
+        Args:
+            pending (List): (card job ID, future of a parse_job_html call) pairs,
+                finished ones are removed
+            block (Boolean): Wait for every future rather than only the finished ones
+        """
+        while pending and (block or pending[0][1].done()):
+            card_job_id, future = pending.pop(0)
+            try:
+                details = future.result()
+            except Exception as e:
+                print(f"Error parsing job details: {e}")
+                continue
+            if not details["job_title"]:
+                print("Parsed job is missing its title, skipping")
+                continue
+            details["job_title"] = self._clean_job_title(details["job_title"])
+            job_id = self._validate_new_job(card_job_id or details["job_id"])
+            if not job_id:
+                continue
+            job_dict = self._new_job_dict(job_id, details)
+            self.job_index.add(job_id)
+            if self.checkpoint is not None:
+                self.checkpoint.record_job(job_dict)
+            print(f"Scraped new job: {job_dict['job_title']} at {job_dict['company_name']}")
+            yield job_dict
+
+    def _walk_pages(self, driver, max_pages=None):
+        """Helper method. Yield each page number once the driver is sitting on that page,
+        starting from the checkpointed page when resuming.
+        """
+        page_number = 1
+        self._known_run = 0
+        self._stop_paging = False
+        if self.checkpoint is not None and self.checkpoint.page > 1:
+            page_number = self.checkpoint.page
+            self._jump_to_page(driver, page_number)
+        while True:
+            print(f"Scraping results page {page_number}")
+            yield page_number
+            if self._stop_paging:
+                break
+            if max_pages is not None and page_number >= max_pages:
+                break
+            page_number += 1
+            if not self._go_to_page(driver, page_number):
+                print("No more results pages")
+                break
+        if self.checkpoint is not None:
+            self.checkpoint.mark_complete()
+
+    def iter_page_jobs(self, driver, page_number=1):
+        """One by one, scrape all the jobs from the current page, yielding each new one.
+
+        Args:
+            driver (webdriver.Firefox): Driver object
+            page_number (Int): Which results page this is, used for checkpointing
+
+        Yields:
+            job_dict Dict: A dictionary containing the details of a single job
+        """
+        job_cards = self._load_all_job_cards(driver)
         print("Found " + str(len(job_cards)) + " jobs total. Extracting info now.")
+        # Skip the cards a previous attempt already got through
+        start_index = self.checkpoint.resume_index(page_number) if self.checkpoint else 0
 
         for index, job_card in enumerate(job_cards):
+            if index < start_index:
+                continue
+            card_summary = self._card_summary(driver, job_card)
+            card_job_id = card_summary["card_job_id"]
+            if self._known_card(card_summary):
+                if self._stop_paging:
+                    break
+                continue
+            if self._seen_card(card_job_id):
+                continue
             try:
-                job_card.click()
-                time.sleep(10)
-                job_dict = self.scrape_job(driver, job_card, job_ids)
+                with self.metrics.span("card_click"):
+                    job_card.click()
+                    self._wait_for_job_details(driver, card_job_id)
+                if self.recorder is not None:
+                    self.recorder.record_job(driver, card_job_id)
+                job_dict = self.scrape_job(driver, job_card, card_job_id)
             except TimeoutError:
                 traceback.print_exc()
                 print("Timed out trying to scrape the details of a job.")
@@ -352,71 +638,255 @@ class Scraper:
                 traceback.print_exc()
                 continue
             else:
+                self._mark_card_seen(card_job_id)
                 # If the job already exists in the database or has been scraped in this round
                 if job_dict is None:
+                    if self.checkpoint is not None:
+                        self.checkpoint.advance(page_number, index)
                     continue
-                jobs.append(job_dict)
-                job_ids.append(job_dict["job_id"])
+                self.job_index.add(job_dict["job_id"])
+                if self.checkpoint is not None:
+                    self.checkpoint.record_job(job_dict)
+                    self.checkpoint.advance(page_number, index)
                 print(
-                    str(index + 1)
-                    + ". Scraped new job: "
-                    + job_dict["job_title"]
-                    + " at "
-                    + job_dict["company_name"]
+                    f"{index + 1}. Scraped new job: "
+                    f"{job_dict['job_title']} at {job_dict['company_name']}"
                 )
+                yield job_dict
 
-        print("Scraped " + str(len(jobs)) + " new jobs.")
-        return jobs
+    def _load_all_job_cards(self, driver) -> list:
+        """Helper method. Scroll the lazily rendered results list until every
+        job card on the page has been materialised, then return the cards.
+        """
+        WebDriverWait(driver, 30).until(
+            EC.presence_of_all_elements_located(
+                (By.CLASS_NAME, "jobs-search-results__list-item")
+            )
+        )
+
+        def _all_cards_rendered(driver) -> bool:
+            # LinkedIn only fills in a card's contents once it has been scrolled into view
+            return driver.execute_script(
+                """
+                var cards = document.querySelectorAll('.jobs-search-results__list-item');
+                var pending = 0;
+                cards.forEach(function (card) {
+                    if (!card.querySelector('a.job-card-list__title')) {
+                        card.scrollIntoView({block: 'center'});
+                        pending += 1;
+                    }
+                });
+                return pending === 0;
+                """
+            )
 
-    def scrape_job(self, driver, job_card, job_ids) -> dict | None:
-        """Scrape and format the title, company, location, description and URL from
-            a single listed job.
+        try:
+            self.waiter.until(driver, _all_cards_rendered, "results_list_render", 15)
+        except TimeoutException:
+            print("Some job cards did not render, scraping the ones that did")
+        if self.recorder is not None:
+            self.recorder.record_search_page(driver)
+        return driver.find_elements(By.CLASS_NAME, "jobs-search-results__list-item")
+
+    def _go_to_page(self, driver, page_number) -> bool:
+        """Helper method. Click through to the given results page number.
+
+        Returns:
+            Boolean: False if the page does not exist, I.E. the last page has been scraped
+        """
+        page_buttons = driver.find_elements(
+            By.CSS_SELECTOR, f"button[aria-label='Page {page_number}']"
+        )
+        if not page_buttons:
+            return False
+
+        first_card = driver.find_element(By.CLASS_NAME, "jobs-search-results__list-item")
+        page_buttons[0].click()
+        # The old page's cards are detached once the new page has been rendered
+        self.waiter.settle(driver, EC.staleness_of(first_card), "next_page")
+        self.waiter.settle(driver, network_idle(), "next_page")
+        return True
+
+    def _card_summary(self, driver, job_card) -> dict:
+        """Helper method. Read a card's job ID, title and company in one round trip,
+        without opening its details pane.
+        """
+        self.card_stats["cards"] += 1
+        try:
+            card_summary = driver.execute_script(CARD_SUMMARY_SCRIPT, job_card)
+        except Exception as error:
+            print("Could not read job card summary:", error)
+            card_summary = None
+        if not card_summary:
+            return {
+                "card_job_id": self._card_job_id(job_card),
+                "job_title": None,
+                "company_name": None,
+            }
+        card_summary["card_job_id"] = parse_job_id(card_summary["card_job_id"]) or parse_job_id(
+            card_summary.pop("job_link", None)
+        )
+        return card_summary
+
+    def _known_card(self, card_summary) -> bool:
+        """Helper method. Check whether a card's job is already stored, before clicking it.
+
+        In incremental mode, also flag that paging should stop once enough
+        known jobs in a row have been seen.
+        """
+        job_id = card_summary["card_job_id"]
+        if job_id is None or job_id not in self.job_index:
+            self._known_run = 0
+            return False
+
+        if job_id in self.seen_card_ids:
+            self.card_stats["cross_query_duplicates"] += 1
+        self._known_run += 1
+        if self.incremental_stop_after and self._known_run >= self.incremental_stop_after:
+            print(f"Reached {self._known_run} already stored jobs in a row, stopping early")
+            self._stop_paging = True
+        return True
+
+    def _seen_card(self, card_job_id) -> bool:
+        """Helper method. Check whether a card was already handled this session,
+        e.g. by an earlier overlapping search, before paying to click it.
+        """
+        if card_job_id is not None and card_job_id in self.seen_card_ids:
+            self.card_stats["cross_query_duplicates"] += 1
+            return True
+        return False
+
+    def _mark_card_seen(self, card_job_id) -> None:
+        """Helper method. Only called once a card has been handled, so a failed card is retried."""
+        if card_job_id is not None:
+            self.seen_card_ids.add(card_job_id)
+
+    def _jump_to_page(self, driver, page_number) -> None:
+        """Helper method. Load a results page directly by URL, for resuming part way through."""
+        self._set_search_params(driver, start=str((page_number - 1) * RESULTS_PER_PAGE))
+
+    def _wait_for_job_details(self, driver, card_job_id) -> None:
+        """Helper method. Wait until the details pane shows the clicked card,
+        falling back to network idle when the card carries no job ID.
+        """
+        if card_job_id:
+            self.waiter.until(driver, details_pane_shows(card_job_id), "job_details", 15)
+        else:
+            self.waiter.until(driver, network_idle(), "job_details", 15)
+
+    @staticmethod
+    def _card_job_id(job_card) -> int | None:
+        """Helper method. Read LinkedIn's own numeric job ID from a job card's
+        data attributes, or failing that its job link.
+        """
+        card_job_id = parse_job_id(job_card.get_attribute("data-occludable-job-id"))
+        if card_job_id:
+            return card_job_id
+        for locator, attribute in (
+            ("[data-job-id]", "data-job-id"),
+            ("a[href*='/jobs/view/']", "href"),
+        ):
+            try:
+                card_job_id = parse_job_id(
+                    job_card.find_element(By.CSS_SELECTOR, locator).get_attribute(attribute)
+                )
+            except Exception:
+                continue
+            if card_job_id:
+                return card_job_id
+        return None
+
+    def scrape_job(self, driver, job_card, card_job_id=None) -> dict | None:
+        """Scrape and format the title, company, location, description, URL and
+            posted date from a single listed job.
+
+        All fields come from one bulk script call. The per-field helpers
+        are only used for any field the bulk call could not find.
 
         Args:
             driver (webdriver.Firefox): Driver object
             job_card (Selenium WebElement): The Selenium element containing
                 the HTML for a single job
-            job_ids (List): A cumulative list of the job_ids scraped
-                in this round so far
-            database_connector (Class): The methods needed to connect to and
-                interact with the database
+            card_job_id (Int): The card's LinkedIn job ID, if already read
 
         Returns:
             job_dict Dict: A dictionary containing the details of a single job
         """
-        job_title = self._scrape_job_title(driver)
-        company_name = self._scrape_job_text(
-            driver,
-            ".job-details-jobs-unified-top-card__company-name > a:nth-child(1)",
+        timed = self.metrics.timed
+        details = timed("extract_bulk", self._scrape_job_details_bulk)(driver)
+
+        job_id = self._validate_new_job(
+            card_job_id or self._card_job_id(job_card) or parse_job_id(details.get("job_link"))
         )
-        job_id = self._validate_new_job(job_title, company_name, job_ids)
         # If this job is a duplicate or it already exists in the DB, do not proceed
         if job_id:
             pass
         else:
             return None
 
-        location = self._scrape_job_location(driver)
-        job_link = self._scrape_job_link(driver)
-        job_description = self._scrape_job_text(
-            driver, "div.jobs-description__content"
-        )
+        details["job_title"] = details.get("job_title") or timed(
+            "extract_job_title", self._scrape_job_title
+        )(driver)
+        details["company_name"] = details.get("company_name") or timed(
+            "extract_company_name", self._scrape_job_text
+        )(driver, ".job-details-jobs-unified-top-card__company-name > a:nth-child(1)")
+        details["location"] = details.get("location") or timed(
+            "extract_location", self._scrape_job_location
+        )(driver)
+        details["job_link"] = details.get("job_link") or timed(
+            "extract_job_link", self._scrape_job_link
+        )(driver)
+        details["job_description"] = details.get("job_description") or timed(
+            "extract_job_description", self._scrape_job_text
+        )(driver, "div.jobs-description__content")
+        return self._new_job_dict(job_id, details)
+
+    @staticmethod
+    def _new_job_dict(job_id, details) -> dict:
+        """Helper method. Build the job dict stored in the database from the scraped fields."""
         job_dict = {
             "job_id": job_id,
-            "job_title": job_title,
-            "company_name": company_name,
-            "location": location,
-            "job_link": job_link,
-            "job_description": job_description,
-            "in_notion": False,
+            "job_title": details["job_title"],
+            "company_name": details["company_name"],
+            "location": details.get("location"),
+            "job_link": details.get("job_link"),
+            "job_description": details.get("job_description"),
+            "posted_date": details.get("posted_date"),
         }
         return job_dict
 
+    def _scrape_job_details_bulk(self, driver) -> dict:
+        """Helper method. Extract every field from the details pane in one execute_script call.
+
+        Returns:
+            Dict: The fields found, empty if the pane could not be read at all
+        """
+        try:
+            details = driver.execute_script(JOB_DETAILS_SCRIPT) or {}
+        except Exception as error:
+            print("Bulk job details extraction failed, falling back per field:", error)
+            return {}
+        if details.get("job_title"):
+            details["job_title"] = self._clean_job_title(details["job_title"])
+        missing = [field for field, value in details.items() if not value]
+        if missing:
+            print("Bulk extraction missed", missing)
+        return details
+
     def _scrape_job_title(self, driver) -> str:
         """Helper method. Select job title then use regex to remove the repeating part"""
         job_title_raw = self._scrape_job_text(
             driver, "a.job-card-list__title"
         )
+        return self._clean_job_title(job_title_raw)
+
+    @staticmethod
+    def _clean_job_title(job_title_raw) -> str | None:
+        """Helper method. LinkedIn renders titles twice (once visually hidden), use regex
+        to remove the repeating part
+        """
+        if job_title_raw is None:
+            return None
         match = re.match(r"(.+?)\s*\1.*", job_title_raw)
         if match:
             job_title = match.group(1).strip()
@@ -473,22 +943,21 @@ class Scraper:
         )
         return link
 
-    def _validate_new_job(self, job_title, company_name, job_ids) -> str | bool:
-        """Generate unique job ID and query DB to see if it already exists.
+    def _validate_new_job(self, job_id) -> int | bool:
+        """Check the dedup index to see if a LinkedIn job ID already exists.
         Very often there are duplicate jobs listed.
         """
-        job_id = (job_title + company_name).replace(" ", "_")
-        sql_string = f"SELECT * FROM bens_jobs WHERE job_id = '{job_id}'"
-        sql_output = self.database_connector.query_db(sql_string)
-        row = sql_output.fetchone()
-        # If there is no row in the DB with the given ID, and it has not yet
-        # been scraped this round, then proceed with scraping
-        if (row is None) and (job_id not in job_ids):
+        if job_id is None:
+            print("Could not find the job's LinkedIn ID, skipping")
+            return False
+        # The index holds both the IDs already in the DB and those
+        # scraped this round, so no query is needed per job card
+        if job_id not in self.job_index:
             print("Found new job: ", job_id)
             return job_id
         return False
 
-    def master_scraper(self, email, password, preferred_job_title, job_filters):
+    def master_scraper(self, email, password, preferred_job_title, job_filters, paginate=False):
         """Main method by which to successively run 
         all the other scraper methods in the required order.
 
@@ -497,35 +966,127 @@ class Scraper:
             password (String): User inputted Linkedin password login
             preferred_job_title (String): User inputted job title to search for
             job_filters (List): User inputted preferred job filters
+            paginate (Boolean): Scrape every results page rather than just the first
 
         Returns:
             jobs (List): All the scraped job details
         """
-        driver = self.get_driver()
-        time.sleep(5)
+        if paginate:
+            return list(
+                self.stream_jobs(email, password, preferred_job_title, job_filters)
+            )
 
-        url = "https://www.linkedin.com/"
-        driver.get(url)
+        driver = self._start_session(email, password, preferred_job_title, job_filters)
+        if driver is None:
+            return None
 
-        self.catch_page_redirect(driver, url)
+        jobs_list = self.scrape_page(driver)
 
-        cookies_loaded = self.load_cookies(driver)
-        time.sleep(5)
+        self.driver_manager.release(driver)
+        self.waiter.report()
+        return jobs_list
 
-        login_result = self.login_to_linkedin(driver, email, password, cookies_loaded)
-        if login_result is False:
+    def stream_jobs(
+        self,
+        email,
+        password,
+        preferred_job_title,
+        job_filters,
+        max_pages=None,
+        parse_workers=0,
+    ):
+        """Paginating scraper mode. Same steps as master_scraper, but walks every
+        results page and yields each job as soon as it is scraped, so downstream
+        stages can consume jobs while later pages are still loading.
+
+        Args:
+            email (String): User inputted Linkedin email login
+            password (String): User inputted Linkedin password login
+            preferred_job_title (String): User inputted job title to search for
+            job_filters (List): User inputted preferred job filters
+            max_pages (Int): Stop after this many pages. None walks all of them
+            parse_workers (Int): If set, capture the raw HTML and parse it in this
+                many processes, see iter_jobs_captured
+
+        Yields:
+            job_dict Dict: A dictionary containing the details of a single job
+        """
+        driver = self._start_session(email, password, preferred_job_title, job_filters)
+        if driver is None:
+            return
+        try:
+            if parse_workers:
+                yield from self.iter_jobs_captured(driver, max_pages, parse_workers)
+            else:
+                yield from self.iter_jobs(driver, max_pages)
+        finally:
+            self.driver_manager.release(driver)
+            self.waiter.report()
+
+    def _start_session(self, email, password, preferred_job_title, job_filters):
+        """Helper method. Start the driver, log in, search and set filters.
+
+        Returns:
+            webdriver.Firefox: Driver sitting on the filtered search results,
+                or None if any step failed
+        """
+        driver = self.login_session(email, password)
+        if driver is None:
             return None
-        time.sleep(5)
-        
-        jobs_search_result = self.search_jobs(driver, preferred_job_title)
+
+        with self.metrics.span("search"):
+            jobs_search_result = self.search_jobs(driver, preferred_job_title)
         if jobs_search_result is False:
-            return
+            return None
         self.set_job_filters(driver, job_filters)
+        return driver
 
-        jobs_list = self.scrape_page(driver)
+    def login_session(self, email, password):
+        """Start the driver and log in, ready for any number of searches.
 
-        driver.quit()
-        return jobs_list
+        Returns:
+            webdriver.Firefox: Logged in driver, or None if logging in failed
+        """
+        if self.job_index is None:
+            self.job_index = JobIndex.load(self.database_connector)
+            # Jobs buffered by an earlier attempt are not in the database yet
+            if self.checkpoint is not None:
+                for job_dict in self.checkpoint.jobs:
+                    self.job_index.add(job_dict["job_id"])
+
+        driver = self.get_driver()
+
+        # Most runs still have a valid session, check it without touching the browser
+        cookies = self.session_store.load(email)
+        with self.metrics.span("session_probe"):
+            session_valid = bool(cookies) and self.session_store.probe(cookies)
+        if session_valid:
+            print("Saved session is still valid, skipping login")
+            # Cookies can only be set for the domain the browser is on, robots.txt is the cheapest page
+            driver.get("https://www.linkedin.com/robots.txt")
+            if self.load_cookies(driver, email, cookies):
+                driver.get(JOBS_SEARCH_URL)
+                self.waiter.settle(driver, network_idle(), "post_login")
+                return driver
+        elif cookies:
+            print("Saved session was rejected, logging in again")
+            self.session_store.invalidate(email)
+
+        url = "https://www.linkedin.com/"
+        driver.get(url)
+
+        driver = self.catch_page_redirect(driver, url)
+
+        cookies_loaded = self.load_cookies(driver, email)
+        self.waiter.polite()
+
+        with self.metrics.span("login"):
+            login_result = self.login_to_linkedin(driver, email, password, cookies_loaded)
+        if login_result is False:
+            self.driver_manager.release(driver)
+            return None
+        self.waiter.settle(driver, network_idle(), "post_login")
+        return driver
 
 
 def main(preferred_job_title, job_filters) -> None:
@@ -535,19 +1096,63 @@ def main(preferred_job_title, job_filters) -> None:
     email = creds["LINKEDIN_EMAIL"]
     password = creds["LINKEDIN_PASSWORD"]
 
-    scraper = Scraper()
-    counter = 0
-    while counter < 10:
-        counter += 1
-        jobs = scraper.master_scraper(email, password, preferred_job_title, job_filters)
-        if jobs:
-            break
-    
-    try:
-        database_connector.upload_to_db(jobs)
-        print("Newly scraped jobs uploaded to database!")
-    except Exception as e:
-        print(repr(e))
+    # Set DEBUG_BROWSER in creds.yaml to watch a full, visible browser
+    debug_browser = creds.get("DEBUG_BROWSER", False)
+    # Nightly runs only need the postings added since the last run
+    scraper = Scraper(
+        headless=not debug_browser,
+        lean=not debug_browser,
+        incremental_stop_after=10,
+    )
+    # Each retry carries on from here. The next cron run only keeps the unwritten jobs,
+    # as newest first results have shifted since and the incremental stop is cheap
+    scraper.checkpoint = ScrapeCheckpoint.load(
+        CHECKPOINT_PATH,
+        preferred_job_title,
+        job_filters,
+        resume_position=not scraper.incremental_stop_after,
+    )
+    scraper.job_index = JobIndex.load(database_connector)
+    # Jobs a crashed run scraped but never got into the database
+    unwritten_jobs = [
+        job_dict
+        for job_dict in scraper.checkpoint.jobs
+        if job_dict["job_id"] not in scraper.job_index
+    ]
+    for job_dict in scraper.checkpoint.jobs:
+        scraper.job_index.add(job_dict["job_id"])
+
+    # Jobs are written in batches as they are scraped, and dropped from the
+    # checkpoint once they are safely in the database
+    writer = BufferedJobWriter(
+        database_connector, on_flush=scraper.checkpoint.discard_jobs, metrics=scraper.metrics
+    )
+    writer.install_signal_handlers()
+    with writer:
+        for job_dict in unwritten_jobs:
+            writer.add(job_dict)
+
+        counter = 0
+        while not scraper.checkpoint.complete and counter < 10:
+            counter += 1
+            try:
+                for job_dict in scraper.stream_jobs(
+                    email, password, preferred_job_title, job_filters
+                ):
+                    writer.add(job_dict)
+            except Exception:
+                traceback.print_exc()
+                print("Scrape attempt failed, retrying from the checkpoint")
+        scraper.driver_manager.report()
+        scraper.driver_manager.shutdown()
+
+    writer.report()
+    database_connector.pool_report()
+    scraper.metrics.report()
+    scraper.metrics.export(METRICS_DIR)
+    # Anything the writer could not flush stays in the checkpoint for the next run
+    if scraper.checkpoint.complete and not scraper.checkpoint.jobs:
+        scraper.checkpoint.clear()
 
 
 if __name__ == "__main__":
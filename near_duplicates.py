@@ -0,0 +1,202 @@
+import hashlib
+import random
+import re
+import struct
+
+from sqlalchemy import bindparam
+from sqlalchemy.sql import text
+
+INDEXED_IDS = text(
+    "SELECT job_id FROM job_minhash_signatures WHERE job_id IN :job_ids"
+).bindparams(bindparam("job_ids", expanding=True))
+
+# Mersenne prime above the 32 bit shingle hashes, for the universal hash permutations
+_PRIME = (1 << 61) - 1
+_MAX_HASH = (1 << 32) - 1
+
+
+def shingles(description, size=5) -> set:
+    """Word shingles of a description, ignoring case, punctuation and whitespace."""
+    words = re.findall(r"\w+", description.lower())
+    if len(words) <= size:
+        return {" ".join(words)} if words else set()
+    return {" ".join(words[i : i + size]) for i in range(len(words) - size + 1)}
+
+
+class MinHasher:
+    """MinHash signatures, whose matching positions estimate Jaccard similarity
+    between two descriptions' shingle sets.
+    """
+
+    def __init__(self, num_perm=128, seed=1) -> None:
+        self.num_perm = num_perm
+        generator = random.Random(seed)
+        self.permutations = [
+            (generator.randrange(1, _PRIME), generator.randrange(0, _PRIME))
+            for _ in range(num_perm)
+        ]
+
+    def signature(self, description) -> tuple:
+        hashes = [
+            int.from_bytes(hashlib.blake2b(shingle.encode("utf-8"), digest_size=4).digest(), "big")
+            for shingle in shingles(description)
+        ]
+        if not hashes:
+            return (_MAX_HASH,) * self.num_perm
+        return tuple(
+            min(((a * value + b) % _PRIME) & _MAX_HASH for value in hashes)
+            for a, b in self.permutations
+        )
+
+    @staticmethod
+    def similarity(first, second) -> float:
+        """Estimated Jaccard similarity of the descriptions behind two signatures."""
+        return sum(a == b for a, b in zip(first, second)) / len(first)
+
+    def pack(self, signature) -> bytes:
+        return struct.pack(f">{self.num_perm}I", *signature)
+
+    def unpack(self, body) -> tuple:
+        return struct.unpack(f">{self.num_perm}I", bytes(body))
+
+
+class NearDuplicateIndex:
+    """Clusters near identical postings, e.g. one role posted by several agencies
+    or reposted under a new title, as they are inserted.
+
+    Uses MinHash signatures with LSH banding: the signature is cut into bands,
+    each band hashed to a bucket, and only jobs sharing a bucket are compared.
+    Bucket lookups go through the job_lsh_buckets primary key, so finding
+    candidates stays sub-linear however large bens_jobs grows. A job whose
+    estimated similarity to a candidate reaches threshold joins that
+    candidate's cluster, recorded in bens_jobs.duplicate_of, and only the
+    cluster's representative is sent for enrichment.
+    """
+
+    def __init__(self, threshold=0.8, num_perm=128, bands=16) -> None:
+        if num_perm % bands:
+            raise ValueError("num_perm must be a multiple of bands")
+        self.threshold = threshold
+        self.bands = bands
+        self.rows = num_perm // bands
+        self.minhasher = MinHasher(num_perm)
+
+    def band_hashes(self, signature) -> list:
+        """Bucket of each band of a signature, as signed 64 bit ints to fit a BIGINT."""
+        buckets = []
+        for band in range(self.bands):
+            rows = signature[band * self.rows : (band + 1) * self.rows]
+            digest = hashlib.blake2b(struct.pack(f">{self.rows}I", *rows), digest_size=8).digest()
+            buckets.append(int.from_bytes(digest, "big", signed=True))
+        return buckets
+
+    def find_representative(self, connection, signature, buckets, job_id) -> int | None:
+        """Find the cluster representative of the most similar stored job, if any is similar enough.
+
+        Args:
+            connection (SQLAlchemy Connection): Connection with an open transaction
+            signature (Tuple): MinHash signature of the new job's description
+            buckets (List): band_hashes of that signature
+            job_id (Int): The new job's ID, which never counts as its own duplicate
+
+        Returns:
+            Int: job_id of the representative, or None if the job starts a new cluster
+        """
+        conditions = " OR ".join(
+            f"(band = :band_{band} AND bucket_hash = :bucket_{band})" for band in range(self.bands)
+        )
+        params = {"job_id": job_id}
+        for band, bucket in enumerate(buckets):
+            params[f"band_{band}"] = band
+            params[f"bucket_{band}"] = bucket
+        candidates = connection.execute(
+            text(
+                "SELECT signatures.job_id, signatures.signature, bens_jobs.duplicate_of "
+                "FROM job_minhash_signatures AS signatures "
+                "JOIN bens_jobs ON bens_jobs.job_id = signatures.job_id "
+                "WHERE signatures.job_id <> :job_id AND signatures.job_id IN ("
+                f"SELECT DISTINCT job_id FROM job_lsh_buckets WHERE {conditions})"
+            ),
+            params,
+        ).fetchall()
+
+        best_similarity, representative = 0.0, None
+        for job_id, body, duplicate_of in candidates:
+            similarity = self.minhasher.similarity(signature, self.minhasher.unpack(body))
+            if similarity >= self.threshold and similarity > best_similarity:
+                best_similarity, representative = similarity, duplicate_of or job_id
+        return representative
+
+    def assign(self, connection, jobs) -> dict:
+        """Cluster a batch of jobs before they are inserted, and index them for later batches.
+
+        Jobs earlier in the batch are indexed before later ones are looked
+        up, so duplicates within one batch are clustered too. Jobs indexed
+        already, e.g. by a retried batch or a rescrape, keep their cluster
+        and are left out of the result, as are jobs whose description has no
+        words to compare.
+
+        Args:
+            connection (SQLAlchemy Connection): Connection with an open transaction
+            jobs (List): Job dicts with job_id and job_description
+
+        Returns:
+            Dict: job_id of each duplicate mapped to its cluster representative
+        """
+        duplicates = {}
+        batch = []
+        job_ids = [job["job_id"] for job in jobs if job.get("job_description")]
+        indexed = (
+            {job_id for (job_id,) in connection.execute(INDEXED_IDS, {"job_ids": job_ids})}
+            if job_ids
+            else set()
+        )
+        for job in jobs:
+            if not job.get("job_description") or job["job_id"] in indexed:
+                continue
+            if not shingles(job["job_description"]):
+                # No words, e.g. a "!!!" placeholder, so the signature would match every other such job
+                continue
+            # Guards against the same job twice in one batch too
+            indexed.add(job["job_id"])
+            signature = self.minhasher.signature(job["job_description"])
+            buckets = self.band_hashes(signature)
+            representative = self._find_in_batch(signature, batch, duplicates)
+            if representative is None:
+                representative = self.find_representative(connection, signature, buckets, job["job_id"])
+            if representative is not None:
+                duplicates[job["job_id"]] = representative
+            batch.append((job["job_id"], signature, buckets))
+
+        if batch:
+            connection.execute(
+                text(
+                    "INSERT INTO job_minhash_signatures (job_id, signature) "
+                    "VALUES (:job_id, :signature) ON CONFLICT (job_id) DO NOTHING"
+                ),
+                [
+                    {"job_id": job_id, "signature": self.minhasher.pack(signature)}
+                    for job_id, signature, _ in batch
+                ],
+            )
+            connection.execute(
+                text(
+                    "INSERT INTO job_lsh_buckets (band, bucket_hash, job_id) "
+                    "VALUES (:band, :bucket_hash, :job_id) ON CONFLICT DO NOTHING"
+                ),
+                [
+                    {"band": band, "bucket_hash": bucket, "job_id": job_id}
+                    for job_id, _, buckets in batch
+                    for band, bucket in enumerate(buckets)
+                ],
+            )
+        if duplicates:
+            print(f"Found {len(duplicates)} near duplicate postings in batch of {len(jobs)}")
+        return duplicates
+
+    def _find_in_batch(self, signature, batch, duplicates) -> int | None:
+        """Helper method. Compare against the jobs earlier in the same batch, not yet in the database."""
+        for job_id, other_signature, _ in batch:
+            if self.minhasher.similarity(signature, other_signature) >= self.threshold:
+                return duplicates.get(job_id, job_id)
+        return None
@@ -5,6 +5,16 @@ import time
 import yaml
 
 from auto_job_applicator.db_utils import DatabaseConnector
+from auto_job_applicator.description_store import DescriptionStore
+from auto_job_applicator.enrichment_engine import OPENAI_CHAT_URL, EnrichmentEngine
+from auto_job_applicator.job_repository import ENRICHED, SCORED, SCRAPED, JobRepository
+from auto_job_applicator.run_metrics import RunMetrics
+
+# Pending jobs held in memory at once, overridden by PENDING_CHUNK_SIZE in creds.yaml
+PENDING_CHUNK_SIZE = 500
+# Transitions buffered before they are written back in one batch
+WRITE_BACK_EVERY = 25
+METRICS_DIR = "metrics"
 
 class OpenAINotionIntegration:
 
@@ -14,7 +24,8 @@ class OpenAINotionIntegration:
     def get_job_insights(self, job_description, openai_api_key):
         """Feed a job description and tailored prompt into the OpenAI API.
 
-        To get summarised insights on a specific job.
+        To get summarised insights on a specific job. For a whole backlog use
+        EnrichmentEngine, which sends many of these at once within the rate limits.
 
         Args:
             job_description (String): Full job description scraped from the job page
@@ -24,13 +35,29 @@ class OpenAINotionIntegration:
             result (JSON): JSON object containing the gathered insights
         """
         print("Getting job insights using OpenAI API")
-        url = "https://api.openai.com/v1/chat/completions"
+        response = requests.post(
+            OPENAI_CHAT_URL,
+            headers=self.openai_headers(openai_api_key),
+            json=self.insights_request(job_description),
+        )
+        if response.status_code == 200:
+            time.sleep(5)
+            return self.parse_insights(response.json())
+        else:
+            print(f"Error: {response.status_code}")
+            print(response.text)
 
-        headers = {
+    @staticmethod
+    def openai_headers(openai_api_key) -> dict:
+        return {
             "Content-Type": "application/json",
             "Authorization": f"Bearer {openai_api_key}",
         }
-        data = {
+
+    @staticmethod
+    def insights_request(job_description) -> dict:
+        """Build the chat completion request asking for a job description's insights."""
+        return {
             "model": "gpt-3.5-turbo",
             "messages": [
                 {
@@ -57,14 +84,36 @@ class OpenAINotionIntegration:
             "temperature": 0.2,
         }
 
-        response = requests.post(url, headers=headers, json=data)
-        if response.status_code == 200:
-            result = json.loads(response.json()["choices"][0]["message"]["content"])
-            time.sleep(5)
-            return result
-        else:
-            print(f"Error: {response.status_code}")
-            print(response.text)
+    @staticmethod
+    def parse_insights(response_body):
+        """Decode the insights JSON from a chat completion response body.
+
+        Returns:
+            result (JSON): The insights, or None if the model did not return valid JSON
+        """
+        content = response_body["choices"][0]["message"]["content"]
+        try:
+            insights = json.loads(content)
+        except ValueError:
+            print("Error: insights were not valid JSON")
+            print(content)
+            return None
+        if not OpenAINotionIntegration.valid_insights(insights):
+            print("Error: insights were missing fields")
+            print(content)
+            return None
+        return insights
+
+    @staticmethod
+    def valid_insights(insights) -> bool:
+        """Whether insights have every field that scoring and publishing read, of the right type."""
+        return (
+            isinstance(insights, dict)
+            and isinstance(insights.get("Progressive?"), str)
+            and isinstance(insights.get("Industry"), str)
+            and isinstance(insights.get("Tech stack"), list)
+            and isinstance(insights.get("Required skills"), list)
+        )
 
     def calculate_interest(self, insights, preferred_tech_stack, preferred_industries):
         """Calculate how closely a job description aligns with a given a set of preferences.
@@ -108,24 +157,25 @@ class OpenAINotionIntegration:
         print("Interest: ", interest)
         return interest
 
-    def extract_new_data(self, database_connector):
-        """Extract newly added rows from the AWS RDS database.
+    def extract_new_data(self, database_connector, state=SCRAPED, chunk_size=PENDING_CHUNK_SIZE):
+        """Stream the rows waiting at one pipeline stage from the AWS RDS database.
 
         Args:
             database_connector (DatabaseConnector): The dbutils.DatabaseConnector class instance 
+            state (String): The pipeline state whose backlog to stream
+            chunk_size (Int): Jobs fetched from the database at a time
 
-        Returns:
-            new_jobs (List): A list of the jobs newly added to the database
+        Yields:
+            new_jobs (List): Chunks of the jobs in that state, cluster representatives
+                first. Descriptions are not included, fetch them by description_hash
+                with DescriptionStore
         """
-        print("Querying database for newly added jobs")
-        sql_output = database_connector.query_db(
-            "SELECT * FROM bens_jobs WHERE in_notion = 'FALSE'"
-        )
-        new_jobs = []
-        for row in sql_output:
-            new_jobs.append(dict(row._mapping))
-        print("Found " + str(len(new_jobs)) + " new jobs")
-        return new_jobs
+        print(f"Querying database for {state} jobs")
+        found = 0
+        for new_jobs in JobRepository(database_connector).iter_backlog(state, chunk_size):
+            found += len(new_jobs)
+            print("Found " + str(found) + f" {state} jobs so far")
+            yield new_jobs
 
     def send_to_notion(self, job, insights, notion_api_key):
         """Send jobs extracted from the RDS database to Notion page, 
@@ -138,7 +188,7 @@ class OpenAINotionIntegration:
             notion_api_key (String): Self explanatory
 
         Returns:
-            new_jobs (List): A list of the jobs newly added to the database
+            published (Boolean): Whether the job's Notion page was created
         """
         print("Sending new job to notion")
         headers = {
@@ -216,6 +266,7 @@ class OpenAINotionIntegration:
         else:
             print(f"Error: {new_page_response.status_code}")
             print(new_page_response.text)
+            return False
 
         # PATCH the tech stack and required skills to the specific job page content
         tech_stack = ", ".join(insights["Tech stack"])
@@ -294,40 +345,150 @@ class OpenAINotionIntegration:
     		    }}
             ]
         }}"""
-        new_page_id = new_page_response.json()["id"]
-        block_url = f"https://api.notion.com/v1/blocks/{new_page_id}/children"
-        update_page_response = requests.patch(
-            block_url, headers=headers, data=update_job_payload
-        )
+        # The page already exists, so the job counts as published even if its content failed
+        try:
+            new_page_id = new_page_response.json()["id"]
+            block_url = f"https://api.notion.com/v1/blocks/{new_page_id}/children"
+            update_page_response = requests.patch(
+                block_url, headers=headers, data=update_job_payload
+            )
+        except (requests.RequestException, ValueError, KeyError) as e:
+            print("Error adding the job's tech stack and skills:", repr(e))
+            return True
+        if update_page_response.status_code != 200:
+            print(f"Error: {update_page_response.status_code}")
+            print(update_page_response.text)
+        return True
 
 
 def main():
-    """High level function to create the requisite classes, then run scraping methods."""
+    """High level function to create the requisite classes, then run each pipeline stage on its backlog.
+
+    Each stage only reads jobs in its own state and moves them on when done, so
+    a job is never enriched twice, however late in the pipeline a run fails.
+    """
     database_connector = DatabaseConnector()
     openai_notion_integration = OpenAINotionIntegration()
+    description_store = DescriptionStore(database_connector)
     creds = database_connector.read_creds()
-
-    new_jobs = openai_notion_integration.extract_new_data(database_connector)
-    for job in new_jobs:
-        print("New job: ", job["job_id"])
-        insights = openai_notion_integration.get_job_insights(job["job_description"], creds["OPENAI_API_KEY"])
-        interest = openai_notion_integration.calculate_interest(
-            insights, preferred_tech_stack, preferred_industries
-        )
-        # Add AI insights to job info
-        job["industry"] = insights["Industry"]
-        job["progressive"] = insights["Progressive?"]
-        job["interest"] = interest
-
-        openai_notion_integration.send_to_notion(job, insights, creds["NOTION_API_KEY"])
-
-        # In DB mark job as added to notion
-        job_id = job["job_id"]
-        sql_string = (
-            f"UPDATE bens_jobs SET in_notion = 'TRUE' WHERE job_id = '{job_id}';"
-        )
-        database_connector.query_db(sql_string)
-        print("#############################")
+    job_repository = JobRepository(database_connector, max_attempts=creds.get("MAX_ATTEMPTS", 3))
+    chunk_size = creds.get("PENDING_CHUNK_SIZE", PENDING_CHUNK_SIZE)
+
+    # Transitions are written back in batches rather than a statement per job
+    new_insights = {}
+    published = []
+    failed = []
+
+    def _write_back():
+        job_repository.mark_enriched(new_insights)
+        job_repository.mark_published(published)
+        job_repository.mark_failed(failed)
+        new_insights.clear()
+        published.clear()
+        failed.clear()
+
+    def _buffered():
+        return len(new_insights) + len(published) + len(failed)
+
+    # Enrich: the only paid step, many requests at once within the account's rate limits
+    metrics = RunMetrics("enrichment")
+    enrichment_engine = EnrichmentEngine(
+        openai_notion_integration,
+        creds["OPENAI_API_KEY"],
+        requests_per_minute=creds.get("OPENAI_RPM", 500),
+        tokens_per_minute=creds.get("OPENAI_TPM", 200_000),
+        concurrency=creds.get("OPENAI_CONCURRENCY", 16),
+        metrics=metrics,
+    )
+    try:
+        for new_jobs in openai_notion_integration.extract_new_data(database_connector, SCRAPED, chunk_size):
+            # Representatives' insights are saved before their near duplicates are
+            # reached, then fetched for a whole chunk in one query
+            _write_back()
+            cluster_insights = job_repository.insights_for(
+                {job["duplicate_of"] for job in new_jobs if job["duplicate_of"] is not None}
+            )
+            # One request per cluster, shared by every job of the cluster in this chunk
+            clusters = {}
+            for job in new_jobs:
+                clusters.setdefault(job["duplicate_of"] or job["job_id"], []).append(job)
+
+            def _record(cluster_id, insights):
+                for job in clusters[cluster_id]:
+                    # Copied insights may predate the check in parse_insights
+                    if not openai_notion_integration.valid_insights(insights):
+                        failed.append(job["job_id"])
+                    else:
+                        new_insights[job["job_id"]] = insights
+                if _buffered() >= WRITE_BACK_EVERY:
+                    _write_back()
+
+            descriptions = {}
+            for cluster_id, cluster_jobs in clusters.items():
+                if cluster_id in cluster_insights:
+                    print("Copying insights from near duplicate posting", cluster_id)
+                    _record(cluster_id, cluster_insights[cluster_id])
+                else:
+                    description_hash = next(
+                        (job["description_hash"] for job in cluster_jobs if job["description_hash"]), None
+                    )
+                    # Only fetched and decompressed now it is actually needed
+                    description = description_store.get(description_hash)
+                    if not description:
+                        # Never pay for insights made up from an empty prompt
+                        print("No stored description for job", cluster_id)
+                        failed.extend(job["job_id"] for job in cluster_jobs)
+                        continue
+                    descriptions[cluster_id] = description
+            print(f"Getting job insights for {len(descriptions)} jobs using OpenAI API")
+            enrichment_engine.run(descriptions, on_result=_record)
+    finally:
+        # Also on failure, so insights already paid for are never requested again
+        _write_back()
+        enrichment_engine.report()
+        metrics.report()
+        metrics.export(METRICS_DIR)
+
+    # Score: local and cheap, so a whole chunk moves on in one transition
+    for enriched_jobs in openai_notion_integration.extract_new_data(database_connector, ENRICHED, chunk_size):
+        interests = {}
+        for job in enriched_jobs:
+            # One bad job is counted as a failed attempt, never stops the rest of the run
+            try:
+                interests[job["job_id"]] = openai_notion_integration.calculate_interest(
+                    job["insights"], preferred_tech_stack, preferred_industries
+                )
+            except Exception as e:
+                print("Failed to score job", job["job_id"], repr(e))
+                failed.append(job["job_id"])
+        job_repository.mark_scored(interests)
+        _write_back()
+
+    # Publish
+    try:
+        for scored_jobs in openai_notion_integration.extract_new_data(database_connector, SCORED, chunk_size):
+            for job in scored_jobs:
+                print("Publishing job: ", job["job_id"])
+                try:
+                    insights = job["insights"]
+                    # Add AI insights to job info
+                    job["industry"] = insights["Industry"]
+                    job["progressive"] = insights["Progressive?"]
+                    sent = openai_notion_integration.send_to_notion(job, insights, creds["NOTION_API_KEY"])
+                except Exception as e:
+                    print("Failed to publish job", job["job_id"], repr(e))
+                    sent = False
+                if sent:
+                    published.append(job["job_id"])
+                else:
+                    failed.append(job["job_id"])
+                if _buffered() >= WRITE_BACK_EVERY:
+                    _write_back()
+                print("#############################")
+    finally:
+        # Also on failure, so jobs already in Notion are never sent twice
+        _write_back()
+    database_connector.pool_report()
 
 
 if __name__ == "__main__":
@@ -0,0 +1,157 @@
+import time
+
+from selenium.common.exceptions import TimeoutException
+from selenium.webdriver.support.ui import WebDriverWait
+
+
+class ReadinessWaiter:
+    """Event driven replacement for fixed time.sleep calls.
+
+    Waits on DOM and network idle conditions instead of flat delays,
+    keeps a configurable politeness floor between browser actions,
+    and records how long every wait actually took.
+    """
+
+    def __init__(self, politeness_floor=0.5, default_timeout=30, poll_frequency=0.1) -> None:
+        self.politeness_floor = politeness_floor
+        self.default_timeout = default_timeout
+        self.poll_frequency = poll_frequency
+        self.wait_times = {}
+        self._last_action = 0.0
+
+    def until(self, driver, condition, label, timeout=None):
+        """Block until the given condition is truthy, then apply the politeness floor.
+
+        Args:
+            driver (webdriver.Firefox): Driver object
+            condition (Callable): Takes the driver, returns a truthy value once ready
+            label (String): Name the wait is reported under
+            timeout (Int): Seconds before a TimeoutException is raised
+
+        Returns:
+            The truthy value returned by the condition
+        """
+        start = time.perf_counter()
+        try:
+            result = WebDriverWait(
+                driver,
+                timeout or self.default_timeout,
+                poll_frequency=self.poll_frequency,
+            ).until(condition)
+        finally:
+            self._record(label, time.perf_counter() - start)
+        self.polite()
+        return result
+
+    def settle(self, driver, condition, label, timeout=None):
+        """Like until, for waits that only let the page settle before carrying on.
+
+        A timeout is logged rather than raised, as the fixed sleeps these
+        waits replaced could never fail.
+
+        Returns:
+            The truthy value returned by the condition, or None on timeout
+        """
+        try:
+            return self.until(driver, condition, label, timeout)
+        except TimeoutException:
+            print(f"Timed out waiting for {label}, carrying on")
+            self.polite()
+            return None
+
+    def polite(self) -> None:
+        """Sleep only for whatever is left of the politeness floor since the last action."""
+        remaining = self.politeness_floor - (time.perf_counter() - self._last_action)
+        if remaining > 0:
+            time.sleep(remaining)
+        self._last_action = time.perf_counter()
+
+    def _record(self, label, elapsed) -> None:
+        self.wait_times.setdefault(label, []).append(elapsed)
+
+    def report(self) -> dict:
+        """Print and return count, mean, max and total seconds spent per wait label."""
+        summary = {}
+        print("Readiness wait times:")
+        for label, times in self.wait_times.items():
+            summary[label] = {
+                "count": len(times),
+                "mean": sum(times) / len(times),
+                "max": max(times),
+                "total": sum(times),
+            }
+            print(
+                f"  {label}: {len(times)} waits, mean {summary[label]['mean']:.2f}s, "
+                f"max {summary[label]['max']:.2f}s, total {summary[label]['total']:.2f}s"
+            )
+        return summary
+
+
+def document_ready(driver) -> bool:
+    """Condition: the page has finished parsing and loading its subresources."""
+    return driver.execute_script("return document.readyState") == "complete"
+
+
+# Counts resource entries through a PerformanceObserver, installed once per document.
+# getEntriesByType('resource') stops growing once the 250 entry Resource Timing buffer
+# is full, which a long single page app session reaches quickly
+RESOURCE_COUNT_SCRIPT = """
+if (window.__readinessResourceCount === undefined) {
+    window.__readinessResourceCount = performance.getEntriesByType('resource').length;
+    new PerformanceObserver(function (list) {
+        window.__readinessResourceCount += list.getEntries().length;
+    }).observe({type: 'resource'});
+    // Nothing reads the buffer any more, keep it from filling up
+    performance.clearResourceTimings();
+}
+return window.__readinessResourceCount;
+"""
+
+
+def network_idle(idle_time=0.5):
+    """Condition factory: no new resource requests have started for idle_time seconds.
+
+    Uses resource timing entries as a cheap proxy for in-flight XHR/fetch traffic,
+    which is how LinkedIn re-renders the results list after a search or filter change.
+    """
+    state = {"count": None, "since": None}
+
+    def _condition(driver) -> bool:
+        if not document_ready(driver):
+            return False
+        count = driver.execute_script(RESOURCE_COUNT_SCRIPT)
+        now = time.perf_counter()
+        if count != state["count"]:
+            state["count"] = count
+            state["since"] = now
+            return False
+        return now - state["since"] >= idle_time
+
+    return _condition
+
+
+def details_pane_shows(job_id):
+    """Condition factory: the job details pane has rendered the card with the given ID."""
+
+    def _condition(driver) -> bool:
+        return driver.execute_script(
+            """
+            var jobId = arguments[0];
+            if (window.location.href.indexOf('currentJobId=' + jobId) === -1) {
+                return false;
+            }
+            var pane = document.querySelector(
+                '.jobs-search__job-details--container, .jobs-details'
+            );
+            if (!pane || !pane.querySelector('div.jobs-description__content')) {
+                return false;
+            }
+            return !!pane.querySelector(
+                "a[href*='/jobs/view/" + jobId + "'], [data-job-id='" + jobId + "']"
+            );
+            """,
+            str(job_id),
+        )
+
+    return _condition
+
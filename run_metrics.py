@@ -0,0 +1,157 @@
+import json
+import math
+import os
+import threading
+import time
+
+from contextlib import contextmanager
+
+# Prefix of every exported Prometheus metric name
+METRIC_PREFIX = "linkedin_scraper"
+
+QUANTILES = (0.5, 0.95)
+
+
+def _percentile(ordered, quantile) -> float:
+    """Nearest rank percentile of an already sorted list."""
+    return ordered[max(0, math.ceil(quantile * len(ordered)) - 1)]
+
+
+def _write_atomically(path, content) -> None:
+    # Write then rename, so a reader (e.g. node_exporter) never sees a half written file
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    temp_path = f"{path}.{os.getpid()}.tmp"
+    with open(temp_path, "w") as file:
+        file.write(content)
+    os.replace(temp_path, path)
+
+
+class RunMetrics:
+    """Times named stages of one scraper run and aggregates them into histograms.
+
+    Every span is kept, so the run report can show count, p50, p95, max and
+    total seconds per stage, along with each stage's share of the run's wall
+    time. Written out as a JSON report per run and a Prometheus text format
+    file, for tracking regressions from night to night.
+    """
+
+    def __init__(self, run_name="scraper") -> None:
+        self.run_name = run_name
+        self.started_at = time.time()
+        self._start = time.perf_counter()
+        self.spans = {}
+        # The database writer records its uploads from its own timer thread
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def span(self, stage):
+        """Time the enclosed block under the given stage name, whether or not it raises."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(stage, time.perf_counter() - start)
+
+    def timed(self, stage, function):
+        """Wrap a function so every call is timed as a span of the given stage."""
+
+        def _wrapper(*args, **kwargs):
+            with self.span(stage):
+                return function(*args, **kwargs)
+
+        return _wrapper
+
+    def record(self, stage, seconds) -> None:
+        with self._lock:
+            self.spans.setdefault(stage, []).append(seconds)
+
+    def summary(self) -> dict:
+        """Return count, p50, p95, max and total seconds per stage.
+
+        Returns:
+            Dict: Run details, with a "stages" dictionary keyed by stage name
+        """
+        wall_seconds = time.perf_counter() - self._start
+        with self._lock:
+            spans = {stage: sorted(times) for stage, times in self.spans.items()}
+        stages = {}
+        for stage, ordered in spans.items():
+            total = sum(ordered)
+            stages[stage] = {
+                "count": len(ordered),
+                "p50": _percentile(ordered, 0.5),
+                "p95": _percentile(ordered, 0.95),
+                "max": ordered[-1],
+                "total": total,
+                "share_of_wall_time": total / wall_seconds if wall_seconds else 0.0,
+            }
+        return {
+            "run_name": self.run_name,
+            "started_at": self.started_at,
+            "wall_seconds": wall_seconds,
+            "stages": stages,
+        }
+
+    def report(self) -> dict:
+        """Print and return the summary, slowest stages in total first."""
+        summary = self.summary()
+        print(f"Stage timings ({summary['wall_seconds']:.1f}s wall time):")
+        for stage, stats in sorted(
+            summary["stages"].items(), key=lambda item: item[1]["total"], reverse=True
+        ):
+            print(
+                f"  {stage}: {stats['count']} spans, p50 {stats['p50']:.3f}s, "
+                f"p95 {stats['p95']:.3f}s, max {stats['max']:.3f}s, "
+                f"total {stats['total']:.1f}s ({stats['share_of_wall_time']:.0%})"
+            )
+        return summary
+
+    def write_json(self, path) -> None:
+        """Write the run summary as a JSON report."""
+        _write_atomically(path, json.dumps(self.summary(), indent=2))
+
+    def write_prometheus(self, path) -> None:
+        """Write the run summary in the Prometheus text exposition format,
+        e.g. into node_exporter's textfile collector directory.
+        """
+        summary = self.summary()
+        name = f"{METRIC_PREFIX}_stage_seconds"
+        lines = [
+            f"# HELP {name} Seconds spent per stage of the last scraper run.",
+            f"# TYPE {name} summary",
+        ]
+        for stage, stats in summary["stages"].items():
+            labels = f'run="{self.run_name}",stage="{stage}"'
+            for quantile in QUANTILES:
+                key = f"p{round(quantile * 100)}"
+                lines.append(f'{name}{{{labels},quantile="{quantile}"}} {stats[key]:.6f}')
+            lines.append(f"{name}_sum{{{labels}}} {stats['total']:.6f}")
+            lines.append(f"{name}_count{{{labels}}} {stats['count']}")
+        lines += [
+            f"# HELP {name}_max Longest single span per stage of the last scraper run.",
+            f"# TYPE {name}_max gauge",
+        ]
+        for stage, stats in summary["stages"].items():
+            lines.append(f'{name}_max{{run="{self.run_name}",stage="{stage}"}} {stats["max"]:.6f}')
+        lines += [
+            f"# HELP {METRIC_PREFIX}_run_wall_seconds Wall time of the last scraper run.",
+            f"# TYPE {METRIC_PREFIX}_run_wall_seconds gauge",
+            f'{METRIC_PREFIX}_run_wall_seconds{{run="{self.run_name}"}} {summary["wall_seconds"]:.6f}',
+            f"# HELP {METRIC_PREFIX}_run_started_timestamp_seconds When the last scraper run started.",
+            f"# TYPE {METRIC_PREFIX}_run_started_timestamp_seconds gauge",
+            f'{METRIC_PREFIX}_run_started_timestamp_seconds{{run="{self.run_name}"}} {summary["started_at"]:.0f}',
+        ]
+        _write_atomically(path, "\n".join(lines) + "\n")
+
+    def export(self, metrics_dir) -> None:
+        """Write this run's JSON report, and overwrite the Prometheus file with its metrics.
+
+        Args:
+            metrics_dir (String): Directory for both files. Reports are kept per run,
+                named by start time, the Prometheus file only holds the latest run
+        """
+        started = time.strftime("%Y%m%dT%H%M%S", time.localtime(self.started_at))
+        self.write_json(os.path.join(metrics_dir, f"{self.run_name}_{started}.json"))
+        self.write_prometheus(os.path.join(metrics_dir, f"{self.run_name}.prom"))
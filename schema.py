@@ -0,0 +1,559 @@
+import os
+import random
+import statistics
+import tempfile
+import time
+import zlib
+
+from contextlib import contextmanager
+
+from sqlalchemy import (
+    CHAR,
+    BigInteger,
+    Boolean,
+    Column,
+    DateTime,
+    ForeignKey,
+    Index,
+    Integer,
+    LargeBinary,
+    MetaData,
+    SmallInteger,
+    String,
+    Table,
+    Text,
+    create_engine,
+    event,
+    func,
+    inspect,
+    select,
+)
+from sqlalchemy.sql import false, text
+
+from description_store import DescriptionStore
+from job_repository import SCRAPED
+
+# Managed schema, as created by the first of the versioned MIGRATIONS below.
+# Later migrations evolve it with their own DDL, these definitions never change
+# SQLite only uses the primary key as the rowid, and so as the table's own b-tree, if it is INTEGER
+JOB_ID_TYPE = BigInteger().with_variant(Integer, "sqlite")
+
+metadata = MetaData()
+
+job_descriptions = Table(
+    "job_descriptions",
+    metadata,
+    Column("description_hash", CHAR(64), primary_key=True),
+    Column("body", LargeBinary, nullable=False),
+    Column("raw_bytes", Integer, nullable=False),
+)
+
+bens_jobs = Table(
+    "bens_jobs",
+    metadata,
+    # LinkedIn's numeric job ID, so the per card lookup is a primary key probe
+    Column("job_id", JOB_ID_TYPE, primary_key=True, autoincrement=False),
+    Column("job_title", Text),
+    Column("company_name", Text),
+    Column("location", Text),
+    Column("job_link", Text),
+    Column("description_hash", CHAR(64), ForeignKey("job_descriptions.description_hash")),
+    Column("duplicate_of", JOB_ID_TYPE),
+    Column("insights", Text),
+    Column("in_notion", Boolean, nullable=False, server_default=false()),
+    # Only the few rows still waiting for the Notion sync are indexed
+    Index(
+        "bens_jobs_pending_notion",
+        "job_id",
+        postgresql_where=text("in_notion = FALSE"),
+        sqlite_where=text("in_notion = FALSE"),
+    ),
+    Index("bens_jobs_duplicate_of", "duplicate_of"),
+)
+
+job_minhash_signatures = Table(
+    "job_minhash_signatures",
+    metadata,
+    Column("job_id", JOB_ID_TYPE, primary_key=True, autoincrement=False),
+    Column("signature", LargeBinary, nullable=False),
+)
+
+job_lsh_buckets = Table(
+    "job_lsh_buckets",
+    metadata,
+    Column("band", SmallInteger, primary_key=True, autoincrement=False),
+    Column("bucket_hash", BigInteger, primary_key=True, autoincrement=False),
+    Column("job_id", JOB_ID_TYPE, primary_key=True, autoincrement=False),
+    sqlite_with_rowid=False,
+)
+
+schema_migrations = Table(
+    "schema_migrations",
+    metadata,
+    Column("version", Integer, primary_key=True, autoincrement=False),
+    Column("name", String(100), nullable=False),
+    Column("applied_at", DateTime, nullable=False, server_default=func.now()),
+)
+
+
+def _columns(connection, table_name) -> dict:
+    """Helper function. The live columns of a table, by name."""
+    return {column["name"]: column for column in inspect(connection).get_columns(table_name)}
+
+
+def _create_tables(connector, engine, drop_unmatched) -> None:
+    """Create any missing table. Tables that already exist, e.g. a legacy bens_jobs, are left alone."""
+    with engine.begin() as connection:
+        metadata.create_all(
+            connection,
+            tables=[job_descriptions, bens_jobs, job_minhash_signatures, job_lsh_buckets],
+        )
+
+
+def _boolean_in_notion(connector, engine, drop_unmatched) -> None:
+    """Legacy tables stored in_notion as the strings 'TRUE'/'FALSE', make it a real boolean."""
+    with engine.begin() as connection:
+        column = _columns(connection, "bens_jobs")["in_notion"]
+        if isinstance(column["type"], Boolean):
+            return
+        if engine.dialect.name != "postgresql":
+            raise SystemExit(f"Aborting, cannot convert a legacy in_notion column on {engine.dialect.name}")
+        connection.exec_driver_sql(
+            "ALTER TABLE bens_jobs ALTER COLUMN in_notion TYPE BOOLEAN "
+            "USING UPPER(TRIM(in_notion::TEXT)) IN ('TRUE', 'T', '1')"
+        )
+        connection.exec_driver_sql("ALTER TABLE bens_jobs ALTER COLUMN in_notion SET DEFAULT FALSE")
+        connection.exec_driver_sql("ALTER TABLE bens_jobs ALTER COLUMN in_notion SET NOT NULL")
+
+
+# Postgres regexes matching job_parser.JOB_ID_PATTERNS for the links stored so far
+JOB_LINK_ID_SQL = """
+CAST(COALESCE(
+    substring(job_link from '/jobs/view/(?:[^/?#]*-)?([0-9]+)'),
+    substring(job_link from '[?&]currentJobId=([0-9]+)')
+) AS BIGINT)
+"""
+
+
+def _numeric_job_ids(connector, engine, drop_unmatched) -> None:
+    """Move legacy title+company string IDs to LinkedIn's numeric job IDs, backfilled from job_link.
+
+    Rows sharing an ID keep the one already sent to Notion, else the first
+    stored. The old ID is kept as legacy_job_id.
+    """
+    with engine.begin() as connection:
+        column = _columns(connection, "bens_jobs")["job_id"]
+        if isinstance(column["type"], Integer):
+            return
+        if engine.dialect.name != "postgresql":
+            raise SystemExit(f"Aborting, cannot convert legacy string job IDs on {engine.dialect.name}")
+
+        connection.exec_driver_sql(
+            "ALTER TABLE bens_jobs ADD COLUMN IF NOT EXISTS linkedin_job_id BIGINT"
+        )
+        backfilled = connection.exec_driver_sql(
+            f"UPDATE bens_jobs SET linkedin_job_id = {JOB_LINK_ID_SQL} WHERE linkedin_job_id IS NULL"
+        ).rowcount
+        print(f"Backfilled {backfilled} rows from their job links")
+
+        unmatched = connection.exec_driver_sql(
+            "SELECT job_id, job_link FROM bens_jobs WHERE linkedin_job_id IS NULL"
+        ).fetchall()
+        if unmatched:
+            print(f"{len(unmatched)} rows have no LinkedIn job ID in their job link:")
+            for job_id, job_link in unmatched:
+                print("  ", job_id, job_link)
+            if not drop_unmatched:
+                raise SystemExit("Aborting, rerun with --drop-unmatched to delete these rows")
+            connection.exec_driver_sql("DELETE FROM bens_jobs WHERE linkedin_job_id IS NULL")
+
+        duplicates = connection.exec_driver_sql(
+            """
+            DELETE FROM bens_jobs
+            WHERE ctid IN (
+                SELECT ctid FROM (
+                    SELECT ctid, ROW_NUMBER() OVER (
+                        PARTITION BY linkedin_job_id
+                        ORDER BY in_notion DESC, ctid
+                    ) AS position
+                    FROM bens_jobs
+                ) ranked
+                WHERE position > 1
+            )
+            """
+        ).rowcount
+        print(f"Removed {duplicates} rows duplicating another row's LinkedIn job ID")
+
+        connection.exec_driver_sql("ALTER TABLE bens_jobs DROP CONSTRAINT IF EXISTS bens_jobs_pkey")
+        connection.exec_driver_sql("ALTER TABLE bens_jobs RENAME COLUMN job_id TO legacy_job_id")
+        connection.exec_driver_sql("ALTER TABLE bens_jobs ALTER COLUMN legacy_job_id DROP NOT NULL")
+        connection.exec_driver_sql("ALTER TABLE bens_jobs RENAME COLUMN linkedin_job_id TO job_id")
+        connection.exec_driver_sql("ALTER TABLE bens_jobs ADD PRIMARY KEY (job_id)")
+    # Jobs buffered by an earlier run still carry the old string IDs
+    print("Delete any scrape_checkpoint.json* files left over from before this migration")
+
+
+def _content_addressed_descriptions(connector, engine, drop_unmatched, batch_size=500) -> None:
+    """Move the raw job_description column into the compressed job_descriptions table.
+
+    Backfilled in batches, one transaction each, then the raw column is dropped.
+    """
+    with engine.begin() as connection:
+        columns = _columns(connection, "bens_jobs")
+        if "description_hash" not in columns:
+            connection.exec_driver_sql(
+                "ALTER TABLE bens_jobs ADD COLUMN description_hash CHAR(64) "
+                "REFERENCES job_descriptions (description_hash)"
+            )
+        if "job_description" not in columns:
+            return
+
+    moved = 0
+    while True:
+        with engine.begin() as connection:
+            rows = connection.execute(
+                text(
+                    "SELECT job_id, job_description FROM bens_jobs "
+                    "WHERE description_hash IS NULL AND job_description IS NOT NULL "
+                    "LIMIT :batch_size"
+                ),
+                {"batch_size": batch_size},
+            ).fetchall()
+            if not rows:
+                break
+            description_hashes = DescriptionStore.put_many(
+                connection, [job_description for _, job_description in rows]
+            )
+            connection.execute(
+                text("UPDATE bens_jobs SET description_hash = :description_hash WHERE job_id = :job_id"),
+                [
+                    {"job_id": job_id, "description_hash": description_hashes[job_description]}
+                    for job_id, job_description in rows
+                ],
+            )
+        moved += len(rows)
+        print(f"Moved {moved} descriptions")
+
+    with engine.begin() as connection:
+        connection.exec_driver_sql("ALTER TABLE bens_jobs DROP COLUMN job_description")
+    # Space from the dropped column is only handed back once the table is rewritten
+    print("Dropped bens_jobs.job_description, run VACUUM FULL bens_jobs to reclaim its space")
+
+
+def _near_duplicate_clusters(connector, engine, drop_unmatched, batch_size=200) -> None:
+    """Add the cluster and insights columns, then cluster the jobs already stored, oldest first."""
+    with engine.begin() as connection:
+        columns = _columns(connection, "bens_jobs")
+        if "duplicate_of" not in columns:
+            connection.exec_driver_sql("ALTER TABLE bens_jobs ADD COLUMN duplicate_of BIGINT")
+        if "insights" not in columns:
+            connection.exec_driver_sql("ALTER TABLE bens_jobs ADD COLUMN insights TEXT")
+
+    indexed = clustered = 0
+    while True:
+        with engine.begin() as connection:
+            rows = connection.execute(
+                text(
+                    "SELECT bens_jobs.job_id, job_descriptions.body FROM bens_jobs "
+                    "JOIN job_descriptions USING (description_hash) "
+                    "WHERE bens_jobs.job_id NOT IN (SELECT job_id FROM job_minhash_signatures) "
+                    "ORDER BY bens_jobs.job_id LIMIT :batch_size"
+                ),
+                {"batch_size": batch_size},
+            ).fetchall()
+            if not rows:
+                break
+            jobs = [
+                {"job_id": job_id, "job_description": zlib.decompress(bytes(body)).decode("utf-8")}
+                for job_id, body in rows
+            ]
+            duplicates = connector.near_duplicate_index.assign(connection, jobs)
+            if duplicates:
+                connection.execute(
+                    text("UPDATE bens_jobs SET duplicate_of = :duplicate_of WHERE job_id = :job_id"),
+                    [
+                        {"job_id": job_id, "duplicate_of": duplicate_of}
+                        for job_id, duplicate_of in duplicates.items()
+                    ],
+                )
+        indexed += len(rows)
+        clustered += len(duplicates)
+        print(f"Indexed {indexed} jobs, {clustered} near duplicates so far")
+
+
+def _hot_query_indexes(connector, engine, drop_unmatched) -> None:
+    """Index the Notion sync's pending rows and the near duplicate clusters,
+    then refresh the planner's statistics.
+    """
+    with engine.begin() as connection:
+        for index in bens_jobs.indexes:
+            index.create(connection, checkfirst=True)
+        connection.exec_driver_sql("ANALYZE bens_jobs")
+
+
+def _pipeline_states(connector, engine, drop_unmatched) -> None:
+    """Replace the in_notion flag with the pipeline_state column, and index each stage's backlog.
+
+    Jobs already in Notion are published, jobs with stored insights enriched,
+    and the rest scraped.
+    """
+    with engine.begin() as connection:
+        columns = _columns(connection, "bens_jobs")
+        for column, definition in (
+            ("interest", "SMALLINT"),
+            ("pipeline_state", f"VARCHAR(16) NOT NULL DEFAULT '{SCRAPED}'"),
+            ("attempts", "SMALLINT NOT NULL DEFAULT 0"),
+            ("state_changed_at", "TIMESTAMP"),
+        ):
+            if column not in columns:
+                connection.exec_driver_sql(f"ALTER TABLE bens_jobs ADD COLUMN {column} {definition}")
+        if "in_notion" in columns:
+            # Failed enrichments were stored as a JSON null
+            connection.exec_driver_sql(
+                "UPDATE bens_jobs SET state_changed_at = CURRENT_TIMESTAMP, pipeline_state = CASE "
+                "WHEN in_notion THEN 'published' "
+                "WHEN insights IS NOT NULL AND insights <> 'null' THEN 'enriched' "
+                "ELSE 'scraped' END"
+            )
+            connection.exec_driver_sql("DROP INDEX IF EXISTS bens_jobs_pending_notion")
+            connection.exec_driver_sql("ALTER TABLE bens_jobs DROP COLUMN in_notion")
+        # Each stage reads its backlog as one range of this index, in job_id order
+        connection.exec_driver_sql(
+            "CREATE INDEX IF NOT EXISTS bens_jobs_pipeline_state ON bens_jobs (pipeline_state, job_id)"
+        )
+        connection.exec_driver_sql("ANALYZE bens_jobs")
+
+
+def _posted_dates(connector, engine, drop_unmatched) -> None:
+    """Add the posted_date column, the <time datetime> LinkedIn shows on a job, e.g. "2024-05-01"."""
+    with engine.begin() as connection:
+        if "posted_date" not in _columns(connection, "bens_jobs"):
+            connection.exec_driver_sql("ALTER TABLE bens_jobs ADD COLUMN posted_date TEXT")
+
+
+# (version, name, migration), applied in order and recorded in schema_migrations.
+# Never edit or reorder a released migration, add a new one instead
+MIGRATIONS = (
+    (1, "create_tables", _create_tables),
+    (2, "boolean_in_notion", _boolean_in_notion),
+    (3, "numeric_job_ids", _numeric_job_ids),
+    (4, "content_addressed_descriptions", _content_addressed_descriptions),
+    (5, "near_duplicate_clusters", _near_duplicate_clusters),
+    (6, "hot_query_indexes", _hot_query_indexes),
+    (7, "pipeline_states", _pipeline_states),
+    (8, "posted_dates", _posted_dates),
+)
+
+
+def apply_migrations(connector, engine, drop_unmatched=False) -> list:
+    """Run the pending MIGRATIONS against the given engine, in version order.
+
+    Args:
+        connector (DatabaseConnector): Passed to each migration, e.g. for its near duplicate index
+        engine (SQLAlchemy Engine): Database to migrate, never taken from the connector
+            as SQLite engines are migrated while they are being created
+        drop_unmatched (Boolean): Let the numeric job ID migration delete legacy
+            rows whose ID cannot be recovered, rather than aborting
+
+    Returns:
+        List: Versions applied by this call
+    """
+    with engine.begin() as connection:
+        schema_migrations.create(connection, checkfirst=True)
+        applied = set(connection.execute(select(schema_migrations.c.version)).scalars())
+
+    newly_applied = []
+    for version, name, migration in MIGRATIONS:
+        if version in applied:
+            continue
+        print(f"Applying schema migration {version}: {name}")
+        # Each migration checks the live schema first, so re-running one after a crash is safe
+        migration(connector, engine, drop_unmatched)
+        with engine.begin() as connection:
+            connection.execute(schema_migrations.insert(), {"version": version, "name": name})
+        newly_applied.append(version)
+    return newly_applied
+
+
+def migration_status(engine) -> list:
+    """Return (version, name, applied_at or None) for every known migration."""
+    with engine.begin() as connection:
+        schema_migrations.create(connection, checkfirst=True)
+        applied = dict(
+            connection.execute(
+                select(schema_migrations.c.version, schema_migrations.c.applied_at)
+            ).all()
+        )
+    return [(version, name, applied.get(version)) for version, name, _ in MIGRATIONS]
+
+
+# The hot queries as they were before the managed schema, against a TEXT job key
+# with no index and in_notion stored as a string
+LEGACY_SCHEMA_SQL = (
+    "CREATE TABLE bens_jobs (job_id TEXT, job_title TEXT, company_name TEXT, "
+    "location TEXT, job_link TEXT, in_notion TEXT)"
+)
+BENCH_QUERIES = {
+    "before": {
+        "lookup": "SELECT 1 FROM bens_jobs WHERE job_id = :job_id",
+        "sync": "SELECT job_id, job_title, company_name, location, job_link "
+        "FROM bens_jobs WHERE in_notion = 'FALSE'",
+    },
+    "after": {
+        "lookup": "SELECT job_id FROM bens_jobs WHERE job_id IN (:job_id)",
+        "sync": "SELECT job_id, job_title, company_name, location, job_link, description_hash, "
+        "duplicate_of, insights, interest FROM bens_jobs WHERE pipeline_state = 'scored' ORDER BY job_id",
+    },
+}
+
+
+@contextmanager
+def _bench_engine(connector, configured):
+    """Helper function. An empty throwaway database for one benchmark run, dropped afterwards.
+
+    Either a scratch SQLite file, or a scratch schema on the configured
+    Postgres database. Its connections only search the scratch schema, so
+    the real tables are never read or written.
+    """
+    if not configured:
+        with tempfile.TemporaryDirectory() as scratch_dir:
+            engine = create_engine(f"sqlite:///{os.path.join(scratch_dir, 'bench.sqlite3')}")
+            try:
+                yield engine
+            finally:
+                engine.dispose()
+        return
+
+    configured_engine = connector.init_db_engine()
+    if configured_engine.dialect.name != "postgresql":
+        raise SystemExit("Aborting, --configured needs the rds backend, the default bench already runs on SQLite")
+    scratch_schema = f"bench_{os.getpid()}_{random.randrange(1 << 32):08x}"
+    with configured_engine.begin() as connection:
+        connection.exec_driver_sql(f"CREATE SCHEMA {scratch_schema}")
+    engine = create_engine(configured_engine.url)
+
+    @event.listens_for(engine, "connect")
+    def _search_scratch_schema(dbapi_connection, connection_record):
+        # Outside any transaction, so SQLAlchemy's first rollback cannot undo it
+        autocommit = dbapi_connection.autocommit
+        dbapi_connection.autocommit = True
+        cursor = dbapi_connection.cursor()
+        cursor.execute(f"SET SESSION search_path = {scratch_schema}")
+        cursor.close()
+        dbapi_connection.autocommit = autocommit
+
+    try:
+        yield engine
+    finally:
+        engine.dispose()
+        with configured_engine.begin() as connection:
+            connection.exec_driver_sql(f"DROP SCHEMA {scratch_schema} CASCADE")
+
+
+def bench(
+    connector,
+    row_counts=(10_000, 100_000, 1_000_000),
+    lookups=200,
+    syncs=20,
+    unsynced_share=0.01,
+    configured=False,
+) -> dict:
+    """Compare the hot lookup and sync queries on the legacy and managed schemas.
+
+    Each row count gets two throwaway databases, one per schema. By default
+    they are scratch SQLite files, so the benchmark needs no network, but
+    the plans and latencies are SQLite's. With configured they are scratch
+    schemas on the configured RDS Postgres database instead, giving the
+    production planner's plans.
+
+    Args:
+        connector (DatabaseConnector): Migrates the managed schema's scratch databases
+        row_counts (Tuple): Table sizes to benchmark
+        lookups (Int): Random job ID lookups timed per database
+        syncs (Int): Sync queries timed per database
+        unsynced_share (Float): Share of rows still waiting for the Notion sync
+        configured (Boolean): Benchmark in scratch schemas on the configured Postgres
+            database rather than in scratch SQLite files
+
+    Returns:
+        Dict: Query plans and median/p95 milliseconds, by row count, schema and query
+    """
+    results = {}
+    generator = random.Random(0)
+    for row_count in row_counts:
+        unsynced = set(generator.sample(range(row_count), max(1, int(row_count * unsynced_share))))
+        results[row_count] = {}
+        for schema in ("before", "after"):
+            with _bench_engine(connector, configured) as engine:
+                if schema == "before":
+                    with engine.begin() as connection:
+                        connection.exec_driver_sql(LEGACY_SCHEMA_SQL)
+                    key = lambda i: f"DevOps_Engineer_{i}Company_{i}"
+                    state_column = "in_notion"
+                    state = lambda i: "FALSE" if i in unsynced else "TRUE"
+                else:
+                    apply_migrations(connector, engine)
+                    key = lambda i: 3_900_000_000 + i
+                    state_column = "pipeline_state"
+                    state = lambda i: "scored" if i in unsynced else "published"
+
+                with engine.begin() as connection:
+                    for start in range(0, row_count, 50_000):
+                        connection.execute(
+                            text(
+                                "INSERT INTO bens_jobs "
+                                f"(job_id, job_title, company_name, location, job_link, {state_column}) "
+                                "VALUES (:job_id, :job_title, :company_name, :location, :job_link, :state)"
+                            ),
+                            [
+                                {
+                                    "job_id": key(i),
+                                    "job_title": "DevOps Engineer",
+                                    "company_name": f"Company {i}",
+                                    "location": "London",
+                                    "job_link": f"https://www.linkedin.com/jobs/view/{3_900_000_000 + i}/",
+                                    "state": state(i),
+                                }
+                                for i in range(start, min(start + 50_000, row_count))
+                            ],
+                        )
+                    connection.exec_driver_sql("ANALYZE bens_jobs")
+
+                queries = BENCH_QUERIES[schema]
+                explain = "EXPLAIN QUERY PLAN" if engine.dialect.name == "sqlite" else "EXPLAIN"
+                timings = {"lookup": [], "sync": []}
+                with engine.connect() as connection:
+                    plans = {
+                        query: [
+                            row[-1]
+                            for row in connection.execute(
+                                text(f"{explain} {sql}"), {"job_id": key(0)}
+                            )
+                        ]
+                        for query, sql in queries.items()
+                    }
+                    for _ in range(lookups):
+                        start = time.perf_counter()
+                        connection.execute(
+                            text(queries["lookup"]), {"job_id": key(generator.randrange(row_count))}
+                        ).fetchall()
+                        timings["lookup"].append(time.perf_counter() - start)
+                    for _ in range(syncs):
+                        start = time.perf_counter()
+                        connection.execute(text(queries["sync"])).fetchall()
+                        timings["sync"].append(time.perf_counter() - start)
+
+            results[row_count][schema] = {
+                query: {
+                    "plan": plans[query],
+                    "median_ms": statistics.median(times) * 1000,
+                    "p95_ms": sorted(times)[int(len(times) * 0.95) - 1] * 1000,
+                }
+                for query, times in timings.items()
+            }
+            for query, summary in results[row_count][schema].items():
+                print(
+                    f"{row_count:>9} rows  {schema:<6} {query:<6} median {summary['median_ms']:8.3f}ms  "
+                    f"p95 {summary['p95_ms']:8.3f}ms  plan: {'; '.join(summary['plan'])}"
+                )
+    return results
@@ -0,0 +1,203 @@
+import multiprocessing
+import queue
+import resource
+import time
+import traceback
+
+from db_utils import DatabaseConnector
+from linkedin_scraper_local import Scraper
+from session_store import SessionStore
+
+
+def _peak_rss_mb(pid) -> float | None:
+    """Read the peak resident set size of a process from /proc, in MB (Linux only)."""
+    try:
+        with open(f"/proc/{pid}/status", "r") as status_file:
+            for line in status_file:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) / 1024
+    except (OSError, TypeError):
+        return None
+
+
+def _worker(worker_id, task_queue, result_queue, email, password, session_path, max_pages) -> None:
+    """Worker process. Runs one headless Scraper over search tasks until the queue is drained.
+
+    Every result is sent to the coordinator as a (message_type, worker_id, payload) tuple.
+    """
+    scraper = Scraper(
+        session_store=SessionStore(session_path),
+        profile_name=f"firefox_profile_{worker_id}",
+    )
+    stats = {
+        "worker_id": worker_id,
+        "tasks": 0,
+        "failed_tasks": 0,
+        "jobs": 0,
+        "busy_seconds": 0.0,
+        "browser_peak_rss_mb": None,
+    }
+
+    while True:
+        try:
+            task = task_queue.get_nowait()
+        except queue.Empty:
+            break
+
+        print(f"Worker {worker_id} searching: {task['job_title']} {task['job_filters']}")
+        start = time.perf_counter()
+        try:
+            for job_dict in scraper.stream_jobs(
+                email, password, task["job_title"], task["job_filters"], max_pages
+            ):
+                result_queue.put(("job", worker_id, job_dict))
+                stats["jobs"] += 1
+                # Sampled while the browser is alive, it is gone after shutdown
+                stats["browser_peak_rss_mb"] = max(
+                    stats["browser_peak_rss_mb"] or 0,
+                    _peak_rss_mb(scraper.driver_manager.browser_pid) or 0,
+                )
+        except Exception:
+            stats["failed_tasks"] += 1
+            traceback.print_exc()
+        else:
+            stats["tasks"] += 1
+        stats["busy_seconds"] += time.perf_counter() - start
+
+    scraper.driver_manager.shutdown()
+    stats["driver_start_seconds"] = scraper.driver_manager.report()
+    stats["worker_peak_rss_mb"] = (
+        resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    )
+    result_queue.put(("stats", worker_id, stats))
+
+
+class ScraperPool:
+    """Runs many searches at once across N headless Firefox workers, each in its own process.
+
+    Workers use the lean headless browser profile and log in from the shared
+    session store. They stream their jobs back to this coordinator, which
+    dedups them across workers.
+    """
+
+    def __init__(
+        self,
+        email,
+        password,
+        concurrency=2,
+        max_pages=None,
+        session_path=None,
+    ) -> None:
+        self.email = email
+        self.password = password
+        self.concurrency = concurrency
+        self.max_pages = max_pages
+        # Resolved here rather than as the default, which would create the cache directory on import
+        self.session_path = session_path if session_path is not None else SessionStore().path
+        self.worker_stats = []
+
+    def run(self, tasks) -> list:
+        """Scrape every search task and return the unique jobs found across all of them.
+
+        Args:
+            tasks (List): Dictionaries with "job_title" and "job_filters" keys,
+                the same arguments Scraper.master_scraper takes
+
+        Returns:
+            jobs (List): All the scraped job details, deduplicated across workers
+        """
+        # Firefox and forked interpreters do not mix, so always start clean processes
+        context = multiprocessing.get_context("spawn")
+        task_queue = context.Queue()
+        result_queue = context.Queue()
+        for task in tasks:
+            task_queue.put(task)
+
+        workers = [
+            context.Process(
+                target=_worker,
+                args=(
+                    worker_id,
+                    task_queue,
+                    result_queue,
+                    self.email,
+                    self.password,
+                    self.session_path,
+                    self.max_pages,
+                ),
+            )
+            for worker_id in range(min(self.concurrency, len(tasks)))
+        ]
+        start = time.perf_counter()
+        for worker in workers:
+            worker.start()
+
+        jobs = []
+        seen_job_ids = set()
+        self.worker_stats = []
+        while len(self.worker_stats) < len(workers):
+            try:
+                message_type, worker_id, payload = result_queue.get(timeout=5)
+            except queue.Empty:
+                if not any(worker.is_alive() for worker in workers):
+                    print("All workers exited before reporting, some results may be missing")
+                    break
+                continue
+
+            if message_type == "job":
+                if payload["job_id"] in seen_job_ids:
+                    continue
+                seen_job_ids.add(payload["job_id"])
+                jobs.append(payload)
+            elif message_type == "stats":
+                self.worker_stats.append(payload)
+
+        for worker in workers:
+            worker.join()
+
+        self.report(time.perf_counter() - start, len(jobs))
+        return jobs
+
+    def report(self, elapsed, unique_jobs) -> None:
+        """Print per-worker throughput, so the concurrency sweet spot can be found."""
+        print("############################")
+        print(
+            f"Pool of {self.concurrency} workers scraped {unique_jobs} unique jobs "
+            f"in {elapsed:.1f}s ({unique_jobs / elapsed * 60:.1f} jobs/min)"
+        )
+        for stats in sorted(self.worker_stats, key=lambda stats: stats["worker_id"]):
+            jobs_per_minute = (
+                stats["jobs"] / stats["busy_seconds"] * 60 if stats["busy_seconds"] else 0
+            )
+            print(
+                f"  Worker {stats['worker_id']}: {stats['tasks']} tasks "
+                f"({stats['failed_tasks']} failed), {stats['jobs']} jobs, "
+                f"{jobs_per_minute:.1f} jobs/min, "
+                f"worker peak RSS {stats['worker_peak_rss_mb']:.0f}MB, "
+                f"browser peak RSS {stats['browser_peak_rss_mb'] or 0:.0f}MB"
+            )
+
+
+def main(tasks, concurrency) -> None:
+    """High level function to scrape many searches in parallel, then upload the results."""
+    database_connector = DatabaseConnector()
+    creds = database_connector.read_creds()
+
+    pool = ScraperPool(
+        creds["LINKEDIN_EMAIL"], creds["LINKEDIN_PASSWORD"], concurrency=concurrency
+    )
+    jobs = pool.run(tasks)
+
+    try:
+        database_connector.upload_to_db(jobs)
+        print("Newly scraped jobs uploaded to database!")
+    except Exception as e:
+        print(repr(e))
+
+
+if __name__ == "__main__":
+    # User input details
+    job_titles = ["DevOps Engineer", "Platform Engineer", "Site Reliability Engineer"]
+    job_filters = {"experience": ["Entry level"], "workplaceType": ["Hybrid"]}
+    tasks = [{"job_title": title, "job_filters": job_filters} for title in job_titles]
+    main(tasks, concurrency=3)
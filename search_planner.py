@@ -0,0 +1,176 @@
+import datetime
+import itertools
+import json
+import time
+
+from db_utils import BufferedJobWriter, DatabaseConnector
+from linkedin_scraper_local import METRICS_DIR, Scraper
+
+
+class SearchPlanner:
+    """Expands a declarative search plan of job titles x filter sets into queries,
+    orders them and runs them all in one logged in browser session.
+
+    Overlapping queries (e.g. "DevOps Engineer" and "Platform Engineer") return
+    many of the same postings. The scraper skips any card already seen this
+    session before clicking it, so duplicates never reach detail extraction.
+    Per-query yield is kept in a history file, so low value queries can be pruned.
+    """
+
+    def __init__(self, scraper, history_path="search_yield_history.json", prune_threshold=0.02) -> None:
+        self.scraper = scraper
+        self.history_path = history_path
+        # Queries averaging a lower share of new jobs per card than this are flagged
+        self.prune_threshold = prune_threshold
+        self.history = self._load_history()
+        self.query_stats = []
+
+    @staticmethod
+    def query_key(query) -> str:
+        """Stable identifier for a query, used as its key in the yield history."""
+        return json.dumps(
+            {"job_title": query["job_title"], "job_filters": query["job_filters"]},
+            sort_keys=True,
+        )
+
+    def expand(self, job_titles, filter_sets) -> list:
+        """Expand every title x filter set combination into a query, dropping exact repeats.
+
+        Args:
+            job_titles (List): Job titles to search for
+            filter_sets (List): Filter dictionaries, same shape as Scraper.set_job_filters takes
+
+        Returns:
+            queries (List): Dictionaries with "job_title" and "job_filters" keys
+        """
+        queries = {}
+        for job_title, job_filters in itertools.product(job_titles, filter_sets):
+            query = {"job_title": job_title.strip(), "job_filters": job_filters}
+            queries.setdefault(self.query_key(query), query)
+        return list(queries.values())
+
+    def order(self, queries) -> list:
+        """Run queries with no history first, then the highest yielding ones.
+
+        The most productive queries run before the overlapping, lower value
+        ones, so the shared postings get attributed to them.
+        """
+
+        def _sort_key(query):
+            runs = self.history.get(self.query_key(query), [])
+            if not runs:
+                return (0, 0)
+            return (1, -self._mean_yield(runs))
+
+        return sorted(queries, key=_sort_key)
+
+    def run(self, email, password, job_titles, filter_sets, max_pages=None):
+        """Run the whole plan in one browser session, yielding each new job as it is scraped.
+
+        Args:
+            email (String): User inputted Linkedin email login
+            password (String): User inputted Linkedin password login
+            job_titles (List): Job titles to search for
+            filter_sets (List): Filter dictionaries to combine with every title
+            max_pages (Int): Page limit per query. None walks all of them
+
+        Yields:
+            job_dict Dict: A dictionary containing the details of a single job
+        """
+        queries = self.order(self.expand(job_titles, filter_sets))
+        print(f"Search plan: {len(queries)} queries")
+
+        driver = self.scraper.login_session(email, password)
+        if driver is None:
+            return
+        self.query_stats = []
+        try:
+            for query in queries:
+                print("Running query:", query["job_title"], query["job_filters"])
+                cards_before = dict(self.scraper.card_stats)
+                stats = {"query": query, "new_jobs": 0, "seconds": 0.0}
+                start = time.perf_counter()
+                try:
+                    self.scraper.search_by_url(driver, query["job_title"], query["job_filters"])
+                    for job_dict in self.scraper.iter_jobs(driver, max_pages):
+                        stats["new_jobs"] += 1
+                        yield job_dict
+                except Exception as e:
+                    print(f"Query failed: {e}")
+                stats["seconds"] = time.perf_counter() - start
+                for counter, value in self.scraper.card_stats.items():
+                    stats[counter] = value - cards_before[counter]
+                self.query_stats.append(stats)
+        finally:
+            self.scraper.driver_manager.release(driver)
+            self._save_history()
+            self.report()
+
+    def report(self) -> None:
+        """Print per-query yield, flagging queries worth pruning from the plan."""
+        print("############################")
+        print("Search plan yield:")
+        for stats in self.query_stats:
+            query_yield = stats["new_jobs"] / stats["cards"] if stats["cards"] else 0
+            runs = self.history.get(self.query_key(stats["query"]), [])
+            prune = len(runs) >= 3 and self._mean_yield(runs) < self.prune_threshold
+            print(
+                f"  {stats['query']['job_title']} {stats['query']['job_filters']}: "
+                f"{stats['cards']} cards, {stats['cross_query_duplicates']} seen in earlier queries, "
+                f"{stats['new_jobs']} new jobs ({query_yield:.0%} yield) in {stats['seconds']:.0f}s"
+                + ("  <- consider pruning" if prune else "")
+            )
+
+    @staticmethod
+    def _mean_yield(runs) -> float:
+        cards = sum(run["cards"] for run in runs)
+        return sum(run["new_jobs"] for run in runs) / cards if cards else 0.0
+
+    def _load_history(self) -> dict:
+        try:
+            with open(self.history_path, "r") as file:
+                return json.load(file)
+        except (OSError, ValueError):
+            return {}
+
+    def _save_history(self) -> None:
+        today = datetime.date.today().isoformat()
+        for stats in self.query_stats:
+            runs = self.history.setdefault(self.query_key(stats["query"]), [])
+            runs.append({"date": today, "cards": stats["cards"], "new_jobs": stats["new_jobs"]})
+            # Only recent runs matter for pruning decisions
+            del runs[:-10]
+        with open(self.history_path, "w") as file:
+            json.dump(self.history, file, indent=2)
+
+
+def main(job_titles, filter_sets) -> None:
+    """High level function to run a whole search plan, writing jobs to the database as they are scraped."""
+    database_connector = DatabaseConnector()
+    creds = database_connector.read_creds()
+
+    scraper = Scraper()
+    scraper.metrics.run_name = "search_planner"
+    planner = SearchPlanner(scraper)
+    writer = BufferedJobWriter(database_connector, metrics=scraper.metrics)
+    writer.install_signal_handlers()
+    with writer:
+        for job_dict in planner.run(
+            creds["LINKEDIN_EMAIL"], creds["LINKEDIN_PASSWORD"], job_titles, filter_sets
+        ):
+            writer.add(job_dict)
+    scraper.driver_manager.shutdown()
+    writer.report()
+    database_connector.pool_report()
+    scraper.metrics.report()
+    scraper.metrics.export(METRICS_DIR)
+
+
+if __name__ == "__main__":
+    # User input details
+    job_titles = ["DevOps Engineer", "Platform Engineer", "Site Reliability Engineer"]
+    filter_sets = [
+        {"experience": ["Entry level"], "workplaceType": ["Hybrid"]},
+        {"experience": ["Entry level", "Associate"], "workplaceType": ["Remote"]},
+    ]
+    main(job_titles, filter_sets)
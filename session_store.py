@@ -0,0 +1,123 @@
+import fcntl
+import json
+import os
+import time
+
+from contextlib import contextmanager
+
+import requests
+
+from driver_manager import CACHE_DIR
+
+# LinkedIn's authentication cookie, a session is only usable while it is present
+AUTH_COOKIE = "li_at"
+
+# Tiny authenticated endpoint, answers 200 for a live session and 401/redirect otherwise
+PROBE_URL = "https://www.linkedin.com/voyager/api/me"
+
+
+class SessionStore:
+    """Saved LinkedIn session cookies, keyed by account.
+
+    Records when each session's auth cookie expires, and can probe whether a
+    session is still valid with one cheap authenticated request, so most runs
+    skip the login flow entirely. The store is a single JSON file guarded by
+    an advisory file lock, so concurrent scraper processes can share it.
+    """
+
+    def __init__(self, path=os.path.join(CACHE_DIR, "sessions.json")) -> None:
+        self.path = path
+        self.lock_path = f"{path}.lock"
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+
+    @contextmanager
+    def _locked(self, exclusive):
+        with open(self.lock_path, "a") as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def _read(self) -> dict:
+        try:
+            with open(self.path, "r") as file:
+                return json.load(file)
+        except (OSError, ValueError):
+            return {}
+
+    def _write(self, sessions) -> None:
+        temp_path = f"{self.path}.{os.getpid()}.tmp"
+        with open(temp_path, "w") as file:
+            json.dump(sessions, file)
+        os.replace(temp_path, self.path)
+
+    def load(self, account) -> list | None:
+        """Return the account's saved cookies, or None if there is no unexpired session.
+
+        Args:
+            account (String): The LinkedIn login email
+
+        Returns:
+            List: Selenium cookie dictionaries, with any expired cookies removed
+        """
+        with self._locked(exclusive=False):
+            session = self._read().get(account)
+        if session is None:
+            return None
+        now = time.time()
+        if session.get("expires_at") and session["expires_at"] <= now:
+            print("Saved LinkedIn session has expired")
+            return None
+        return [
+            cookie
+            for cookie in session["cookies"]
+            if not cookie.get("expiry") or cookie["expiry"] > now
+        ]
+
+    def save(self, account, cookies) -> None:
+        """Save an account's cookies, recording when its auth cookie expires."""
+        auth_cookie = next((cookie for cookie in cookies if cookie["name"] == AUTH_COOKIE), None)
+        session = {
+            "cookies": cookies,
+            "saved_at": time.time(),
+            "expires_at": auth_cookie.get("expiry") if auth_cookie else None,
+        }
+        with self._locked(exclusive=True):
+            sessions = self._read()
+            sessions[account] = session
+            self._write(sessions)
+
+    def invalidate(self, account) -> None:
+        """Forget an account's session, e.g. once LinkedIn has rejected it."""
+        with self._locked(exclusive=True):
+            sessions = self._read()
+            if sessions.pop(account, None) is not None:
+                self._write(sessions)
+
+    @staticmethod
+    def probe(cookies) -> bool:
+        """Check a session is still valid with one authenticated request, without a browser.
+
+        Args:
+            cookies (List): Selenium cookie dictionaries
+
+        Returns:
+            Boolean: True if LinkedIn accepted the session
+        """
+        jar = {cookie["name"]: cookie["value"] for cookie in cookies}
+        if AUTH_COOKIE not in jar:
+            return False
+        headers = {
+            # LinkedIn's CSRF check expects the JSESSIONID value echoed back, unquoted
+            "csrf-token": jar.get("JSESSIONID", "").strip('"'),
+            "x-restli-protocol-version": "2.0.0",
+        }
+        try:
+            response = requests.get(
+                PROBE_URL, cookies=jar, headers=headers, allow_redirects=False, timeout=10
+            )
+        except requests.RequestException as error:
+            print("Could not probe LinkedIn session:", error)
+            return False
+        return response.status_code == 200
@@ -0,0 +1,36 @@
+import os
+import sys
+
+import pytest
+
+# The modules are imported flat, as the scripts do when run from the repo root
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import db_utils  # noqa: E402
+
+
+def make_job(job_id, description=None, **fields) -> dict:
+    """A scraped job dict, as built by Scraper.scrape_job."""
+    return {
+        "job_id": job_id,
+        "job_title": f"DevOps Engineer {job_id}",
+        "company_name": f"Company {job_id}",
+        "location": "London",
+        "job_link": f"https://www.linkedin.com/jobs/view/{job_id}/",
+        "job_description": description or f"Job {job_id} " + " ".join(f"word{job_id}_{i}" for i in range(40)),
+        "posted_date": None,
+        **fields,
+    }
+
+
+@pytest.fixture
+def connector(tmp_path, monkeypatch):
+    """A DatabaseConnector on a fresh, fully migrated SQLite file."""
+    creds_path = tmp_path / "creds.yaml"
+    creds_path.write_text(f"STORAGE_BACKEND: sqlite\nSQLITE_PATH: {tmp_path / 'jobs.sqlite3'}\n")
+    monkeypatch.setattr(db_utils, "CREDS_PATH", str(creds_path))
+    connector = db_utils.DatabaseConnector()
+    engine = connector.init_db_engine()
+    yield connector
+    engine.dispose()
+    db_utils._ENGINES.pop((os.getpid(), str(engine.url)), None)
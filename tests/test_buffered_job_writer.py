@@ -0,0 +1,110 @@
+import gc
+import os
+import signal
+import threading
+import weakref
+
+import pytest
+
+from db_utils import BufferedJobWriter
+
+
+class RecordingConnector:
+    """Stands in for DatabaseConnector, keeping each uploaded batch."""
+
+    def __init__(self, failures=0, during_upload=None) -> None:
+        self.batches = []
+        self.failures = failures
+        self.during_upload = during_upload
+
+    def upload_to_db(self, jobs):
+        if self.during_upload is not None:
+            during_upload, self.during_upload = self.during_upload, None
+            during_upload()
+        if self.failures:
+            self.failures -= 1
+            raise ConnectionError("database unavailable")
+        self.batches.append([job["job_id"] for job in jobs])
+
+
+def test_flushes_every_batch_size_jobs_and_on_close():
+    connector = RecordingConnector()
+    flushed = []
+    writer = BufferedJobWriter(connector, batch_size=2, flush_interval=60, on_flush=flushed.extend)
+    for job_id in range(5):
+        writer.add({"job_id": job_id})
+    assert connector.batches == [[0, 1], [2, 3]]
+
+    writer.close()
+    assert connector.batches == [[0, 1], [2, 3], [4]]
+    assert [job["job_id"] for job in flushed] == [0, 1, 2, 3, 4]
+    assert writer.report()["rows_written"] == 5
+    # Closing twice writes nothing more
+    writer.close()
+    assert len(connector.batches) == 3
+
+
+def test_failed_batch_is_kept_for_the_next_flush():
+    connector = RecordingConnector(failures=1)
+    with BufferedJobWriter(connector, batch_size=10, flush_interval=60) as writer:
+        writer.add({"job_id": 1})
+        assert writer.flush() == 0
+        writer.add({"job_id": 2})
+        assert writer.flush() == 2
+    assert connector.batches == [[1, 2]]
+    assert writer.stats["failed_flushes"] == 1
+
+
+def test_refuses_jobs_past_max_pending():
+    connector = RecordingConnector(failures=10)
+    writer = BufferedJobWriter(connector, batch_size=10, flush_interval=60, max_pending=2)
+    writer.add({"job_id": 1})
+    writer.add({"job_id": 2})
+    with pytest.raises(RuntimeError):
+        writer.add({"job_id": 3})
+    writer.close()
+
+
+def test_flushes_on_the_timer():
+    connector = RecordingConnector()
+    flushed = threading.Event()
+    writer = BufferedJobWriter(
+        connector, batch_size=10, flush_interval=0.05, on_flush=lambda batch: flushed.set()
+    )
+    writer.add({"job_id": 1})
+    assert flushed.wait(5)
+    writer.close()
+    assert connector.batches == [[1]]
+
+
+def test_signal_during_a_flush_writes_everything_then_exits():
+    writer = None
+
+    def _signal_mid_upload():
+        writer.add({"job_id": 2})
+        os.kill(os.getpid(), signal.SIGTERM)
+
+    previous_handlers = {signum: signal.getsignal(signum) for signum in (signal.SIGTERM, signal.SIGINT)}
+    connector = RecordingConnector(during_upload=_signal_mid_upload)
+    writer = BufferedJobWriter(connector, batch_size=10, flush_interval=60)
+    try:
+        writer.install_signal_handlers()
+        writer.add({"job_id": 1})
+        with pytest.raises(SystemExit) as exit_info:
+            writer.flush()
+    finally:
+        for signum, handler in previous_handlers.items():
+            signal.signal(signum, handler)
+        writer.close()
+    assert exit_info.value.code == 128 + signal.SIGTERM
+    assert connector.batches == [[1], [2]]
+
+
+def test_close_releases_the_exit_hook():
+    connector = RecordingConnector()
+    writer = BufferedJobWriter(connector, batch_size=10, flush_interval=60)
+    writer.close()
+    collected = weakref.ref(writer)
+    del writer
+    gc.collect()
+    assert collected() is None
@@ -0,0 +1,76 @@
+from checkpoint import ScrapeCheckpoint
+
+FILTERS = {"remote": True}
+
+
+def interrupted_checkpoint(path) -> ScrapeCheckpoint:
+    """A checkpoint whose run stopped on page 3 after card 4, with two jobs unwritten."""
+    checkpoint = ScrapeCheckpoint.load(path, "DevOps", FILTERS)
+    checkpoint.record_job({"job_id": 1})
+    checkpoint.record_job({"job_id": 2})
+    checkpoint.advance(3, 4)
+    return checkpoint
+
+
+def test_resumes_position_and_unwritten_jobs(tmp_path):
+    path = str(tmp_path / "scrape_checkpoint.json")
+    interrupted_checkpoint(path)
+
+    checkpoint = ScrapeCheckpoint.load(path, "DevOps", FILTERS)
+    assert checkpoint.page == 3
+    assert checkpoint.resume_index(3) == 5
+    assert checkpoint.resume_index(4) == 0
+    assert [job["job_id"] for job in checkpoint.jobs] == [1, 2]
+
+
+def test_discarded_jobs_are_not_resumed(tmp_path):
+    path = str(tmp_path / "scrape_checkpoint.json")
+    interrupted_checkpoint(path).discard_jobs([{"job_id": 1}])
+
+    assert [job["job_id"] for job in ScrapeCheckpoint.load(path, "DevOps", FILTERS).jobs] == [2]
+
+
+def test_complete_search_is_scraped_again_keeping_unwritten_jobs(tmp_path):
+    path = str(tmp_path / "scrape_checkpoint.json")
+    interrupted_checkpoint(path).mark_complete()
+
+    checkpoint = ScrapeCheckpoint.load(path, "DevOps", FILTERS)
+    assert (checkpoint.page, checkpoint.resume_index(1), checkpoint.complete) == (1, 0, False)
+    assert [job["job_id"] for job in checkpoint.jobs] == [1, 2]
+
+
+def test_position_is_not_resumed_when_disabled(tmp_path):
+    path = str(tmp_path / "scrape_checkpoint.json")
+    interrupted_checkpoint(path)
+
+    checkpoint = ScrapeCheckpoint.load(path, "DevOps", FILTERS, resume_position=False)
+    assert (checkpoint.page, checkpoint.resume_index(1)) == (1, 0)
+    assert len(checkpoint.jobs) == 2
+
+
+def test_a_different_search_starts_fresh_keeping_unwritten_jobs(tmp_path):
+    path = str(tmp_path / "scrape_checkpoint.json")
+    interrupted_checkpoint(path)
+
+    checkpoint = ScrapeCheckpoint.load(path, "DevOps", {"remote": False})
+    assert (checkpoint.page, checkpoint.resume_index(1)) == (1, 0)
+    assert [job["job_id"] for job in checkpoint.jobs] == [1, 2]
+    # The new search is what a later run resumes, with the same jobs still pending
+    checkpoint = ScrapeCheckpoint.load(path, "DevOps", {"remote": False})
+    assert checkpoint.state["job_filters"] == {"remote": False}
+    assert [job["job_id"] for job in checkpoint.jobs] == [1, 2]
+
+
+def test_a_different_search_without_unwritten_jobs_clears_the_checkpoint(tmp_path):
+    path = str(tmp_path / "scrape_checkpoint.json")
+    interrupted_checkpoint(path).discard_jobs([{"job_id": 1}, {"job_id": 2}])
+
+    assert ScrapeCheckpoint.load(path, "Platform", FILTERS).jobs == []
+    assert not (tmp_path / "scrape_checkpoint.json").exists()
+
+
+def test_corrupt_state_starts_fresh(tmp_path):
+    path = tmp_path / "scrape_checkpoint.json"
+    path.write_text("{not json")
+
+    assert ScrapeCheckpoint.load(str(path), "DevOps", FILTERS).page == 1
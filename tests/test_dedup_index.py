@@ -0,0 +1,32 @@
+from conftest import make_job
+from dedup_index import BloomFilter, JobIndex
+from job_repository import JobRepository
+
+
+def test_bloom_filter_has_no_false_negatives_and_few_false_positives():
+    bloom_filter = BloomFilter(1000, error_rate=0.01)
+    for job_id in range(1000):
+        bloom_filter.add(job_id)
+
+    assert all(job_id in bloom_filter for job_id in range(1000))
+    false_positives = sum(job_id in bloom_filter for job_id in range(1000, 11_000))
+    assert false_positives < 300
+
+
+def test_job_index_loads_stored_ids_as_a_set(connector):
+    JobRepository(connector).upsert_jobs([make_job(1), make_job(2)])
+
+    index = JobIndex.load(connector)
+    assert index.bloom_filter is None
+    assert 1 in index and 3 not in index
+    index.add(3)
+    assert 3 in index and len(index) == 3
+
+
+def test_job_index_confirms_bloom_filter_hits_against_the_database(connector):
+    JobRepository(connector).upsert_jobs([make_job(1), make_job(2)])
+
+    index = JobIndex.load(connector, max_set_size=1)
+    assert index.bloom_filter is not None and len(index) == 0
+    assert 1 in index and 2 in index
+    assert not any(job_id in index for job_id in range(3, 200))
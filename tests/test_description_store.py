@@ -0,0 +1,28 @@
+import zlib
+
+from description_store import DescriptionStore, description_row
+
+
+def test_rows_are_keyed_by_content_and_compressed():
+    description = "Run our Kubernetes clusters. " * 50
+    row = description_row(description)
+
+    assert row == description_row(description)
+    assert row["description_hash"] != description_row(description + "!")["description_hash"]
+    assert len(row["description_hash"]) == 64
+    assert zlib.decompress(row["body"]).decode("utf-8") == description
+    assert row["raw_bytes"] == len(description) > len(row["body"])
+
+
+def test_each_description_is_stored_once(connector):
+    store = DescriptionStore(connector)
+    with connector.begin() as connection:
+        first = DescriptionStore.put_many(connection, ["Reposted role", "Other role", None, "Reposted role"])
+    with connector.begin() as connection:
+        again = DescriptionStore.put_many(connection, ["Reposted role"])
+
+    assert again["Reposted role"] == first["Reposted role"]
+    assert connector.query_db("SELECT COUNT(*) FROM job_descriptions").scalar() == 2
+    assert store.get(first["Other role"]) == "Other role"
+    assert store.get("0" * 64) is None
+    assert store.get(None) is None
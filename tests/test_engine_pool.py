@@ -0,0 +1,21 @@
+import db_utils
+
+
+def test_connectors_share_one_engine_per_process(connector):
+    assert db_utils.DatabaseConnector().init_db_engine() is connector.init_db_engine()
+
+
+def test_pool_report_keeps_running_checkout_totals(connector, monkeypatch):
+    monkeypatch.setitem(db_utils.POOL_STATS, "checkouts", 0)
+    monkeypatch.setitem(db_utils.POOL_STATS, "timed_checkouts", 0)
+    monkeypatch.setitem(db_utils.POOL_STATS, "total_checkout_seconds", 0.0)
+    monkeypatch.setitem(db_utils.POOL_STATS, "max_checkout_seconds", 0.0)
+    for _ in range(50):
+        with connector.begin() as connection:
+            connection.exec_driver_sql("SELECT 1")
+
+    summary = connector.pool_report()
+    assert summary["checkouts"] == 50
+    assert 0 < summary["mean_checkout_seconds"] <= summary["max_checkout_seconds"]
+    # Totals, not one entry per checkout
+    assert all(not isinstance(value, list) for value in db_utils.POOL_STATS.values())
@@ -0,0 +1,42 @@
+import pytest
+
+pytest.importorskip("requests")
+
+from enrichment_engine import RateLimiter, TokenBucket, parse_reset  # noqa: E402
+
+
+@pytest.mark.parametrize(
+    "value, seconds",
+    [("1s", 1.0), ("6m0s", 360.0), ("120ms", 0.12), ("1h2m3.5s", 3723.5), ("", None), ("soon", None)],
+)
+def test_parse_reset(value, seconds):
+    assert parse_reset(value) == (pytest.approx(seconds) if seconds is not None else None)
+
+
+def test_token_bucket_waits_for_the_shortfall():
+    bucket = TokenBucket(per_minute=60, burst_seconds=10)
+    assert bucket.capacity == 10
+    assert bucket.wait_time(10) == 0
+    bucket.take(10)
+    assert bucket.wait_time(2) == pytest.approx(2, abs=0.1)
+    # More than the bucket holds waits for a full bucket, never forever
+    assert bucket.wait_time(1000) == pytest.approx(10, abs=0.1)
+
+
+def test_rate_limiter_follows_headers():
+    limiter = RateLimiter(requests_per_minute=60, tokens_per_minute=6000)
+    limiter.update(
+        {
+            "x-ratelimit-limit-requests": "120",
+            "x-ratelimit-remaining-tokens": "0",
+            "x-ratelimit-reset-tokens": "30s",
+        }
+    )
+    assert limiter.requests.per_minute == 120
+    assert limiter.tokens.level == 0
+    assert limiter.paused_until > 0
+
+    assert limiter.backoff({"retry-after-ms": "1500"}) == 1.5
+    assert limiter.consecutive_rate_limits == 1
+    limiter.succeeded()
+    assert limiter.consecutive_rate_limits == 0
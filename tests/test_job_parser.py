@@ -0,0 +1,51 @@
+import pytest
+
+from job_parser import parse_job_html, parse_job_id
+
+
+@pytest.mark.parametrize(
+    "value, job_id",
+    [
+        ("3912345678", 3912345678),
+        (" 3912345678\n", 3912345678),
+        (3912345678, 3912345678),
+        ("https://www.linkedin.com/jobs/view/3912345678/?refId=abc", 3912345678),
+        ("/jobs/view/devops-engineer-at-acme-3912345678?trk=x", 3912345678),
+        ("https://www.linkedin.com/jobs/search/?currentJobId=3912345678&keywords=devops", 3912345678),
+        ("urn:li:jobPosting:3912345678", 3912345678),
+        ("urn:li:fs_normalized_jobPosting:3912345678", 3912345678),
+        ("https://www.linkedin.com/jobs/search/?keywords=devops", None),
+        (None, None),
+    ],
+)
+def test_parse_job_id(value, job_id):
+    assert parse_job_id(value) == job_id
+
+
+def test_parse_job_html_reads_every_field():
+    html = """
+    <div class="jobs-search__job-details">
+      <div class="job-details-jobs-unified-top-card__job-title">
+        <h1><a href="/jobs/view/3912345678/?refId=abc">DevOps  Engineer</a></h1>
+      </div>
+      <div class="job-details-jobs-unified-top-card__company-name"><a href="/company/acme">Acme</a></div>
+      <div class="job-details-jobs-unified-top-card__primary-description-container">
+        <span class="tvm__text">London, England</span>
+      </div>
+      <time datetime="2024-05-01">2 weeks ago</time>
+      <div class="jobs-description__content"><h2>About</h2><p>Run our<br>clusters.</p><ul><li>AWS</li></ul></div>
+    </div>
+    """
+    assert parse_job_html(html) == {
+        "job_id": 3912345678,
+        "job_title": "DevOps Engineer",
+        "company_name": "Acme",
+        "location": "London, England",
+        "job_link": "https://www.linkedin.com/jobs/view/3912345678/?refId=abc",
+        "job_description": "About\nRun our\nclusters.\nAWS",
+        "posted_date": "2024-05-01",
+    }
+
+
+def test_parse_job_html_leaves_missing_fields_empty():
+    assert set(parse_job_html("<div><p>Nothing here</p></div>").values()) == {None}
@@ -0,0 +1,92 @@
+from conftest import make_job
+from job_repository import ENRICHED, FAILED, PUBLISHED, SCORED, SCRAPED, JobRepository
+
+
+def backlog(repository, state) -> dict:
+    return {job["job_id"]: job for chunk in repository.iter_backlog(state) for job in chunk}
+
+
+def test_insert_skips_jobs_already_stored(connector):
+    repository = JobRepository(connector)
+    repository.upsert_jobs([make_job(1)])
+
+    assert repository.upsert_jobs([make_job(1, job_title="Changed"), make_job(2)]) == 1
+    assert repository.existing_ids([1, 2, 3]) == {1, 2}
+    assert repository.count() == 2
+    assert sorted(repository.iter_ids()) == [1, 2]
+
+
+def test_rescrape_refreshes_scraped_fields(connector):
+    repository = JobRepository(connector)
+    repository.upsert_jobs([make_job(1)])
+
+    assert repository.upsert_jobs([make_job(1, job_title="Platform Engineer")], update=True) == 1
+    assert connector.query_db("SELECT job_title FROM bens_jobs").all() == [("Platform Engineer",)]
+
+
+def test_backlog_streams_representatives_before_duplicates(connector):
+    repository = JobRepository(connector)
+    description = "Build and run Kubernetes clusters on AWS with Terraform " * 10
+    repository.upsert_jobs([make_job(3, description), make_job(1, description), make_job(2)])
+
+    chunks = list(repository.iter_backlog(SCRAPED, chunk_size=1))
+    assert [job["job_id"] for chunk in chunks for job in chunk] == [2, 3, 1]
+    assert chunks[-1][0]["duplicate_of"] == 3
+
+
+def test_jobs_move_through_each_stage(connector):
+    repository = JobRepository(connector)
+    assert repository.upsert_jobs([make_job(1), make_job(2)]) == 2
+    assert set(backlog(repository, SCRAPED)) == {1, 2}
+
+    repository.mark_enriched({1: {"tools": ["terraform"]}})
+    assert set(backlog(repository, SCRAPED)) == {2}
+    assert backlog(repository, ENRICHED)[1]["insights"] == {"tools": ["terraform"]}
+
+    repository.mark_scored({1: 7})
+    assert backlog(repository, SCORED)[1]["interest"] == 7
+
+    assert repository.mark_published([1]) == 1
+    assert backlog(repository, PUBLISHED)[1]["job_id"] == 1
+    assert not backlog(repository, SCORED)
+
+
+def test_transitions_only_move_jobs_on_from_the_previous_stage(connector):
+    repository = JobRepository(connector)
+    repository.upsert_jobs([make_job(1)])
+
+    repository.mark_scored({1: 7})
+    assert repository.mark_published([1]) == 0
+    assert set(backlog(repository, SCRAPED)) == {1}
+
+
+def test_failed_attempts_park_a_job_after_max_attempts(connector):
+    repository = JobRepository(connector, max_attempts=2)
+    repository.upsert_jobs([make_job(1)])
+
+    repository.mark_failed([1])
+    assert set(backlog(repository, SCRAPED)) == {1}
+    repository.mark_failed([1])
+    assert not backlog(repository, SCRAPED)
+    assert set(backlog(repository, FAILED)) == {1}
+    # A parked job is never counted again
+    assert repository.mark_failed([1]) == 0
+
+
+def test_rescrape_keeps_the_pipeline_state(connector):
+    repository = JobRepository(connector)
+    repository.upsert_jobs([make_job(1)])
+    repository.mark_enriched({1: {"tools": []}})
+
+    repository.upsert_jobs([make_job(1)], update=True)
+    assert set(backlog(repository, ENRICHED)) == {1}
+
+
+def test_rescrape_keeps_a_known_posted_date(connector):
+    repository = JobRepository(connector)
+    repository.upsert_jobs([make_job(1, posted_date="2024-05-01")])
+
+    repository.upsert_jobs([make_job(1)], update=True)
+    assert connector.query_db("SELECT posted_date FROM bens_jobs").all() == [("2024-05-01",)]
+    repository.upsert_jobs([make_job(1, posted_date="2024-06-01")], update=True)
+    assert connector.query_db("SELECT posted_date FROM bens_jobs").all() == [("2024-06-01",)]
@@ -0,0 +1,52 @@
+from conftest import make_job
+from job_repository import JobRepository
+from near_duplicates import MinHasher, NearDuplicateIndex, shingles
+
+DESCRIPTION = (
+    "We are hiring a DevOps engineer to build and run our Kubernetes clusters on AWS. "
+    "You will own our Terraform modules, CI pipelines and observability stack, "
+    "and work closely with product teams on reliability and cost."
+)
+
+
+def test_shingles_ignore_case_and_punctuation():
+    assert shingles("Run, the  CLUSTERS!", size=2) == {"run the", "the clusters"}
+    assert shingles("", size=2) == set()
+
+
+def test_similarity_tracks_shared_text():
+    minhasher = MinHasher()
+    signature = minhasher.signature(DESCRIPTION)
+    assert minhasher.similarity(signature, minhasher.signature(DESCRIPTION + " Apply now.")) > 0.8
+    assert minhasher.similarity(signature, minhasher.signature("Sales manager, Leeds. " * 10)) < 0.2
+    assert minhasher.unpack(minhasher.pack(signature)) == signature
+
+
+def test_assign_clusters_duplicates_under_the_first_stored(connector):
+    repository = JobRepository(connector)
+    repository.upsert_jobs([make_job(1, DESCRIPTION)])
+    # One in the same batch as its duplicate, one matching the stored job
+    repository.upsert_jobs(
+        [make_job(2, DESCRIPTION + " Apply now."), make_job(3), make_job(4, DESCRIPTION + " Remote.")]
+    )
+
+    rows = dict(connector.query_db("SELECT job_id, duplicate_of FROM bens_jobs").all())
+    assert rows == {1: None, 2: 1, 3: None, 4: 1}
+
+
+def test_assign_never_clusters_a_job_with_itself(connector):
+    repository = JobRepository(connector)
+    repository.upsert_jobs([make_job(1, DESCRIPTION), make_job(1, DESCRIPTION)])
+    repository.upsert_jobs([make_job(1, DESCRIPTION)], update=True)
+
+    assert connector.query_db("SELECT job_id, duplicate_of FROM bens_jobs").all() == [(1, None)]
+    with connector.begin() as connection:
+        assert NearDuplicateIndex().assign(connection, [make_job(1, DESCRIPTION)]) == {}
+
+
+def test_descriptions_without_words_are_never_clustered(connector):
+    JobRepository(connector).upsert_jobs([make_job(100, "!!!"), make_job(101, "???"), make_job(102, " ")])
+
+    rows = dict(connector.query_db("SELECT job_id, duplicate_of FROM bens_jobs").all())
+    assert rows == {100: None, 101: None, 102: None}
+    assert connector.query_db("SELECT COUNT(*) FROM job_minhash_signatures").scalar() == 0
@@ -0,0 +1,72 @@
+import time
+
+import pytest
+
+pytest.importorskip("selenium")
+
+from selenium.common.exceptions import TimeoutException  # noqa: E402
+
+from readiness import RESOURCE_COUNT_SCRIPT, ReadinessWaiter, details_pane_shows, network_idle  # noqa: E402
+
+
+class ScriptedDriver:
+    """Answers execute_script from a list of resource counts, one per call, the last repeated."""
+
+    def __init__(self, resource_counts=(0,), ready_state="complete") -> None:
+        self.resource_counts = list(resource_counts)
+        self.ready_state = ready_state
+        self.scripts = []
+
+    def execute_script(self, script, *args):
+        self.scripts.append((script, args))
+        if script == "return document.readyState":
+            return self.ready_state
+        if script == RESOURCE_COUNT_SCRIPT:
+            return self.resource_counts.pop(0) if len(self.resource_counts) > 1 else self.resource_counts[0]
+        return True
+
+
+def test_until_returns_the_condition_value_and_records_the_wait():
+    waiter = ReadinessWaiter(politeness_floor=0, poll_frequency=0.01)
+    calls = iter([False, False, "ready"])
+
+    assert waiter.until(ScriptedDriver(), lambda driver: next(calls), "search_results", timeout=5) == "ready"
+    assert waiter.report()["search_results"]["count"] == 1
+
+
+def test_until_raises_but_settle_carries_on_after_a_timeout():
+    waiter = ReadinessWaiter(politeness_floor=0, poll_frequency=0.01)
+
+    with pytest.raises(TimeoutException):
+        waiter.until(ScriptedDriver(), lambda driver: False, "details", timeout=0.05)
+    assert waiter.settle(ScriptedDriver(), lambda driver: False, "page_load", timeout=0.05) is None
+    assert {label: stats["count"] for label, stats in waiter.report().items()} == {"details": 1, "page_load": 1}
+
+
+def test_politeness_floor_spaces_out_actions():
+    waiter = ReadinessWaiter(politeness_floor=0.1)
+    waiter.polite()
+    start = time.perf_counter()
+    waiter.polite()
+    assert time.perf_counter() - start >= 0.09
+
+
+def test_network_idle_waits_for_the_resource_count_to_stop_changing():
+    # Keeps counting past the 250 entry Resource Timing buffer limit
+    driver = ScriptedDriver(resource_counts=[240, 250, 260, 270, 270])
+    condition = network_idle(idle_time=0.05)
+
+    results = [condition(driver) for _ in range(5)]
+    assert results == [False] * 5
+    time.sleep(0.06)
+    assert condition(driver)
+
+
+def test_network_idle_needs_the_document_loaded():
+    assert not network_idle(idle_time=0)(ScriptedDriver(ready_state="loading"))
+
+
+def test_details_pane_condition_checks_the_given_job():
+    driver = ScriptedDriver()
+    assert details_pane_shows(3912345678)(driver)
+    assert driver.scripts[-1][1] == ("3912345678",)
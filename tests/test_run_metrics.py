@@ -0,0 +1,50 @@
+import json
+
+import pytest
+
+from run_metrics import RunMetrics, _percentile
+
+
+@pytest.mark.parametrize(
+    "quantile, expected",
+    [(0.0, 1), (0.5, 5), (0.95, 10), (1.0, 10)],
+)
+def test_percentile_is_nearest_rank(quantile, expected):
+    assert _percentile(list(range(1, 11)), quantile) == expected
+
+
+def test_summary_aggregates_each_stage():
+    metrics = RunMetrics("test")
+    for seconds in (0.1, 0.2, 0.3, 0.4):
+        metrics.record("card_click", seconds)
+    with pytest.raises(ValueError):
+        with metrics.span("parse"):
+            raise ValueError("failed spans are still timed")
+
+    stages = metrics.summary()["stages"]
+    assert stages["card_click"]["count"] == 4
+    assert stages["card_click"]["p50"] == 0.2
+    assert stages["card_click"]["p95"] == stages["card_click"]["max"] == 0.4
+    assert stages["card_click"]["total"] == pytest.approx(1.0)
+    assert stages["parse"]["count"] == 1
+
+
+def test_export_writes_a_json_report_and_prometheus_file(tmp_path):
+    metrics = RunMetrics("test")
+    metrics.timed("db_upload", lambda: None)()
+    metrics.export(str(tmp_path / "metrics"))
+
+    (report,) = (tmp_path / "metrics").glob("test_*.json")
+    assert json.loads(report.read_text())["stages"]["db_upload"]["count"] == 1
+    lines = (tmp_path / "metrics" / "test.prom").read_text().splitlines()
+    assert "# TYPE linkedin_scraper_stage_seconds summary" in lines
+    assert any(
+        line.startswith('linkedin_scraper_stage_seconds{run="test",stage="db_upload",quantile="0.95"} ')
+        for line in lines
+    )
+    assert 'linkedin_scraper_stage_seconds_count{run="test",stage="db_upload"} 1' in lines
+    assert any(line.startswith('linkedin_scraper_run_wall_seconds{run="test"} ') for line in lines)
+    # Every sample line is a metric name, labels and a number
+    for line in lines:
+        if not line.startswith("#"):
+            float(line.rsplit(" ", 1)[1])
@@ -0,0 +1,63 @@
+import pytest
+
+from sqlalchemy import create_engine, inspect
+
+from db_utils import DatabaseConnector
+from schema import MIGRATIONS, apply_migrations, bench, migration_status
+
+
+def test_fresh_database_is_fully_migrated(connector):
+    assert [applied_at is not None for _, _, applied_at in connector.schema_status()] == [True] * len(
+        MIGRATIONS
+    )
+    assert connector.migrate() == []
+
+    engine = connector.init_db_engine()
+    assert inspect(engine).get_pk_constraint("bens_jobs")["constrained_columns"] == ["job_id"]
+    assert "bens_jobs_duplicate_of" in {index["name"] for index in inspect(engine).get_indexes("bens_jobs")}
+
+
+def test_legacy_conversion_aborts_off_postgres(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'legacy.sqlite3'}")
+    with engine.begin() as connection:
+        connection.exec_driver_sql(
+            "CREATE TABLE bens_jobs (job_id TEXT, job_title TEXT, company_name TEXT, "
+            "location TEXT, job_link TEXT, in_notion TEXT)"
+        )
+
+    with pytest.raises(SystemExit):
+        apply_migrations(DatabaseConnector(), engine)
+    # Nothing past the migration that failed is recorded as applied
+    assert [version for version, _, applied_at in migration_status(engine) if applied_at] == [1]
+    engine.dispose()
+
+
+def test_pipeline_states_replace_in_notion(tmp_path, monkeypatch):
+    engine = create_engine(f"sqlite:///{tmp_path / 'jobs.sqlite3'}")
+    with monkeypatch.context() as patch:
+        patch.setattr("schema.MIGRATIONS", tuple(m for m in MIGRATIONS if m[0] < 7))
+        apply_migrations(DatabaseConnector(), engine)
+    with engine.begin() as connection:
+        connection.exec_driver_sql(
+            "INSERT INTO bens_jobs (job_id, insights, in_notion) VALUES "
+            "(1, '{\"tools\": []}', TRUE), (2, '{\"tools\": []}', FALSE), (3, 'null', FALSE), (4, NULL, FALSE)"
+        )
+
+    assert 7 in apply_migrations(DatabaseConnector(), engine)
+    with engine.begin() as connection:
+        states = dict(connection.exec_driver_sql("SELECT job_id, pipeline_state FROM bens_jobs").all())
+    assert states == {1: "published", 2: "enriched", 3: "scraped", 4: "scraped"}
+    columns = {column["name"] for column in inspect(engine).get_columns("bens_jobs")}
+    assert {"pipeline_state", "attempts", "state_changed_at"} <= columns and "in_notion" not in columns
+    indexes = {index["name"] for index in inspect(engine).get_indexes("bens_jobs")}
+    assert "bens_jobs_pipeline_state" in indexes and "bens_jobs_pending_notion" not in indexes
+    engine.dispose()
+
+
+def test_bench_compares_the_legacy_and_managed_schemas(connector):
+    results = bench(connector, row_counts=(200,), lookups=5, syncs=2)
+    assert any("PRIMARY KEY" in step for step in results[200]["after"]["lookup"]["plan"])
+    assert any("bens_jobs_pipeline_state" in step for step in results[200]["after"]["sync"]["plan"])
+    # Scratch schemas are only made on the configured Postgres database
+    with pytest.raises(SystemExit):
+        bench(connector, row_counts=(200,), lookups=5, syncs=2, configured=True)
@@ -0,0 +1,86 @@
+import json
+
+import pytest
+
+pytest.importorskip("selenium")
+
+from search_planner import SearchPlanner  # noqa: E402
+
+
+class FakeScraper:
+    """Scripted stand in for Scraper: each title yields its jobs, skipping any seen in earlier queries."""
+
+    def __init__(self, results) -> None:
+        self.results = results
+        self.card_stats = {"cards": 0, "cross_query_duplicates": 0}
+        self.seen = set()
+        self.released = False
+        self.driver_manager = self
+
+    def login_session(self, email, password):
+        return "driver"
+
+    def search_by_url(self, driver, job_title, job_filters) -> None:
+        self.job_title = job_title
+
+    def iter_jobs(self, driver, max_pages):
+        results = self.results[self.job_title]
+        if isinstance(results, Exception):
+            raise results
+        for job_id in results:
+            self.card_stats["cards"] += 1
+            if job_id in self.seen:
+                self.card_stats["cross_query_duplicates"] += 1
+                continue
+            self.seen.add(job_id)
+            yield {"job_id": job_id}
+
+    def release(self, driver) -> None:
+        self.released = True
+
+
+def test_expand_combines_titles_and_filters_once(tmp_path):
+    planner = SearchPlanner(FakeScraper({}), history_path=str(tmp_path / "history.json"))
+    filter_sets = [{"experience": ["Entry level"]}, {"workplaceType": ["Remote"]}]
+
+    queries = planner.expand(["DevOps Engineer", " DevOps Engineer ", "SRE"], filter_sets)
+    assert [(query["job_title"], query["job_filters"]) for query in queries] == [
+        ("DevOps Engineer", filter_sets[0]),
+        ("DevOps Engineer", filter_sets[1]),
+        ("SRE", filter_sets[0]),
+        ("SRE", filter_sets[1]),
+    ]
+
+
+def test_order_runs_new_queries_then_the_highest_yield(tmp_path):
+    planner = SearchPlanner(FakeScraper({}), history_path=str(tmp_path / "history.json"))
+    low, high, new = planner.expand(["Low", "High", "New"], [{}])
+    planner.history = {
+        planner.query_key(low): [{"cards": 10, "new_jobs": 1}],
+        planner.query_key(high): [{"cards": 10, "new_jobs": 8}],
+    }
+
+    assert planner.order([low, high, new]) == [new, high, low]
+
+
+def test_run_yields_new_jobs_and_records_each_querys_yield(tmp_path):
+    history_path = tmp_path / "history.json"
+    scraper = FakeScraper({"DevOps": [1, 2, 3], "Platform": [2, 3, 4], "Broken": RuntimeError("stale page")})
+    planner = SearchPlanner(scraper, history_path=str(history_path))
+    key = planner.query_key({"job_title": "Platform", "job_filters": {}})
+    planner.history = {key: [{"date": "2024-01-01", "cards": 10, "new_jobs": 0}] * 10}
+
+    jobs = list(planner.run("me@example.com", "password", ["DevOps", "Platform", "Broken"], [{}]))
+    assert [job["job_id"] for job in jobs] == [1, 2, 3, 4]
+    assert scraper.released
+
+    stats = {stats["query"]["job_title"]: stats for stats in planner.query_stats}
+    assert stats["DevOps"]["new_jobs"] == stats["DevOps"]["cards"] == 3
+    assert stats["Platform"]["new_jobs"] == 1
+    assert stats["Platform"]["cross_query_duplicates"] == 2
+    # A failing query is recorded and the rest of the plan still runs
+    assert stats["Broken"]["cards"] == stats["Broken"]["new_jobs"] == 0
+
+    history = json.loads(history_path.read_text())
+    assert len(history[key]) == 10
+    assert history[key][-1]["new_jobs"] == 1
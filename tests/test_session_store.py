@@ -0,0 +1,95 @@
+import multiprocessing
+import time
+
+import pytest
+
+requests = pytest.importorskip("requests")
+pytest.importorskip("selenium")
+pytest.importorskip("webdriver_manager")
+
+import session_store  # noqa: E402
+from session_store import SessionStore  # noqa: E402
+
+
+def cookies(expires_in=3600, **expiries) -> list:
+    """A session's cookies, li_at expiring in expires_in seconds."""
+    now = time.time()
+    return [
+        {"name": "li_at", "value": "token", "expiry": now + expires_in},
+        {"name": "JSESSIONID", "value": '"ajax:123"'},
+        *({"name": name, "value": "x", "expiry": now + seconds} for name, seconds in expiries.items()),
+    ]
+
+
+def _save_account(path, account) -> None:
+    SessionStore(path).save(account, cookies())
+
+
+def test_saved_session_is_loaded_without_expired_cookies(tmp_path):
+    store = SessionStore(str(tmp_path / "sessions" / "sessions.json"))
+    store.save("me@example.com", cookies(bcookie=3600, lang=-10))
+
+    loaded = store.load("me@example.com")
+    assert [cookie["name"] for cookie in loaded] == ["li_at", "JSESSIONID", "bcookie"]
+    assert store.load("someone@example.com") is None
+
+
+def test_session_with_an_expired_auth_cookie_is_not_loaded(tmp_path):
+    store = SessionStore(str(tmp_path / "sessions.json"))
+    store.save("me@example.com", cookies(expires_in=-1))
+
+    assert store.load("me@example.com") is None
+
+
+def test_invalidate_forgets_only_that_account(tmp_path):
+    store = SessionStore(str(tmp_path / "sessions.json"))
+    store.save("me@example.com", cookies())
+    store.save("other@example.com", cookies())
+
+    store.invalidate("me@example.com")
+    assert store.load("me@example.com") is None
+    assert store.load("other@example.com") is not None
+
+
+def test_concurrent_processes_never_lose_each_others_sessions(tmp_path):
+    path = str(tmp_path / "sessions.json")
+    context = multiprocessing.get_context("spawn")
+    processes = [
+        context.Process(target=_save_account, args=(path, f"worker{i}@example.com")) for i in range(4)
+    ]
+    for process in processes:
+        process.start()
+    for process in processes:
+        process.join(30)
+
+    assert all(SessionStore(path).load(f"worker{i}@example.com") for i in range(4))
+
+
+class Response:
+    def __init__(self, status_code) -> None:
+        self.status_code = status_code
+
+
+def test_probe_sends_the_session_and_checks_the_status(monkeypatch):
+    sent = {}
+
+    def _get(url, cookies, headers, **kwargs):
+        sent.update(cookies=cookies, headers=headers)
+        return Response(200)
+
+    monkeypatch.setattr(session_store.requests, "get", _get)
+    assert SessionStore.probe(cookies())
+    assert sent["cookies"]["li_at"] == "token"
+    assert sent["headers"]["csrf-token"] == "ajax:123"
+
+    monkeypatch.setattr(session_store.requests, "get", lambda *args, **kwargs: Response(401))
+    assert not SessionStore.probe(cookies())
+
+
+def test_probe_fails_without_an_auth_cookie_or_a_connection(monkeypatch):
+    def _unreachable(*args, **kwargs):
+        raise requests.RequestException("no network")
+
+    monkeypatch.setattr(session_store.requests, "get", _unreachable)
+    assert not SessionStore.probe([{"name": "JSESSIONID", "value": "x"}])
+    assert not SessionStore.probe(cookies())
@@ -0,0 +1,37 @@
+import pytest
+
+import db_utils
+
+
+def test_sqlite_connections_get_the_tuned_pragmas(connector):
+    assert connector.storage_backend() == "sqlite"
+    with connector.begin() as connection:
+        pragmas = {
+            pragma: connection.exec_driver_sql(f"PRAGMA {pragma}").scalar()
+            for pragma in ("journal_mode", "synchronous", "busy_timeout", "foreign_keys", "temp_store")
+        }
+    # synchronous NORMAL is 1, temp_store MEMORY is 2
+    assert pragmas == {
+        "journal_mode": "wal",
+        "synchronous": 1,
+        "busy_timeout": 5000,
+        "foreign_keys": 1,
+        "temp_store": 2,
+    }
+
+
+def test_query_db_returns_rows_after_commit(connector):
+    connector.query_db(
+        "INSERT INTO job_descriptions (description_hash, body, raw_bytes) VALUES (:hash, :body, 0)",
+        {"hash": "a" * 64, "body": b""},
+    )
+    assert connector.query_db("SELECT description_hash FROM job_descriptions").all() == [("a" * 64,)]
+
+
+def test_unknown_backend_is_rejected(tmp_path, monkeypatch):
+    creds_path = tmp_path / "creds.yaml"
+    creds_path.write_text("STORAGE_BACKEND: duckdb\n")
+    monkeypatch.setattr(db_utils, "CREDS_PATH", str(creds_path))
+
+    with pytest.raises(ValueError):
+        db_utils.DatabaseConnector().init_db_engine()